@@ -0,0 +1,407 @@
+"""Micro-benchmarks for the calculator.
+
+Run all cases with ``python bench.py`` or only those whose name contains a
+substring with ``python bench.py raster``. Each case is a factory registered
+with `@benchmark`; it does its setup and returns the zero-argument callable
+that gets timed.
+
+Tk cases need a display. On Linux without $DISPLAY the runner starts a
+private Xvfb server when one is installed; otherwise those cases are skipped.
+
+Baselines:
+
+    python bench.py --save baseline.json        # record results
+    python bench.py --compare baseline.json     # run and flag regressions
+    python bench.py --compare baseline.json --results new.json   # compare files only
+
+A case regresses when its time per op grows by more than --threshold
+(default 15%); the comparison exits with status 1 if any case regressed.
+
+Runs use a scratch home directory, so the user's prefs (programmer mode,
+preview, theme...) don't change what is measured, and memory, keycaps and
+the log aren't written to the real one.
+"""
+from __future__ import annotations
+
+import argparse
+import atexit
+import itertools
+import json
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tkinter as tk
+
+# calculator.py resolves its ~ paths (prefs, memory, session, keycaps, log) at
+# import time, so the scratch home must be in place before the import
+# (X11 still needs the real cookie file, which is found through $HOME by default)
+if sys.platform.startswith('linux'):
+    os.environ.setdefault('XAUTHORITY', os.path.join(os.path.expanduser('~'), '.Xauthority'))
+_HOME = tempfile.mkdtemp(prefix='calc-bench-')
+os.environ['HOME'] = os.environ['USERPROFILE'] = _HOME
+atexit.register(shutil.rmtree, _HOME, ignore_errors=True)
+
+import calculator  # noqa: E402
+
+BENCHMARKS = {}  # name -> factory returning the callable to time
+
+
+def benchmark(name: str):
+    def deco(factory):
+        BENCHMARKS[name] = factory
+        return factory
+    return deco
+
+
+def run_case(factory, min_time: float = 0.5) -> dict:
+    """Time the callable built by `factory` until at least `min_time` seconds have passed."""
+    op = factory()
+    op()  # warm caches outside the measurement
+    n = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(n):
+            op()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        # grow towards min_time, at least doubling so tiny timings converge quickly
+        n = max(n * 2, int(n * min_time * 1.1 / max(elapsed, 1e-9)))
+    res = {'runs': n, 'per_op_us': elapsed / n * 1e6, 'ops_per_s': n / elapsed}
+    # cases can attach an `extra` callable reporting state after the run (item counts, memory)
+    extra = getattr(op, 'extra', None)
+    if extra is not None:
+        res.update(extra())
+    return res
+
+
+_root = None
+
+
+def _tk_root() -> tk.Tk:
+    """Return a shared Tk root, raising RuntimeError when no display is available."""
+    global _root
+    if _root is None:
+        try:
+            _root = tk.Tk()
+        except tk.TclError as e:
+            raise RuntimeError(f'no display ({e})')
+    return _root
+
+
+def _start_xvfb() -> None:
+    """Point $DISPLAY at a private Xvfb server when running headless on Linux."""
+    if os.environ.get('DISPLAY') or not sys.platform.startswith('linux'):
+        return
+    xvfb = shutil.which('Xvfb')
+    if not xvfb:
+        return
+    for num in range(99, 120):
+        if os.path.exists(f'/tmp/.X11-unix/X{num}') or os.path.exists(f'/tmp/.X{num}-lock'):
+            continue
+        proc = subprocess.Popen([xvfb, f':{num}', '-screen', '0', '1280x1024x24', '-nolisten', 'tcp'],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        atexit.register(proc.terminate)
+        # wait for the socket so the first Tk() call doesn't race the server
+        deadline = time.time() + 5
+        while time.time() < deadline and not os.path.exists(f'/tmp/.X11-unix/X{num}'):
+            if proc.poll() is not None:
+                break
+            time.sleep(0.05)
+        if proc.poll() is None:
+            os.environ['DISPLAY'] = f':{num}'
+            return
+
+
+def _rss_kb() -> int | None:
+    # resident set size from /proc (Linux); None where that isn't available
+    try:
+        with open(f'/proc/{os.getpid()}/status', encoding='ascii') as fh:
+            for line in fh:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _sample_texts(count: int = 1000) -> itertools.cycle:
+    # mix of integers, decimals and negatives so most glyphs get exercised
+    texts = []
+    for i in range(count):
+        v = i * 7919
+        texts.append(str(v) if i % 3 else f'-{v / 97:.4f}')
+    return itertools.cycle(texts)
+
+
+@benchmark('raster.frame')
+def _raster_frame():
+    r = calculator.SegmentRasterizer()
+    texts = _sample_texts()
+    return lambda: r.render(next(texts))
+
+
+@benchmark('raster.frame_png')
+def _raster_frame_png():
+    r = calculator.SegmentRasterizer()
+    texts = _sample_texts()
+    return lambda: r.render_png(next(texts))
+
+
+@benchmark('raster.frame_array')
+def _raster_frame_array():
+    r = calculator.SegmentRasterizer()
+    texts = _sample_texts()
+    return lambda: r.render_array(next(texts))
+
+
+def _display_case(render: str):
+    root = _tk_root()
+    rss0 = _rss_kb()
+    disp = calculator.SevenSegment(root, digits=12, render=render)
+    disp.pack()
+    root.update()
+    texts = _sample_texts()
+
+    def op():
+        disp.set_text(next(texts))
+        disp.update_idletasks()
+
+    def extra():
+        rss1 = _rss_kb()
+        return {
+            'render_mode': disp.render_mode,
+            'canvas_items': len(disp.find_all()),
+            'tk_images': len(root.image_names()),
+            'rss_delta_kb': None if rss0 is None or rss1 is None else rss1 - rss0,
+        }
+
+    op.extra = extra
+    return op
+
+
+@benchmark('display.update[polygons]')
+def _display_polygons():
+    return _display_case('polygons')
+
+
+@benchmark('display.update[images]')
+def _display_images():
+    return _display_case('images')
+
+
+_calc = None
+
+
+def _calculator() -> calculator.Calculator:
+    """Return a shared Calculator instance, raising RuntimeError without a display."""
+    global _calc
+    if _calc is None:
+        try:
+            _calc = calculator.Calculator(session=None)
+        except tk.TclError as e:
+            raise RuntimeError(f'no display ({e})')
+        _calc.update()
+    return _calc
+
+
+EXPRESSIONS = ['12+34*5', '7/3-2.5', '1e3*(4-1.5)/7', '123456789*987654321', '-5+3*-2', '99%7+0.1']
+
+
+@benchmark('calc.evaluate')
+def _calc_evaluate():
+    calc = _calculator()
+    exprs = itertools.cycle(EXPRESSIONS)
+    state = {'n': 0}
+
+    def op():
+        calc.current = next(exprs)
+        calc._evaluate()
+        # keep the history list from growing without bound across runs
+        state['n'] += 1
+        if state['n'] % 1000 == 0:
+            calc.hist_list.delete(0, 'end')
+    return op
+
+
+@benchmark('calc.update_display')
+def _calc_update_display():
+    calc = _calculator()
+    texts = _sample_texts()
+
+    def op():
+        calc._update_display('12+' + next(texts))
+        calc.update_idletasks()
+    return op
+
+
+def _huge_int(digits: int) -> int:
+    # a power of 3 with about `digits` decimal digits, cheap to build
+    return 3 ** int(digits / math.log10(3))
+
+
+@benchmark('format.result[1M digits]')
+def _format_1m():
+    n = _huge_int(1_000_000)
+    return lambda: calculator.fit_number(calculator.format_result(n), 12)
+
+
+@benchmark('format.result[10M digits]')
+def _format_10m():
+    n = -_huge_int(10_000_000)
+    return lambda: calculator.fit_number(calculator.format_result(n), 12, 'eng')
+
+
+@benchmark('format.to_base[1M digits]')
+def _to_base_1m():
+    # decimal text of a million-digit programmer-mode result (fresh value, cached powers)
+    n = _huge_int(1_000_000)
+    return lambda: calculator.to_base(n, 10)
+
+
+@benchmark('calc.preview[5000 terms]')
+def _calc_preview():
+    # keystrokes at the end of a long expression; the prefix comes from checkpoints
+    text = '+'.join(f'{i % 97}*{i % 13 + 1}' for i in range(2500))
+    ev = calculator.PrefixEvaluator()
+    ev.update(text)
+    suffixes = itertools.cycle(['+1', '+12', '+12*', '+12*3', '+12*', '+12', '+1', ''])
+    return lambda: ev.update(text + next(suffixes))
+
+
+@benchmark('assets.keycaps')
+def _assets_keycaps():
+    if calculator.Image is None:
+        raise RuntimeError('Pillow is not installed')
+    root = _tk_root()
+    return lambda: calculator.load_keycap_images(root)
+
+
+@benchmark('assets.click_synth')
+def _assets_click_synth():
+    params = itertools.cycle([p for _, p in calculator.CLICK_VARIANTS])
+    return lambda: calculator.synth_click(next(params))
+
+
+@benchmark('sound.mix')
+def _sound_mix():
+    # a click every 30 ms on a simulated clock, so up to two earlier voices are still ringing
+    class Discard:
+        def play(self, frames, at):
+            pass
+    clock = itertools.count(0, 0.03).__next__
+    mixer = calculator.ClickMixer(Discard(), clock=clock)
+    name, params = calculator.CLICK_VARIANTS[0]
+    wav = calculator._wav_bytes(calculator.synth_click(params))
+    return lambda: mixer.trigger(name, wav)
+
+
+@benchmark('assets.window_icon')
+def _assets_window_icon():
+    root = _tk_root()
+    return lambda: calculator.make_window_icon(root)
+
+
+@benchmark('startup.calculator')
+def _startup_calculator():
+    _tk_root()  # fail fast when there is no display
+
+    def op():
+        app = calculator.Calculator(session=None)
+        app.update()
+        app.destroy()
+    return op
+
+
+@benchmark('startup.window')
+def _startup_window():
+    calc = _calculator()  # first window builds the shared asset registry
+
+    def op():
+        win = calc.new_window()
+        win.update()
+        win.destroy()
+    return op
+
+
+def compare(baseline: dict, results: dict, threshold: float) -> bool:
+    """Print a comparison table; return True when any shared case regressed."""
+    regressed = False
+    base = baseline.get('results', {})
+    new = results.get('results', {})
+    for name in sorted(set(base) | set(new)):
+        if name not in base or name not in new:
+            print(f'{name:<28} {"only in " + ("new" if name in new else "baseline"):>30}')
+            continue
+        old_us, new_us = base[name]['per_op_us'], new[name]['per_op_us']
+        change = (new_us - old_us) / old_us if old_us else 0.0
+        flag = ''
+        if change > threshold:
+            flag = 'REGRESSION'
+            regressed = True
+        elif change < -threshold:
+            flag = 'improved'
+        print(f'{name:<28} {old_us:>12.2f} -> {new_us:>12.2f} us/op {change:>+8.1%} {flag}'.rstrip())
+    return regressed
+
+
+def run(name_filter: str = '', min_time: float = 0.5) -> dict:
+    """Run matching cases, print one line per case and return the results document."""
+    _start_xvfb()
+    results = {}
+    for name, factory in BENCHMARKS.items():
+        if name_filter not in name:
+            continue
+        try:
+            res = run_case(factory, min_time)
+        except RuntimeError as e:
+            # optional dependency or display missing
+            print(f'{name:<28} skipped: {e}')
+            continue
+        results[name] = res
+        extras = ' '.join(f'{k}={v}' for k, v in res.items() if k not in ('runs', 'per_op_us', 'ops_per_s'))
+        print(f"{name:<28} {res['per_op_us']:>12.2f} us/op {res['ops_per_s']:>12.0f} ops/s {extras}".rstrip())
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'pillow': getattr(sys.modules.get('PIL'), '__version__', None),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Run calculator micro-benchmarks.')
+    parser.add_argument('filter', nargs='?', default='', help='only run cases whose name contains this')
+    parser.add_argument('--min-time', type=float, default=0.5, help='seconds to spend per case')
+    parser.add_argument('--save', metavar='JSON', help='write results to this file')
+    parser.add_argument('--compare', metavar='BASELINE', help='compare against a saved baseline')
+    parser.add_argument('--results', metavar='JSON', help='with --compare: use saved results instead of running')
+    parser.add_argument('--threshold', type=float, default=0.15, help='relative slowdown counted as a regression')
+    args = parser.parse_args()
+
+    if args.results:
+        with open(args.results, encoding='utf-8') as fh:
+            results = json.load(fh)
+    else:
+        results = run(args.filter, args.min_time)
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as fh:
+            json.dump(results, fh, indent=2)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as fh:
+            baseline = json.load(fh)
+        print()
+        if compare(baseline, results, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -15,7 +15,7 @@ This script:
  - creates and activates a venv at .venv
  - installs requirements from requirements.txt
  - runs PyInstaller in --onefile --windowed mode
- - embeds the generated click WAVs into the bundle
+ - packs the click WAVs, keycaps and icons into assets.pak and embeds it in the bundle
 #>
 param(
     [string]$IconPath = ''
@@ -35,11 +35,13 @@ if (Test-Path requirements.txt) {
     pip install pyinstaller pillow
 }
 
+# Pack sounds, keycaps and icons into a single memory-mapped bundle
+Write-Host "[build] Packing assets.pak..."
+python build_assets.py
+
 # Prepare add-data arguments for PyInstaller (PowerShell + Windows: use SRC;DEST)
 $addData = @(
-    "click_snap.wav;.",
-    "click_thock.wav;.",
-    "click_balanced.wav;."
+    "assets.pak;."
 )
 $addArgs = @()
 foreach ($a in $addData) { $addArgs += "--add-data"; $addArgs += $a }
@@ -0,0 +1,315 @@
+"""Incremental build pipeline for the calculator's generated assets.
+
+Every asset is produced by a step in a small dependency graph:
+
+    click_*.wav               <- CLICK_VARIANTS parameters (synth_click)
+    generated_icon.png        <- icon_pixels, the art used for the window icon
+    calculator.ico            <- generated_icon.png (16-64px frames)
+    calculator_multi.ico      <- generated_icon.png (16-256px frames)
+    keycaps/keycap_*.png      <- render_keycap, one step per keypad label
+    assets.pak                <- all of the above
+
+Usage:
+
+    python build_assets.py              # build whatever is out of date
+    python build_assets.py icon         # only icon steps (and what they need)
+    python build_assets.py --force      # rebuild everything
+    python build_assets.py --list       # show steps and whether they are stale
+    python build_assets.py bundle -o dist\\assets.pak
+
+A step is stale when its outputs are missing or the hash of its inputs changed:
+its parameters, the source of the calculator functions that draw it and the
+contents of its input files. Hashes are kept in `.asset_stamps.json`.
+Independent steps run in parallel worker processes (`-j` to limit them).
+
+Icon and keycap steps need Pillow; without it only the WAVs and the bundle are
+built, and existing .ico files are packed as they are.
+"""
+from __future__ import annotations
+
+import argparse
+import concurrent.futures
+import hashlib
+import inspect
+import json
+import os
+import random
+import sys
+
+import calculator
+
+STAMPS_NAME = '.asset_stamps.json'
+ICON_PNG = 'generated_icon.png'
+ICO_SIZES = [(16, 16), (24, 24), (32, 32), (48, 48), (64, 64)]
+MULTI_ICO_SIZES = ICO_SIZES + [(128, 128), (256, 256)]
+
+
+class Step:
+    """One node of the graph: `func(params, inputs, outputs)` writes every path in `outputs`.
+
+    `code` lists extra functions whose source is part of the step's hash, so
+    editing the drawing code in calculator.py makes the step stale.
+    """
+
+    def __init__(self, name, func, outputs, inputs=(), params=None, code=()) -> None:
+        self.name = name
+        self.func = func
+        self.outputs = list(outputs)
+        self.inputs = list(inputs)
+        self.params = params or {}
+        self.code = tuple(code)
+
+    def fingerprint(self) -> str:
+        h = hashlib.sha256()
+        h.update(json.dumps([self.name, self.params], sort_keys=True).encode('utf-8'))
+        for fn in (self.func,) + self.code:
+            h.update(inspect.getsource(fn).encode('utf-8'))
+        for path in self.inputs:
+            h.update(os.path.basename(path).encode('utf-8'))
+            h.update(_file_digest(path))
+        return h.hexdigest()
+
+
+def _file_digest(path: str) -> bytes:
+    try:
+        with open(path, 'rb') as fh:
+            return hashlib.sha256(fh.read()).digest()
+    except OSError:
+        return b'missing'
+
+
+# step functions run in worker processes, so they live at module level
+
+def _build_wav(params: dict, inputs: list, outputs: list) -> None:
+    # seeded noise so a rebuild with unchanged parameters gives identical bytes
+    frames = calculator.synth_click(params['click'], rng=random.Random(params['seed']))
+    calculator.write_wav(outputs[0], frames)
+
+
+def icon_image(size: int = 64):
+    """Return the window icon art as an RGBA PIL image."""
+    img = calculator.Image.new('RGBA', (size, size))
+    img.putdata([
+        (int(c[1:3], 16), int(c[3:5], 16), int(c[5:7], 16), 255)
+        for row in calculator.icon_pixels(size) for c in row
+    ])
+    return img
+
+
+def _build_icon_png(params: dict, inputs: list, outputs: list) -> None:
+    icon_image(params['size']).save(outputs[0], format='PNG')
+
+
+def _build_ico(params: dict, inputs: list, outputs: list) -> None:
+    sizes = [tuple(s) for s in params['sizes']]
+    with calculator.Image.open(inputs[0]) as src:
+        im = src.convert('RGBA')
+    largest = max(sizes)
+    if im.size < largest:
+        im = im.resize(largest, calculator.Image.LANCZOS)
+    im.save(outputs[0], format='ICO', sizes=sizes)
+
+
+def _build_keycap(params: dict, inputs: list, outputs: list) -> None:
+    os.makedirs(os.path.dirname(outputs[0]), exist_ok=True)
+    calculator.render_keycap(params['label']).save(outputs[0], format='PNG')
+
+
+def _build_bundle(params: dict, inputs: list, outputs: list) -> None:
+    entries = {}
+    for name, path in zip(params['names'], inputs):
+        if os.path.exists(path):
+            with open(path, 'rb') as fh:
+                entries[name] = fh.read()
+    calculator.write_bundle(outputs[0], entries)
+
+
+def build_graph(root: str, bundle_path: str | None = None) -> dict[str, Step]:
+    """Return the asset steps for a source tree rooted at `root`, keyed by name."""
+    steps = []
+    packed = []  # (bundle name, path)
+    for name, params in calculator.CLICK_VARIANTS:
+        path = os.path.join(root, name)
+        steps.append(Step('wav:' + name, _build_wav, [path], params={'click': params, 'seed': name},
+                          code=(calculator.synth_click, calculator.write_wav)))
+        packed.append((name, path))
+    png = os.path.join(root, ICON_PNG)
+    icos = [('calculator.ico', ICO_SIZES), ('calculator_multi.ico', MULTI_ICO_SIZES)]
+    if calculator.Image is not None:
+        steps.append(Step('icon:png', _build_icon_png, [png], params={'size': 64},
+                          code=(calculator.icon_pixels, icon_image)))
+        packed.append(('icons/window_64.png', png))
+        for name, sizes in icos:
+            path = os.path.join(root, name)
+            steps.append(Step('icon:' + name, _build_ico, [path], inputs=[png], params={'sizes': sizes}))
+            packed.append(('icons/' + name, path))
+        font = getattr(calculator.load_keycap_font(), 'path', None)
+        font = font if isinstance(font, str) else None  # Pillow's built-in font has no file
+        for lbl in calculator.KEYPAD_LABELS:
+            fname = calculator.keycap_filename(lbl)
+            path = os.path.join(root, 'keycaps', fname)
+            steps.append(Step('keycap:' + lbl, _build_keycap, [path],
+                              params={'label': lbl, 'font': font, 'size': calculator.KEYCAP_SIZE,
+                                      'palette': calculator.THEMES[calculator.DEFAULT_THEME]['keycap']},
+                              code=(calculator.render_keycap, calculator.load_keycap_font, calculator.get_font)))
+            packed.append(('keycaps/' + fname, path))
+    else:
+        # no Pillow: pack the checked-in icons as plain source files
+        packed.extend(('icons/' + name, os.path.join(root, name)) for name, _ in icos)
+    bundle_path = bundle_path or os.path.join(root, calculator.ASSET_BUNDLE_NAME)
+    steps.append(Step('bundle', _build_bundle, [bundle_path], inputs=[p for _, p in packed],
+                      params={'names': [n for n, _ in packed]}))
+    check_graph(steps)
+    return {s.name: s for s in steps}
+
+
+def check_graph(steps: list[Step]) -> None:
+    """Raise ValueError when two steps write the same file or the bundle repeats a name.
+
+    Steps of one level run in parallel, so a shared output would be written
+    by two processes at once.
+    """
+    writers = {}
+    for s in steps:
+        for path in s.outputs:
+            other = writers.setdefault(os.path.normcase(os.path.abspath(path)), s.name)
+            if other != s.name:
+                raise ValueError(f'steps {other} and {s.name} both write {path}')
+        names = s.params.get('names', ()) if s.name == 'bundle' else ()
+        dupes = sorted({n for n in names if names.count(n) > 1})
+        if dupes:
+            raise ValueError(f'bundle entries named more than once: {", ".join(dupes)}')
+
+
+def _select(steps: dict[str, Step], targets) -> list[Step]:
+    """Return the steps matching `targets` (names or 'group' prefixes) plus their dependencies."""
+    producers = {p: s for s in steps.values() for p in s.outputs}
+    wanted = [s for s in steps.values()
+              if not targets or any(s.name == t or s.name.startswith(t + ':') for t in targets)]
+    if targets and not wanted:
+        raise KeyError(f'no asset step matches {", ".join(targets)}')
+    selected = {}
+    stack = list(wanted)
+    while stack:
+        s = stack.pop()
+        if s.name in selected:
+            continue
+        selected[s.name] = s
+        stack.extend(producers[p] for p in s.inputs if p in producers)
+    # keep graph order, which is already topological
+    return [s for s in steps.values() if s.name in selected]
+
+
+def _levels(steps: list[Step]) -> list[list[Step]]:
+    # group steps so each level only depends on earlier ones
+    producers = {p: s for s in steps for p in s.outputs}
+    depth = {}
+    for s in steps:
+        deps = [producers[p] for p in s.inputs if p in producers]
+        depth[s.name] = 1 + max((depth[d.name] for d in deps), default=-1)
+    levels = [[] for _ in range(max(depth.values(), default=-1) + 1)]
+    for s in steps:
+        levels[depth[s.name]].append(s)
+    return levels
+
+
+def _load_stamps(path: str) -> dict:
+    try:
+        with open(path, encoding='utf-8') as fh:
+            return json.load(fh)
+    except Exception:
+        return {}
+
+
+def _save_stamps(path: str, stamps: dict) -> None:
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as fh:
+        json.dump(stamps, fh, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def is_stale(step: Step, stamps: dict) -> bool:
+    return stamps.get(step.name) != step.fingerprint() or not all(os.path.exists(p) for p in step.outputs)
+
+
+def build(steps: dict[str, Step], stamps_path: str, targets=None, force: bool = False,
+          jobs: int | None = None) -> list[str]:
+    """Bring the selected steps up to date; return the names of the steps that ran.
+
+    Raises RuntimeError naming the failed steps; stamps of steps that did
+    succeed are kept so the next run only retries what failed.
+    """
+    stamps = _load_stamps(stamps_path)
+    built = []
+    pool = None
+    try:
+        for level in _levels(_select(steps, targets)):
+            # inputs of this level are final now, so the hashes are too
+            todo = [(s, s.fingerprint()) for s in level if force or is_stale(s, stamps)]
+            if not todo:
+                continue
+            if jobs == 1 or len(todo) == 1:
+                results = []
+                for s, _ in todo:
+                    try:
+                        s.func(s.params, s.inputs, s.outputs)
+                        results.append(None)
+                    except Exception as e:
+                        results.append(e)
+            else:
+                if pool is None:
+                    pool = concurrent.futures.ProcessPoolExecutor(max_workers=jobs)
+                futures = [pool.submit(s.func, s.params, s.inputs, s.outputs) for s, _ in todo]
+                results = [f.exception() for f in futures]
+            failed = []
+            for (s, fp), err in zip(todo, results):
+                if err is None:
+                    stamps[s.name] = fp
+                    built.append(s.name)
+                    print(f'built {s.name}')
+                else:
+                    stamps.pop(s.name, None)
+                    failed.append(f'{s.name}: {err}')
+            _save_stamps(stamps_path, stamps)
+            if failed:
+                raise RuntimeError('asset steps failed:\n  ' + '\n  '.join(failed))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return built
+
+
+def main(argv=None) -> int:
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description='Build the calculator assets incrementally.')
+    parser.add_argument('targets', nargs='*', help='step names or groups (wav, icon, keycap, bundle); default: all')
+    parser.add_argument('--root', default=here, help='directory the assets are written to')
+    parser.add_argument('-o', '--output', help='bundle path (default: assets.pak under --root)')
+    parser.add_argument('-f', '--force', action='store_true', help='rebuild even if up to date')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='parallel workers (default: CPU count)')
+    parser.add_argument('--list', action='store_true', help='list steps and whether they are stale')
+    args = parser.parse_args(argv)
+
+    try:
+        steps = build_graph(args.root, args.output)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    stamps_path = os.path.join(args.root, STAMPS_NAME)
+    if args.list:
+        stamps = _load_stamps(stamps_path)
+        for s in _select(steps, args.targets):
+            print(f'{s.name:<28} {"stale" if is_stale(s, stamps) else "ok"}')
+        return 0
+    try:
+        built = build(steps, stamps_path, args.targets, args.force, args.jobs)
+    except (KeyError, RuntimeError) as e:
+        print(e.args[0], file=sys.stderr)
+        return 1
+    if not built:
+        print('assets up to date')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,179 +4,2682 @@ Authentic seven-segment polygons, improved layout and keyboard support.
 """
 from __future__ import annotations
 
+import argparse
+import array
+import atexit
+import base64
+import bisect
+import collections
+import decimal
+import functools
+import hmac
+import inspect
 import json
+import logging
+import logging.handlers
 import math
+import mmap
+import operator
 import os
+import queue
+import re
+import secrets
+import socket
 import time
 import wave
 import struct
 import random
+import threading
+import tracemalloc
+import types
 try:
     import winsound
 except Exception:
     winsound = None
+# one of these locks the session journal against a second calculator process
+try:
+    import fcntl
+except Exception:
+    fcntl = None
+try:
+    import msvcrt
+except Exception:
+    msvcrt = None
 
 # optional Pillow for rasterizing keycap art and generating PNG keycaps
 try:
     from PIL import Image, ImageDraw, ImageFont, ImageTk
 except Exception:
     Image = ImageDraw = ImageFont = ImageTk = None
+import io
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, filedialog, simpledialog
 import sys
 
-PREFS_PATH = os.path.join(os.path.expanduser("~"), ".calculator_prefs.json")
+PREFS_PATH = os.path.join(os.path.expanduser("~"), ".calculator_prefs.json")
+MEMORY_PATH = os.path.join(os.path.expanduser("~"), ".calculator_memory.json")
+SESSION_PATH = os.path.join(os.path.expanduser("~"), ".calculator_session.json")
+INSTANCE_PATH = os.path.join(os.path.expanduser("~"), ".calculator_instance.json")
+
+
+def resource_path(fname: str = '') -> str:
+    """Return an absolute path to a resource, supporting PyInstaller onefile (_MEIPASS).
+
+    If `fname` is empty this returns the resource directory. When running as a
+    PyInstaller onefile bundle the runtime extracts files to `sys._MEIPASS`.
+    """
+    base = getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__)))
+    if fname:
+        return os.path.join(base, fname)
+    return base
+
+
+LOG_PATH = os.path.join(os.path.expanduser("~"), ".calculator.log")
+log = logging.getLogger('calculator')
+_log_listener = None
+_log_lock = threading.Lock()
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    # hand the record over as is; formatting happens on the writer thread
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def start_logging(path: str = LOG_PATH, level: str | None = None) -> None:
+    """Route the 'calculator' loggers through a queue to a rotating log file.
+
+    Logging a message on the UI thread only enqueues the record; a background
+    listener formats it and writes it, opening the file on first write. The
+    level comes from `level`, $CALC_LOG_LEVEL or INFO. Safe to call repeatedly.
+    """
+    global _log_listener
+    with _log_lock:
+        if _log_listener is not None:
+            return
+        try:
+            log.setLevel((level or os.environ.get('CALC_LOG_LEVEL') or 'INFO').upper())
+        except ValueError:
+            log.setLevel(logging.INFO)
+        log.propagate = False
+        q = queue.SimpleQueue()
+        log.addHandler(_DeferredQueueHandler(q))
+        handler = logging.handlers.RotatingFileHandler(path, maxBytes=512 * 1024, backupCount=3, encoding='utf-8', delay=True)
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)-7s %(name)s: %(message)s'))
+        _log_listener = logging.handlers.QueueListener(q, handler)
+        _log_listener.start()
+        atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _log_listener
+    with _log_lock:
+        listener, _log_listener = _log_listener, None
+    if listener is None:
+        return
+    listener.stop()
+    for h in listener.handlers:
+        h.close()
+    for h in list(log.handlers):
+        if isinstance(h, _DeferredQueueHandler):
+            log.removeHandler(h)
+
+
+ASSET_BUNDLE_NAME = 'assets.pak'
+ASSET_BUNDLE_MAGIC = b'CALCPAK1'
+
+
+class AssetBundle:
+    """Read-only view of a packed asset file (see `write_bundle`).
+
+    Layout: 8-byte magic, little-endian uint32 index length, a UTF-8 JSON index
+    mapping asset names to [offset, length], then the raw asset bytes. The file
+    is memory-mapped once; `get` returns zero-copy memoryview slices of it.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, 'rb') as fh:
+            self._mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mm)
+        head = len(ASSET_BUNDLE_MAGIC)
+        if bytes(self._view[:head]) != ASSET_BUNDLE_MAGIC:
+            self.close()
+            raise ValueError(f'{path}: not an asset bundle')
+        (index_len,) = struct.unpack_from('<I', self._mm, head)
+        start = head + 4
+        self.index = json.loads(bytes(self._view[start:start + index_len]).decode('utf-8'))
+
+    def names(self) -> list[str]:
+        return list(self.index)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.index
+
+    def get(self, name: str) -> memoryview | None:
+        entry = self.index.get(name)
+        if entry is None:
+            return None
+        off, length = entry
+        return self._view[off:off + length]
+
+    def close(self) -> None:
+        try:
+            self._view.release()
+            self._mm.close()
+        except Exception:
+            pass
+
+
+def write_bundle(path: str, entries: dict[str, bytes]) -> None:
+    """Pack `entries` (name -> bytes) into an asset bundle at `path`."""
+    names = sorted(entries)
+    # offsets depend on the index size, which depends on the offsets: iterate until stable
+    index_len = 0
+    while True:
+        off = len(ASSET_BUNDLE_MAGIC) + 4 + index_len
+        index = {}
+        for name in names:
+            index[name] = [off, len(entries[name])]
+            off += len(entries[name])
+        blob = json.dumps(index, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+        if len(blob) == index_len:
+            break
+        index_len = len(blob)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as fh:
+        fh.write(ASSET_BUNDLE_MAGIC)
+        fh.write(struct.pack('<I', index_len))
+        fh.write(blob)
+        for name in names:
+            fh.write(entries[name])
+    os.replace(tmp, path)
+
+
+_asset_bundle = None
+
+
+def asset_bundle() -> AssetBundle | None:
+    """Return the process-wide bundle from the resource directory, or None if absent."""
+    global _asset_bundle
+    if _asset_bundle is None:
+        try:
+            _asset_bundle = AssetBundle(resource_path(ASSET_BUNDLE_NAME))
+            log.getChild('assets').info('using %s (%d assets)', _asset_bundle.path, len(_asset_bundle.index))
+        except (OSError, ValueError) as e:
+            log.getChild('assets').info('no asset bundle: %s', e)
+            _asset_bundle = False
+    return _asset_bundle or None
+
+
+class Metrics:
+    """Hot-path counters and latency histograms (nanoseconds via `perf_counter_ns`).
+
+    Recording is skipped entirely while `enabled` is False, so instrumented code
+    pays one attribute check. Histograms use log-linear buckets (four per power
+    of two), which keeps memory constant and percentiles within about 12%.
+
+    Metrics are on while they were requested (CALC_METRICS or `enable`) or
+    any performance overlay is open; closing an overlay leaves a request alone.
+    """
+
+    def __init__(self) -> None:
+        self.requested = bool(os.environ.get('CALC_METRICS'))
+        self.overlays = 0  # open performance overlays
+        self.enabled = self.requested
+        self.counters = {}
+        self.histograms = {}  # name -> [count, total_ns, max_ns, {bucket: n}]
+
+    def enable(self) -> None:
+        self.requested = True
+        self.enabled = True
+
+    def overlay_opened(self) -> None:
+        self.overlays += 1
+        self.enabled = True
+
+    def overlay_closed(self) -> None:
+        self.overlays = max(0, self.overlays - 1)
+        self.enabled = self.requested or self.overlays > 0
+
+    def reset(self) -> None:
+        self.counters.clear()
+        self.histograms.clear()
+
+    def incr(self, name: str, n: int = 1) -> None:
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    @staticmethod
+    def _bucket(ns: int) -> int:
+        e = ns.bit_length() - 1
+        if e < 3:
+            return max(0, ns)
+        return 8 + (e - 3) * 4 + ((ns >> (e - 2)) & 3)
+
+    @staticmethod
+    def _bucket_bounds(idx: int) -> tuple[int, int]:
+        if idx < 8:
+            return idx, idx + 1
+        e, sub = (idx - 8) // 4 + 3, (idx - 8) % 4
+        lo = (4 + sub) << (e - 2)
+        return lo, lo + (1 << (e - 2))
+
+    def observe(self, name: str, ns: int) -> None:
+        if not self.enabled:
+            return
+        h = self.histograms.get(name)
+        if h is None:
+            h = self.histograms[name] = [0, 0, 0, {}]
+        h[0] += 1
+        h[1] += ns
+        if ns > h[2]:
+            h[2] = ns
+        b = self._bucket(ns)
+        h[3][b] = h[3].get(b, 0) + 1
+
+    def count(self, name: str) -> int:
+        h = self.histograms.get(name)
+        return h[0] if h else self.counters.get(name, 0)
+
+    def percentile(self, name: str, pct: float) -> float:
+        """Approximate `pct` percentile of `name` in nanoseconds (bucket midpoint)."""
+        h = self.histograms.get(name)
+        if not h or not h[0]:
+            return 0.0
+        target = max(1, math.ceil(h[0] * pct / 100.0))
+        seen = 0
+        for idx in sorted(h[3]):
+            seen += h[3][idx]
+            if seen >= target:
+                lo, hi = self._bucket_bounds(idx)
+                return min((lo + hi) / 2, h[2])
+        return float(h[2])
+
+    def snapshot(self) -> dict:
+        """Return all counters and histogram summaries as JSON-serializable data."""
+        hists = {}
+        for name, (n, total, mx, buckets) in self.histograms.items():
+            hists[name] = {
+                'count': n, 'mean_ns': total / n if n else 0, 'max_ns': mx,
+                'p50_ns': self.percentile(name, 50), 'p95_ns': self.percentile(name, 95),
+                'p99_ns': self.percentile(name, 99),
+                'buckets': {str(self._bucket_bounds(i)[0]): c for i, c in sorted(buckets.items())},
+            }
+        return {'counters': dict(self.counters), 'histograms': hists}
+
+    def export_json(self, path: str, extra: dict | None = None) -> None:
+        data = self.snapshot()
+        if extra:
+            data.update(extra)
+        with open(path, 'w', encoding='utf-8') as fh:
+            json.dump(data, fh, indent=2)
+
+
+METRICS = Metrics()
+
+
+def timed(name: str):
+    """Decorator recording the wrapped call's latency into `METRICS` under `name`."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kw):
+            if not METRICS.enabled:
+                return fn(*args, **kw)
+            t0 = time.perf_counter_ns()
+            try:
+                return fn(*args, **kw)
+            finally:
+                METRICS.observe(name, time.perf_counter_ns() - t0)
+        return wrapper
+    return deco
+
+
+class MemoryProfile:
+    """tracemalloc diagnostics: growth per init phase and steady-state samples.
+
+    `start()` begins tracing (before the Tk root is created, to see all of
+    startup). `mark(phase)` records what was allocated since the previous mark
+    and `sample()` the totals now, both split into subsystems by the innermost
+    function on each allocation's traceback that `MEMORY_SUBSYSTEMS` claims.
+    Tk's own memory (canvas items, image pixels, listbox entries) is invisible
+    to tracemalloc; windows add counts of those to each sample.
+    """
+
+    FRAMES = 25  # deep enough to reach calculator code from inside Pillow or tkinter
+    INTERVAL_MS = 10000  # steady-state sampling period
+
+    def __init__(self) -> None:
+        self.phases = []
+        self.samples = collections.deque(maxlen=60)
+        self.report_path = None  # written when the last window closes
+        self._last = None
+        self._t0 = 0.0
+        self._table = None  # filename -> (starts, ends, names), built on first use
+
+    @property
+    def active(self) -> bool:
+        return self._last is not None and tracemalloc.is_tracing()
+
+    def start(self) -> None:
+        if self._table is None:
+            # build before tracing starts so the table isn't part of the profile
+            self._table = self._build_table()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.FRAMES)
+        self._t0 = time.perf_counter()
+        self._last = self._snapshot()
+
+    def stop(self) -> None:
+        self._last = None
+        tracemalloc.stop()
+
+    @staticmethod
+    def _snapshot() -> tracemalloc.Snapshot:
+        # leave out tracemalloc's own bookkeeping
+        return tracemalloc.take_snapshot().filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
+
+    @staticmethod
+    def _code_spans(obj):
+        """Yield (filename, first line, last line) for a function or every method of a class."""
+        if isinstance(obj, type):
+            for attr in vars(obj).values():
+                attr = getattr(attr, '__func__', getattr(attr, 'fget', attr))
+                if callable(attr):
+                    yield from MemoryProfile._code_spans(attr)
+            return
+        code = getattr(inspect.unwrap(obj), '__code__', None)
+        if code is None:
+            return
+        # nested functions have their own code objects, whose lines count too
+        stack, lines = [code], []
+        while stack:
+            c = stack.pop()
+            lines.append(c.co_firstlineno)
+            lines.extend(ln for _, _, ln in c.co_lines() if ln is not None)
+            stack.extend(k for k in c.co_consts if isinstance(k, types.CodeType))
+        yield code.co_filename, min(lines), max(lines)
+
+    def _build_table(self) -> dict:
+        # compiled code gives line ranges without reading or parsing any source
+        spans = {}
+        for name, objs in MEMORY_SUBSYSTEMS.items():
+            for obj in objs:
+                for path, first, last in self._code_spans(obj):
+                    spans.setdefault(path, []).append((first, last, name))
+        table = {}
+        for path, items in spans.items():
+            items.sort()
+            table[path] = ([s for s, _, _ in items], [e for _, e, _ in items], [n for _, _, n in items])
+        return table
+
+    def subsystem(self, traceback: tracemalloc.Traceback) -> str:
+        """Name the subsystem owning an allocation, or 'other'."""
+        if self._table is None:
+            self._table = self._build_table()
+        # frames run from the oldest call to the allocation; the innermost match wins
+        for frame in reversed(traceback):
+            spans = self._table.get(frame.filename)
+            if spans is None:
+                continue
+            starts, ends, names = spans
+            i = bisect.bisect_right(starts, frame.lineno) - 1
+            if i >= 0 and frame.lineno <= ends[i]:
+                return names[i]
+        return 'other'
+
+    def breakdown(self, snapshot: tracemalloc.Snapshot) -> dict[str, int]:
+        """Bytes currently held per subsystem."""
+        sizes = {}
+        for trace in snapshot.traces:
+            key = self.subsystem(trace.traceback)
+            sizes[key] = sizes.get(key, 0) + trace.size
+        return sizes
+
+    def mark(self, phase: str) -> None:
+        """Record the allocations made since the previous mark as `phase`."""
+        if not self.active:
+            return
+        snap = self._snapshot()
+        growth = {}
+        for stat in snap.compare_to(self._last, 'traceback'):
+            if stat.size_diff:
+                key = self.subsystem(stat.traceback)
+                growth[key] = growth.get(key, 0) + stat.size_diff
+        self.phases.append({
+            'phase': phase,
+            't_ms': round((time.perf_counter() - self._t0) * 1000, 1),
+            'growth_bytes': sum(growth.values()),
+            'by_subsystem': growth,
+        })
+        self._last = snap
+
+    def sample(self, extra: dict | None = None) -> None:
+        """Record the current per-subsystem totals (plus `extra`, e.g. Tk counts)."""
+        if not self.active:
+            return
+        snap = self._snapshot()
+        by = self.breakdown(snap)
+        entry = {
+            't_s': round(time.perf_counter() - self._t0, 1),
+            'traced_bytes': sum(by.values()),
+            'by_subsystem': by,
+        }
+        if extra:
+            entry.update(extra)
+        self.samples.append(entry)
+
+    def report(self, extra: dict | None = None) -> dict:
+        current, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        data = {
+            'tracing': self.active,
+            'traced_bytes': current,
+            'traced_peak_bytes': peak,
+            'phases': list(self.phases),
+            'steady_state': list(self.samples),
+            'current': self.breakdown(self._snapshot()) if self.active else {},
+        }
+        if extra:
+            data.update(extra)
+        return data
+
+    def export_json(self, path: str, extra: dict | None = None) -> None:
+        with open(path, 'w', encoding='utf-8') as fh:
+            json.dump(self.report(extra), fh, indent=2)
+
+
+MEMPROFILE = MemoryProfile()
+
+
+# Segment names per display kind, in bit order (bit 0 first). The decimal point
+# is the next bit after the last segment, i.e. `1 << kind`.
+#   7:  a..f clockwise from the top, g is the middle bar
+#   14: adds split middle bars (g1 left, g2 right), upper diagonals/vertical
+#       (h upper-left, i upper centre, j upper-right) and lower ones (k, l, m)
+#   16: as 14 but with the top and bottom bars split (a1/a2, d1/d2)
+SEG_NAMES = {
+    7: ('a', 'b', 'c', 'd', 'e', 'f', 'g'),
+    14: ('a', 'b', 'c', 'd', 'e', 'f', 'g1', 'g2', 'h', 'i', 'j', 'k', 'l', 'm'),
+    16: ('a1', 'a2', 'b', 'c', 'd1', 'd2', 'e', 'f', 'g1', 'g2', 'h', 'i', 'j', 'k', 'l', 'm'),
+}
+
+# 7-seg glyphs: digits, hex letters (b/d lower case so they differ from 8/0) and
+# what's needed for 'Error' and '-OF-'
+_GLYPHS_7 = {
+    '0': 'abcdef', '1': 'bc', '2': 'abdeg', '3': 'abcdg', '4': 'bcfg',
+    '5': 'acdfg', '6': 'acdefg', '7': 'abc', '8': 'abcdefg', '9': 'abcdfg',
+    'A': 'abcefg', 'b': 'cdefg', 'C': 'adef', 'c': 'deg', 'd': 'bcdeg',
+    'E': 'adefg', 'F': 'aefg', 'H': 'bcefg', 'L': 'def', 'n': 'ceg',
+    'O': 'abcdef', 'o': 'cdeg', 'P': 'abefg', 'r': 'eg', 'U': 'bcdef',
+    'u': 'cde', '-': 'g', '_': 'd', '=': 'dg', ' ': '',
+}
+
+# 14-seg glyphs (the 16-seg table is derived by splitting a and d). Digits and
+# the letters a 7-seg can draw reuse the 7-seg shapes with g -> g1 g2; the rest
+# of the alphabet uses the diagonals.
+_GLYPHS_14 = {
+    **{ch: segs.replace('g', 'g1g2') for ch, segs in _GLYPHS_7.items()},
+    '0': 'abcdefjk', '1': 'bcj',
+    'B': 'abcdg2il', 'D': 'abcdil', 'G': 'acdefg2', 'I': 'adil', 'J': 'bcde',
+    'K': 'efg1jm', 'M': 'bcefhj', 'N': 'bcefhm', 'Q': 'abcdefm',
+    'R': 'abefg1g2m', 'S': 'acdfg1g2', 'T': 'ail', 'V': 'efjk', 'W': 'bcefkm',
+    'X': 'hjkm', 'Y': 'hjl', 'Z': 'adjk', 'r': 'eg1', 'o': 'cdeg1g2',
+    '+': 'g1g2il', '*': 'g1g2hijklm', '/': 'jk', '(': 'jm', ')': 'hk',
+    '<': 'jm', '>': 'hk', '%': 'cfg1g2jk', '&': 'adeg1hjm', '|': 'il', '^': 'km',
+    '~': 'g1g2',
+}
+_GLYPHS_16 = {ch: segs.replace('a', 'a1a2').replace('d', 'd1d2') for ch, segs in _GLYPHS_14.items()}
+
+
+def _build_glyphs(spec: dict[str, str], kind: int) -> dict[str, int]:
+    index = {name: bit for bit, name in enumerate(SEG_NAMES[kind])}
+    return {ch: sum(1 << index[n] for n in re.findall(r'[a-m][12]?', segs)) for ch, segs in spec.items()}
+
+
+# Precomputed glyph bitmasks per display kind: {kind: {char: mask}}
+GLYPHS = {
+    7: _build_glyphs(_GLYPHS_7, 7),
+    14: _build_glyphs(_GLYPHS_14, 14),
+    16: _build_glyphs(_GLYPHS_16, 16),
+}
+
+# Segment patterns for 7-seg display: a,b,c,d,e,f,g (g is middle), where 1=on
+SEGMENTS = {ch: tuple((mask >> i) & 1 for i in range(7)) for ch, mask in GLYPHS[7].items()}
+
+
+def split_cells(text: str) -> list[tuple[str, bool]]:
+    """Split display text into (character, has_decimal_point) cells.
+
+    A '.' attaches to the preceding character so it lights that digit's point
+    instead of taking a slot of its own.
+    """
+    cells = []
+    for ch in text:
+        if ch == '.':
+            if cells and not cells[-1][1]:
+                cells[-1] = (cells[-1][0], True)
+            else:
+                cells.append((' ', True))
+            continue
+        cells.append((ch, False))
+    return cells
+
+
+@functools.lru_cache(maxsize=1024)
+def encode_text(text: str, kind: int = 7) -> tuple[int, ...]:
+    """Encode display text into one segment bitmask per cell (decimal point = bit `kind`).
+
+    Characters missing from the table fall back to their other case, then blank.
+    Results are cached since the display re-encodes the same strings constantly.
+    """
+    table = GLYPHS[kind]
+    dp_bit = 1 << kind
+    masks = []
+    for ch, has_dp in split_cells(text):
+        mask = table.get(ch)
+        if mask is None:
+            mask = table.get(ch.swapcase(), 0)
+        masks.append(mask | dp_bit if has_dp else mask)
+    return tuple(masks)
+
+
+def segment_polygons(x: float, y: float, s: float, t: float, kind: int = 7) -> tuple[list[tuple], tuple]:
+    """Return (polygons, dp_bbox) for one display cell at (x, y).
+
+    `s` is the segment length and `t` its thickness; polygons are flat point
+    tuples in `SEG_NAMES[kind]` order so they line up with glyph bitmask bits.
+    """
+    P = y
+    a = (x+t, P, x+t+s, P, x+t+s-t, P+t, x+t+t, P+t)
+    b = (x+t+s, P, x+t+s+t, P+t, x+t+s+t, P+t+s, x+t+s, P+t+s-t)
+    c = (x+t+s, P+t+s, x+t+s+t, P+t+s+t, x+t+s+t, P+t+s+t+s, x+t+s, P+t+s+t+s-t)
+    d = (x+t, P+t+s+t+s, x+t+s, P+t+s+t+s, x+t+s-t, P+t+s+t+s-t, x+t+t, P+t+s+t+s-t)
+    e = (x, P+t+s, x+t, P+t+s+t, x+t, P+t+s+t+s-t, x, P+t+s+t+s-t)
+    f = (x, P, x+t, P+t, x+t, P+t+s-t, x, P+t+s)
+    g = (x+t+t, P+t+s, x+t+s-t, P+t+s, x+t+s-t-t, P+t+s+t, x+t+t+t, P+t+s+t)
+    dp_r = max(2, t//1 + 2)
+    dp_x = x+t+s+t
+    dp_y = P+t+s+t+s - dp_r*2
+    dp = (dp_x, dp_y, dp_x+dp_r*2, dp_y+dp_r*2)
+    if kind == 7:
+        return [a, b, c, d, e, f, g], dp
+    # extra geometry for 14/16 segments: centre column, split bars, diagonals
+    gap = max(1, t // 3)
+    cx = x + t + s / 2
+    hw = t / 2
+    dw = t * 0.9
+    top, bot = P + t + gap, P + t + s + t + s - t - gap
+    m0, m1 = P + t + s, P + t + s + t
+    g1 = (x+t+t, m0, cx-gap, m0, cx-gap, m1, x+t+t+t, m1)
+    g2 = (cx+gap, m0, x+t+s-t, m0, x+t+s-t-t, m1, cx+gap, m1)
+    h = (x+t+gap, top, x+t+gap+dw, top, cx-hw-gap, m0-gap, cx-hw-gap-dw, m0-gap)
+    i = (cx-hw, top, cx+hw, top, cx+hw, m0-gap, cx-hw, m0-gap)
+    j = (x+t+s-gap-dw, top, x+t+s-gap, top, cx+hw+gap+dw, m0-gap, cx+hw+gap, m0-gap)
+    k = (cx-hw-gap-dw, m1+gap, cx-hw-gap, m1+gap, x+t+gap+dw, bot, x+t+gap, bot)
+    l = (cx-hw, m1+gap, cx+hw, m1+gap, cx+hw, bot, cx-hw, bot)
+    m = (cx+hw+gap, m1+gap, cx+hw+gap+dw, m1+gap, x+t+s-gap, bot, x+t+s-gap-dw, bot)
+    if kind == 14:
+        return [a, b, c, d, e, f, g1, g2, h, i, j, k, l, m], dp
+    yb = P+t+s+t+s
+    a1 = (x+t, P, cx-gap, P, cx-gap, P+t, x+t+t, P+t)
+    a2 = (cx+gap, P, x+t+s, P, x+t+s-t, P+t, cx+gap, P+t)
+    d1 = (x+t, yb, cx-gap, yb, cx-gap, yb-t, x+t+t, yb-t)
+    d2 = (cx+gap, yb, x+t+s, yb, x+t+s-t, yb-t, cx+gap, yb-t)
+    return [a1, a2, b, c, d1, d2, e, f, g1, g2, h, i, j, k, l, m], dp
+
+
+def _strip_mantissa(mant: str) -> str:
+    return mant.rstrip('0').rstrip('.') if '.' in mant else mant
+
+
+def fit_number(text: str, digits: int, notation: str = 'sci') -> str:
+    """Return `text` reformatted so it occupies at most `digits` cells.
+
+    Numbers that are too long are first rounded to fewer decimals and, if the
+    integer part alone is too wide, rendered in scientific notation ('1.234E15'),
+    or engineering notation with `notation='eng'` (exponent a multiple of 3,
+    '12.34E15'). Python exponent forms such as '1e+300' are normalized to the
+    same 'E' style; exponents beyond float range are fine. Text that isn't a
+    plain number is returned unchanged.
+    """
+    fits = len(split_cells(text)) <= digits
+    if fits and 'e' not in text.lower():
+        return text
+    try:
+        # Decimal rather than float: exact, and no overflow for results like '2e+400000'
+        v = decimal.Decimal(text)
+    except (TypeError, ValueError, decimal.InvalidOperation):
+        return text
+    if not v.is_finite():
+        return text
+    if not v:
+        return '0'
+    # fixed notation with fewer decimals when the integer part fits
+    int_cells = (max(0, v.adjusted()) + 1) + (1 if v < 0 else 0)
+    if not fits and int_cells <= digits and abs(v) >= _FIXED_MIN:
+        s = _strip_mantissa(f"{v:.{max(0, digits - int_cells)}f}")
+        if len(split_cells(s)) <= digits and decimal.Decimal(s):
+            return s
+    # scientific notation: shrink the mantissa until the whole thing fits;
+    # engineering notation falls back to it when even one digit is too wide
+    for eng in ((True, False) if notation == 'eng' else (False,)):
+        for prec in range(digits, -1, -1):
+            mant, exp = f"{v:.{prec}e}".split('e')
+            exp = int(exp)
+            if eng:
+                # move the point right so the exponent is a multiple of 3
+                shift = exp % 3
+                exp -= shift
+                mant = f"{decimal.Decimal(mant).scaleb(shift):f}"
+            s = f"{_strip_mantissa(mant)}E{exp}"
+            if len(split_cells(s)) <= digits:
+                return s
+    return text
+
+
+_FIXED_MIN = decimal.Decimal('1e-4')
+# integers up to this many bits (about 1000 digits) are printed exactly
+EXACT_INT_BITS = 3320
+# precision for the leading digits of larger integers; exponents are unbounded
+_BIG_INT_CONTEXT = decimal.Context(prec=30, Emax=decimal.MAX_EMAX, Emin=decimal.MIN_EMIN)
+
+
+def int_scientific(n: int, sig: int = 17) -> str:
+    """Return `n` as '1.2345e+1000000' with `sig` significant digits.
+
+    Only the top bits of `n` are converted: they are scaled by a power of two
+    in 30-digit Decimal arithmetic, so the cost doesn't grow with the number
+    of decimal digits and Python's int-to-str digit limit never applies.
+    """
+    shift = max(0, n.bit_length() - 128)  # 128 bits hold ~38 digits, well past `sig`
+    ctx = _BIG_INT_CONTEXT
+    d = ctx.multiply(decimal.Decimal(abs(n) >> shift), ctx.power(decimal.Decimal(2), shift))
+    mant, exp = f"{d:.{sig - 1}e}".split('e')
+    return f"{'-' if n < 0 else ''}{_strip_mantissa(mant)}e{exp}"
+
+
+def format_result(value) -> str:
+    """Format an evaluation result for the display and history.
+
+    Integral floats lose their trailing '.0'; other floats are limited to 12
+    significant digits to avoid long floating-point tails. Integers longer
+    than about 1000 digits are given in scientific notation (see
+    `int_scientific`) instead of being converted in full.
+    """
+    if isinstance(value, float):
+        if value.is_integer():
+            return str(int(value))
+        return f"{value:.12g}"
+    if isinstance(value, int) and value.bit_length() > EXACT_INT_BITS:
+        return int_scientific(value)
+    return str(value)
+
+
+# programmer mode: bases by menu name, the marker history puts after numbers in
+# each base, and word sizes in bits (0 = unbounded)
+PROGRAMMER_BASES = {'Hex': 16, 'Dec': 10, 'Oct': 8, 'Bin': 2}
+BASE_SUFFIX = {16: 'h', 10: '', 8: 'o', 2: 'b'}
+WORD_SIZES = (8, 16, 32, 64, 0)
+BASE_DIGITS = {2: '01', 8: '01234567', 10: '0123456789', 16: '0123456789ABCDEF'}
+_BASE_FORMAT = {2: 'b', 8: 'o', 16: 'X'}
+_BASE_PREFIX = {2: '0b', 8: '0o', 16: '0x'}
+_PROG_TOKEN_RE = re.compile(r'\s*(?:(<<|>>|[-+*/%&|^~()])|([0-9A-Fa-f]+))')
+_PROG_NUMBER_RE = re.compile(r'[0-9A-Fa-f]+')
+_DEC_CONTEXT = decimal.Context(prec=decimal.MAX_PREC, Emax=decimal.MAX_EMAX, Emin=decimal.MIN_EMIN)
+_DEC_LEAF_BITS = 1800  # ~540 digits; below this Decimal(int) and str() are cheap
+
+
+@functools.lru_cache(maxsize=256)
+def _decimal_pow2(bits: int) -> decimal.Decimal:
+    return _DEC_CONTEXT.power(decimal.Decimal(2), bits)
+
+
+def to_base(n: int, base: int) -> str:
+    """Return the digits of `n` in base 2, 8, 10 or 16 (upper-case hex, '-' if negative).
+
+    Power-of-two bases are a linear `format`. Decimal is divide and conquer:
+    the number is split at a power of two, the halves converted recursively
+    and recombined in Decimal arithmetic (subquadratic multiplication) with
+    the powers of two cached, where `str()` is quadratic and digit-limited.
+    """
+    if n < 0:
+        return '-' + to_base(-n, base)
+    if base != 10:
+        return format(n, _BASE_FORMAT[base])
+    if n.bit_length() <= _DEC_LEAF_BITS:
+        return str(n)
+    ctx = _DEC_CONTEXT
+
+    def conv(n: int, bits: int) -> decimal.Decimal:
+        if bits <= _DEC_LEAF_BITS:
+            return decimal.Decimal(n)
+        half = bits >> 1
+        hi = n >> half
+        lo = n - (hi << half)
+        return ctx.add(ctx.multiply(conv(hi, bits - half), _decimal_pow2(half)), conv(lo, half))
+
+    return str(conv(n, n.bit_length()))
+
+
+class ProgrammerValue:
+    """An integer result wrapped to a word size, with its text in each base converted once.
+
+    `value` holds the unsigned bits when `word` is set; decimal text shows the
+    two's complement signed value, the other bases the raw bits.
+    """
+
+    __slots__ = ('value', 'word', '_texts')
+
+    def __init__(self, value: int, word: int = 0) -> None:
+        self.word = word
+        self.value = value & ((1 << word) - 1) if word else value
+        self._texts = {}
+
+    def signed(self) -> int:
+        if self.word and self.value >> (self.word - 1):
+            return self.value - (1 << self.word)
+        return self.value
+
+    def text(self, base: int) -> str:
+        s = self._texts.get(base)
+        if s is None:
+            s = self._texts[base] = to_base(self.signed() if base == 10 else self.value, base)
+        return s
+
+
+def convert_programmer_expr(expr: str, src: int, dst: int) -> str:
+    """Rewrite every number in a programmer-mode expression from base `src` to `dst`."""
+    if src == dst:
+        return expr
+    return _PROG_NUMBER_RE.sub(lambda m: to_base(int(m.group(), src), dst), expr)
+
+
+def split_programmer_token(expr: str) -> tuple[str, str]:
+    """Split off the number being typed, with its unary minus: '5*-1F' -> ('5*', '-1F')."""
+    token = expr[len(expr.rstrip('0123456789ABCDEFabcdef')):]
+    prefix = expr[:len(expr) - len(token)]
+    # a '-' at the start or right after another operator is a sign, not a subtraction
+    if prefix.endswith('-') and (len(prefix) == 1 or prefix[-2] in '-+*/%&|^~(<>'):
+        return prefix[:-1], '-' + token
+    return prefix, token
+
+
+# unbounded word size: longest shift accepted (a 1 MiB-bit result)
+_PROG_MAX_SHIFT = 1 << 20
+
+
+class _WordInt:
+    """An integer operand of `eval_programmer`, wrapped to a signed word after every operation."""
+
+    __slots__ = ('v', 'word')
+
+    def __init__(self, v: int, word: int) -> None:
+        if word:
+            half = 1 << (word - 1)
+            v = ((v + half) & ((half << 1) - 1)) - half
+        self.v = v
+        self.word = word
+
+    def _shift_count(self, other: '_WordInt') -> int:
+        n = other.v
+        if n < 0:
+            raise ValueError('negative shift count')
+        if self.word:
+            return min(n, self.word)  # shifting a whole word out gives 0 (or -1 for >>)
+        if n > _PROG_MAX_SHIFT:
+            raise OverflowError('shift count too large')
+        return n
+
+    def _binop(fn):
+        def op(self, other):
+            return _WordInt(fn(self.v, other.v), self.word)
+        return op
+
+    __add__ = _binop(operator.add)
+    __sub__ = _binop(operator.sub)
+    __mul__ = _binop(operator.mul)
+    __floordiv__ = _binop(operator.floordiv)
+    __mod__ = _binop(operator.mod)
+    __and__ = _binop(operator.and_)
+    __or__ = _binop(operator.or_)
+    __xor__ = _binop(operator.xor)
+    del _binop
+
+    def __lshift__(self, other):
+        return _WordInt(self.v << self._shift_count(other), self.word)
+
+    def __rshift__(self, other):
+        return _WordInt(self.v >> self._shift_count(other), self.word)
+
+    def __neg__(self):
+        return _WordInt(-self.v, self.word)
+
+    def __pos__(self):
+        return self
+
+    def __invert__(self):
+        return _WordInt(~self.v, self.word)
+
+
+def eval_programmer(expr: str, base: int, word: int = 0) -> ProgrammerValue:
+    """Evaluate an integer expression typed in `base` with + - * / % & | ^ << >> ~ and parens.
+
+    With a word size, operands are read as two's complement signed values and
+    every intermediate result wraps to the word, as in a fixed-width register;
+    '>>' is an arithmetic shift and shifts by the word size or more shift
+    everything out. '/' is integer (floor) division. Raises ValueError for
+    characters or digits that don't belong and for negative shift counts,
+    SyntaxError for malformed expressions, ZeroDivisionError like Python and
+    OverflowError for a shift past _PROG_MAX_SHIFT with an unbounded word.
+    """
+    parts = []
+    pos = 0
+    expr = expr.rstrip()
+    while pos < len(expr):
+        m = _PROG_TOKEN_RE.match(expr, pos)
+        if m is None:
+            raise ValueError(f'unexpected {expr[pos]!r}')
+        op, num = m.groups()
+        if op is not None:
+            parts.append('//' if op == '/' else op)
+        else:
+            digits = num.upper()
+            if digits.strip(BASE_DIGITS[base]):
+                raise ValueError(f'{num!r} is not a base {base} number')
+            # Python literals: prefixed for 2/8/16, no leading zeros in decimal
+            literal = _BASE_PREFIX[base] + digits if base != 10 else digits.lstrip('0') or '0'
+            parts.append(f'W({literal})')
+        pos = m.end()
+    result = eval(' '.join(parts), {'__builtins__': {}, 'W': lambda v: _WordInt(v, word)}, {})
+    if not isinstance(result, _WordInt):
+        raise ValueError('not an integer result')
+    return ProgrammerValue(result.v, word)
+
+
+_NUMBER_RE = re.compile(r'(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?')
+_BINOPS = {'+': operator.add, '-': operator.sub, '*': operator.mul, '/': operator.truediv, '%': operator.mod}
+# parser frame: (sum of finished terms, pending + or -, product so far, pending * / %,
+#                unary minus pending, expecting an operand)
+_EMPTY_FRAME = (None, None, None, None, False, True)
+
+
+def _number(tok: str):
+    if tok.isdigit():
+        # like Python, '07' is not a valid literal ('00' is)
+        if len(tok) > 1 and tok[0] == '0' and tok.strip('0'):
+            raise SyntaxError(tok)
+        return int(tok)
+    return float(tok)
+
+
+def _add_term(acc, addop, term):
+    if acc is None:
+        return term
+    return acc + term if addop == '+' else acc - term
+
+
+def _running(frame):
+    # value of a frame so far, ignoring a trailing operator
+    acc, addop, term = frame[:3]
+    return acc if term is None else _add_term(acc, addop, term)
+
+
+def _feed_operand(state, v):
+    (acc, addop, term, mulop, neg, need), parent = state
+    if not need:
+        raise SyntaxError('operand follows operand')
+    if neg:
+        v = -v
+    if mulop is not None:
+        v = _BINOPS[mulop](term, v)
+    return ((acc, addop, v, None, False, False), parent)
+
+
+def _feed_operator(state, op):
+    frame, parent = state
+    acc, addop, term, mulop, neg, need = frame
+    if need:
+        # unary sign
+        if op == '-':
+            return ((acc, addop, term, mulop, not neg, True), parent)
+        if op == '+':
+            return state
+        raise SyntaxError(op)
+    if op in '*/%':
+        return ((acc, addop, term, op, False, True), parent)
+    return ((_add_term(acc, addop, term), op, None, None, False, True), parent)
+
+
+def common_prefix_len(a: str, b: str) -> int:
+    """Length of the common prefix of `a` and `b` (slice compares run in C)."""
+    if b.startswith(a):
+        return len(a)
+    if a.startswith(b):
+        return len(b)
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[:mid] == b[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+_PASTE_DECIMAL_RE = re.compile(r'[0-9.+*/()-]*')
+_PASTE_SPACE = str.maketrans('', '', ' \t\r\n\f\v')
+_DOUBLE_DOT_RE = re.compile(r'\.[0-9]*\.')
+_LEADING_DOT_RE = re.compile(r'(^|[^0-9.])\.')
+# an operator after an operator: the keys replace the first, except for one '-'
+# sign (the +/- key), so '**', '//', '+*' and '*--' can't be typed
+_PASTE_DECIMAL_OPS_RE = re.compile(r'[-+*/](?:[+*/]|-[-+*/])')
+_PASTE_PROG_OPS_RE = re.compile(r'(?:<<|>>|[-+*/%&|^])(?:<<|>>|[+*/%&|^]|-(?:<<|>>|[-+*/%&|^]))')
+
+
+class PasteBuffer:
+    """Pasted text validated and normalized one chunk at a time.
+
+    The text is appended to `prefix` as written minus whitespace. Operators
+    are not replaced as on the keys, so two in a row are rejected (other than
+    an operator and a '-' sign). Decimal numbers may have one '.', and a
+    leading '.' gets a '0' as on the keys; in programmer mode (`base` set)
+    digits must exist in the base and are upper-cased, and shifts must be
+    whole '<<' / '>>' operators. `feed` raises ValueError for anything the
+    keys can't enter.
+    """
+
+    def __init__(self, prefix: str, base: int | None = None) -> None:
+        self.base = base
+        if base is None:
+            self._valid = _PASTE_DECIMAL_RE
+            self._double_op = _PASTE_DECIMAL_OPS_RE
+            # the number being typed may go on in the pasted text
+            self._tail_chars = '0123456789.'
+            cut = len(prefix.rstrip(self._tail_chars))
+        else:
+            digits = BASE_DIGITS[base]
+            self._valid = re.compile(f'(?:[{digits}{digits.lower()}+*/%&|^~()-]|<<|>>)*')
+            self._double_op = _PASTE_PROG_OPS_RE
+            # a shift operator may be split between two chunks
+            self._tail_chars = '<>'
+            cut = len(prefix)
+        self._head = prefix[:cut]
+        self._carry = prefix[cut:]  # end of the text so far, checked once it is complete
+
+    def feed(self, chunk: str) -> None:
+        s = self._carry + chunk.translate(_PASTE_SPACE)
+        cut = len(s.rstrip(self._tail_chars))
+        self._carry = s[cut:]
+        self._head += self._check(s[:cut])
+
+    def _check(self, s: str) -> str:
+        if not self._valid.fullmatch(s):
+            raise ValueError('not calculator input')
+        # operators may run on from the text before `s`; what is there already stands
+        context = self._head[-3:]
+        for m in self._double_op.finditer(context + s):
+            if m.end() > len(context):
+                raise ValueError('operator after operator')
+        if self.base is not None:
+            return s.upper()
+        if _DOUBLE_DOT_RE.search(s):
+            raise ValueError('number with two decimal points')
+        return _LEADING_DOT_RE.sub(r'\g<1>0.', s)
+
+    def text(self) -> str:
+        """The text so far, without an end that may continue in the next chunk."""
+        return self._head
+
+    def finish(self) -> str:
+        return self._head + self._check(self._carry)
+
+
+class PrefixEvaluator:
+    """Running value of a calculator expression, updated incrementally as it is edited.
+
+    Follows Python's semantics for numbers, + - * / %, parentheses and unary
+    signs (what `_evaluate` hands to eval, and evaluates here instead when the
+    text is too long or deeply nested for Python's compiler). The parser state
+    after every operator and parenthesis is kept as an immutable checkpoint, so
+    `update()` only re-reads the text after the last checkpoint the new text
+    shares with the previous one: typing or deleting a key at the end costs
+    time for the current number and nesting depth, not for the terms before it.
+
+    The running value ignores a trailing operator and closes open parentheses;
+    it is None for text that isn't (a prefix of) a valid expression or whose
+    value is an error (division by zero, overflow, inf/nan).
+    """
+
+    def __init__(self) -> None:
+        self._text = ''
+        self._pos = [0]  # checkpoint offsets into _text, ascending
+        self._states = [(_EMPTY_FRAME, None)]  # (frame, parent state) after _text[:pos]
+        self._value = None
+        self._complete = False
+
+    @property
+    def value(self):
+        return self._value
+
+    @property
+    def complete(self) -> bool:
+        """True if the text is a whole expression: no trailing operator or open parenthesis."""
+        return self._complete
+
+    def update(self, text: str):
+        """Set the expression text and return its running value."""
+        old = self._text
+        if text == old:
+            return self._value
+        common = common_prefix_len(old, text)
+        k = bisect.bisect_right(self._pos, common) - 1
+        del self._pos[k + 1:]
+        del self._states[k + 1:]
+        self._text = text
+        self._value = self._parse(text, self._pos[k], self._states[k])
+        return self._value
+
+    def _parse(self, text: str, i: int, state):
+        n = len(text)
+        self._complete = False
+        try:
+            while i < n:
+                ch = text[i]
+                if ch == ' ':
+                    i += 1
+                    continue
+                m = _NUMBER_RE.match(text, i)
+                if m is not None:
+                    # numbers aren't checkpointed: the next key may extend them
+                    state = _feed_operand(state, _number(m.group()))
+                    i = m.end()
+                    continue
+                if ch in _BINOPS:
+                    state = _feed_operator(state, ch)
+                elif ch == '(':
+                    if not state[0][5]:
+                        raise SyntaxError('( after operand')
+                    state = (_EMPTY_FRAME, state)
+                elif ch == ')':
+                    frame, parent = state
+                    if parent is None or frame[5]:
+                        raise SyntaxError(')')
+                    state = _feed_operand(parent, _running(frame))
+                else:
+                    raise SyntaxError(ch)
+                i += 1
+                self._pos.append(i)
+                self._states.append(state)
+            # close open parentheses for the running value
+            frame, parent = state
+            self._complete = not frame[5] and parent is None
+            v = _running(frame)
+            while parent is not None:
+                if v is not None:
+                    frame = _feed_operand(parent, v)[0]
+                else:
+                    frame = parent[0]
+                v = _running(frame)
+                parent = parent[1]
+        except (SyntaxError, ValueError, ArithmeticError):
+            return None
+        if isinstance(v, float) and not math.isfinite(v):
+            return None
+        return v
+
+
+class MemoryRegister:
+    """A memory register keeping O(1) streaming statistics over its entries.
+
+    The total uses Neumaier (improved Kahan) compensated summation and the mean
+    is derived from it; the variance uses Welford's method, so nothing is
+    re-summed as entries arrive.
+    """
+
+    __slots__ = ('count', '_sum', '_comp', '_mean', '_m2', 'min', 'max')
+
+    def __init__(self) -> None:
+        self.clear()
+
+    def clear(self) -> None:
+        self.count = 0
+        self._sum = 0.0
+        self._comp = 0.0  # running compensation for lost low-order bits
+        self._mean = 0.0  # Welford's running mean, which only feeds _m2
+        self._m2 = 0.0  # sum of squared deviations from the mean
+        self.min = None
+        self.max = None
+
+    def add(self, x: float) -> None:
+        x = float(x)
+        self.count += 1
+        t = self._sum + x
+        if abs(self._sum) >= abs(x):
+            self._comp += (self._sum - t) + x
+        else:
+            self._comp += (x - t) + self._sum
+        self._sum = t
+        delta = x - self._mean
+        self._mean += delta / self.count
+        self._m2 += delta * (x - self._mean)
+        self.min = x if self.min is None else min(self.min, x)
+        self.max = x if self.max is None else max(self.max, x)
+
+    @property
+    def total(self) -> float:
+        return self._sum + self._comp
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def variance(self) -> float:
+        """Sample variance of the entries (0.0 with fewer than two)."""
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stdev(self) -> float:
+        return math.sqrt(self.variance)
+
+    def to_list(self) -> list:
+        return [self.count, self._sum, self._comp, self._mean, self._m2, self.min, self.max]
+
+    @classmethod
+    def from_list(cls, data: list) -> 'MemoryRegister':
+        reg = cls()
+        reg.count, reg._sum, reg._comp, reg._mean, reg._m2, reg.min, reg.max = data
+        reg.count = int(reg.count)
+        return reg
+
+
+class MemoryBank:
+    """Named memory registers plus the one MC/M+/M-/MR act on.
+
+    Persisted as one compact JSON line: each register is stored as its
+    statistics state (7 numbers), never as its entries.
+    """
+
+    DEFAULT = 'M'
+
+    def __init__(self) -> None:
+        self.registers = {self.DEFAULT: MemoryRegister()}
+        self.active = self.DEFAULT
+
+    def register(self, name: str | None = None) -> MemoryRegister:
+        """Return register `name` (the active one by default), creating it if needed."""
+        name = name or self.active
+        reg = self.registers.get(name)
+        if reg is None:
+            reg = self.registers[name] = MemoryRegister()
+        return reg
+
+    def select(self, name: str) -> None:
+        self.register(name)
+        self.active = name
+
+    def remove(self, name: str) -> None:
+        if name == self.DEFAULT:
+            self.registers[name].clear()
+            return
+        self.registers.pop(name, None)
+        if self.active == name:
+            self.active = self.DEFAULT
+
+    def to_dict(self) -> dict:
+        regs = {n: r.to_list() for n, r in self.registers.items()}
+        return {'v': 1, 'active': self.active, 'regs': regs}
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, text: str) -> 'MemoryBank':
+        return cls.from_dict(json.loads(text))
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'MemoryBank':
+        bank = cls()
+        for name, state in data.get('regs', {}).items():
+            bank.registers[str(name)] = MemoryRegister.from_list(state)
+        if data.get('active') in bank.registers:
+            bank.active = data['active']
+        return bank
+
+    def save(self, path: str = MEMORY_PATH) -> None:
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as fh:
+            fh.write(self.to_json())
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str = MEMORY_PATH) -> 'MemoryBank':
+        """Load the bank from `path`; an empty bank if it is missing or unreadable."""
+        try:
+            with open(path, encoding='utf-8') as fh:
+                return cls.from_json(fh.read())
+        except FileNotFoundError:
+            pass
+        except Exception:
+            log.getChild('memory').warning('could not load %s', path, exc_info=True)
+        return cls()
+
+
+def _write_durable(path: str, text: str) -> None:
+    # replace `path` atomically, with the data on disk before the rename
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as fh:
+        fh.write(text)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+
+
+class SessionJournal:
+    """Crash-safe record of the main window's expression and history.
+
+    The state lives in a compact JSON snapshot plus an append-only journal of
+    the changes since, one JSON array per line: ``["c", kept, tail, last_eval]``
+    (the expression as an edit of the previous one, so a key typed at the end
+    of a long expression writes a short line) and ``["h", history row]``.
+    Memory registers are not part of it: MemoryBank keeps them in MEMORY_PATH.
+    The UI thread only applies and serializes records: like the logging
+    QueueListener, a writer thread does the file work, writing each line to
+    the OS as it arrives and fsyncing in batches. Every COMPACT_EVERY records the
+    state is folded into a new snapshot and the journal starts over, so a
+    restore reads one small file and replays a bounded number of lines.
+
+    The journal's first line names the snapshot generation it continues; after
+    a crash between writing a snapshot and truncating the journal the stale
+    lines are ignored instead of applied twice.
+
+    `load` takes an exclusive lock on a '.lock' file next to the snapshot and
+    keeps it until `close`. A second calculator process that can't get it
+    starts with an empty state and doesn't journal, so two writers never
+    interleave lines or compact over each other.
+    """
+
+    COMPACT_EVERY = 500
+    SYNC_EVERY = 64  # records; the window also syncs SYNC_MS after a change
+    SYNC_MS = 1000
+    HISTORY_LIMIT = 1000  # newest rows kept in the snapshot
+
+    def __init__(self, path: str = SESSION_PATH) -> None:
+        self.path = path
+        self.journal_path = os.path.splitext(path)[0] + '.journal'
+        self.lock_path = os.path.splitext(path)[0] + '.lock'
+        self.state = {'current': '', 'last_eval': False,
+                      'history': collections.deque(maxlen=self.HISTORY_LIMIT)}  # newest first
+        self.gen = 0
+        self.records = 0  # journal lines since the snapshot
+        self._queue = None  # to the writer thread, from `open` until `close`
+        self._thread = None
+        self._lock_fd = None
+
+    def _lock(self) -> bool:
+        try:
+            fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        except OSError:
+            log.getChild('session').warning('could not open %s', self.lock_path, exc_info=True)
+            return False
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            elif msvcrt is not None:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        return True
+
+    def apply(self, record) -> None:
+        kind = record[0]
+        if kind == 'c':
+            self.state['current'] = self.state['current'][:record[1]] + record[2]
+            self.state['last_eval'] = bool(record[3])
+        elif kind == 'h':
+            self.state['history'].appendleft(record[1])
+
+    def load(self) -> dict:
+        """Lock the session, read the snapshot, replay the journal onto it and return the state.
+
+        Returns the empty state if another process holds the lock.
+        """
+        log_ = log.getChild('session')
+        if self._lock_fd is None and not self._lock():
+            log_.info('%s is in use by another calculator; this one starts fresh', self.path)
+            return self.state
+        try:
+            with open(self.path, encoding='utf-8') as fh:
+                snap = json.load(fh)
+            self.gen = int(snap['gen'])
+            self.state['current'] = str(snap.get('current', ''))
+            self.state['last_eval'] = bool(snap.get('last_eval'))
+            self.state['history'].extend(snap.get('history', ()))
+        except FileNotFoundError:
+            pass
+        except Exception:
+            log_.warning('could not load %s', self.path, exc_info=True)
+        try:
+            with open(self.journal_path, encoding='utf-8') as fh:
+                lines = fh.read().splitlines()
+        except FileNotFoundError:
+            lines = []
+        except Exception:
+            log_.warning('could not load %s', self.journal_path, exc_info=True)
+            lines = []
+        if lines and lines[0] == json.dumps(['gen', self.gen], separators=(',', ':')):
+            for line in lines[1:]:
+                try:
+                    self.apply(json.loads(line))
+                except (ValueError, IndexError, TypeError):
+                    # a line torn by a crash can only be the last one
+                    break
+        return self.state
+
+    def append(self, *record) -> None:
+        """Apply `record` and queue it for the journal (a no-op until `open`).
+
+        The expression is passed as ``("c", current, last_eval)`` and written as
+        an edit of the previous one.
+        """
+        if self._queue is None:
+            return
+        if record[0] == 'c':
+            keep = common_prefix_len(self.state['current'], record[1])
+            record = ('c', keep, record[1][keep:], record[2])
+        self.apply(record)
+        self._queue.put(('line', json.dumps(record, separators=(',', ':')) + '\n'))
+        self.records += 1
+
+    def sync(self, wait: bool = False) -> None:
+        """Have the writer fsync the journal; with `wait`, return once it has."""
+        if self._queue is None:
+            return
+        done = threading.Event() if wait else None
+        self._queue.put(('sync', done))
+        if done is not None:
+            done.wait()
+
+    def open(self) -> None:
+        """Start journaling on top of what `load` returned (if it got the lock)."""
+        if self._lock_fd is None or self._queue is not None:
+            return
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._write_loop, name='session-writer', daemon=True)
+        self._thread.start()
+        self.compact()
+
+    def compact(self) -> None:
+        """Queue the state as a new snapshot, with an empty journal after it."""
+        if self._queue is None:
+            return
+        st = self.state
+        self.gen += 1
+        snap = {'v': 1, 'gen': self.gen, 'current': st['current'], 'last_eval': st['last_eval'],
+                'history': list(st['history'])}
+        self._queue.put(('snapshot', (self.gen, json.dumps(snap, separators=(',', ':')))))
+        self.records = 0
+
+    def close(self) -> None:
+        """Write a final snapshot, wait for the writer to finish and release the lock."""
+        if self._queue is not None:
+            self.compact()
+            self._queue.put(('stop', None))
+            self._thread.join()
+            self._queue = self._thread = None
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)  # releases the lock
+            self._lock_fd = None
+
+    def _write_loop(self) -> None:
+        # writer thread: the only code touching the snapshot and journal once open
+        fh = None
+        pending = 0  # lines not fsynced yet
+        while True:
+            op, arg = self._queue.get()
+            if op == 'stop':
+                break
+            try:
+                if op == 'snapshot':
+                    gen, text = arg
+                    _write_durable(self.path, text)
+                    # on failure the old journal stays open and still matches the old snapshot
+                    if fh is not None:
+                        fh.close()
+                        fh = None
+                    pending = 0
+                    # line buffered: each record is in the OS once written, fsync is batched
+                    fh = open(self.journal_path, 'w', encoding='utf-8', buffering=1)
+                    fh.write(json.dumps(['gen', gen], separators=(',', ':')) + '\n')
+                    os.fsync(fh.fileno())
+                elif fh is not None:
+                    if op == 'line':
+                        fh.write(arg)
+                        pending += 1
+                    if pending and (op == 'sync' or pending >= self.SYNC_EVERY):
+                        pending = 0
+                        fh.flush()
+                        os.fsync(fh.fileno())
+            except Exception:
+                log.getChild('session').warning('could not write %s (%s)', self.path, op, exc_info=True)
+            if op == 'sync' and arg is not None:
+                arg.set()
+        if fh is not None:
+            fh.close()
+
+class SevenSegment(tk.Canvas):
+    """Polygon-based seven-segment display that scales to available width.
+
+    The display keeps the full text it was given; only a viewport of `digits`
+    cells is drawn into the fixed pool of slots. Long text is either fitted
+    (numbers are rounded or switched to scientific notation) or scrolled.
+    `segments` selects 7-, 14- or 16-segment cells (see `GLYPHS`).
+
+    `render='polygons'` draws every segment as its own canvas item (8 per 7-seg
+    cell). `render='images'` draws each cell as a single image item showing a
+    pre-rendered glyph, so a text change is one `itemconfig` per changed cell;
+    it needs Pillow and falls back to polygons without it.
+
+    Colors, digit count and style can be changed on a live display with
+    `apply_theme`, `set_digits` and `set_style`: segment items are tagged with
+    the color they show, and existing slots are moved rather than recreated.
+    """
+
+    def __init__(self, master, digits=10, seg_len=24, seg_thick=6, pad=6, on='#6ef06e', off='#022202', dp='#ffcc00', overflow='fit', segments=7, render='polygons', notation='sci', **kw):
+        kw.setdefault('bg', '#001100')
+        super().__init__(master, highlightthickness=0, **kw)
+        self.digits = digits
+        self.s = seg_len
+        self.t = seg_thick
+        self.pad = pad
+        self.on = on
+        self.off = off
+        self.dp_color = dp
+        # 'fit' rounds/scientific-formats long numbers, 'scroll' only moves the viewport
+        self.overflow = overflow
+        # exponent style of fitted numbers: 'sci' (1.2E7) or 'eng' (12E6)
+        self.notation = notation
+        self.segments = segments if segments in GLYPHS else 7
+        self.render_mode = 'images' if render == 'images' and ImageTk is not None else 'polygons'
+        self.slots = []  # list of (segments_ids, dp_id); empty in image mode
+        self._image_items = []  # one image item per slot in image mode
+        self._slot_items = []  # per slot: segment ids followed by the dp id, indexed by mask bit
+        self._shown = []  # bitmask currently drawn in each slot
+        self._slot_kind = None  # (render mode, segments) the slots were built for
+        self._last_text = ''
+        self._cells = ()  # full text encoded as one glyph bitmask per cell
+        self._scroll = 0  # cells hidden to the right of the viewport
+        # image mode: mask -> PhotoImage at `_glyph_style`, dropped when size or colors change
+        self._glyph_images = {}
+        self._glyph_style = None
+        self._rasterizer = None
+        self._create_geometry()
+        self.bind('<Configure>', lambda e: self._apply_resize())
+        # mouse wheel scrolls the viewport (Windows/macOS deliver <MouseWheel>, X11 buttons 4/5)
+        self.bind('<MouseWheel>', lambda e: self.scroll(1 if e.delta > 0 else -1))
+        self.bind('<Button-4>', lambda e: self.scroll(1))
+        self.bind('<Button-5>', lambda e: self.scroll(-1))
+
+    def _create_geometry(self):
+        # compute canvas size based on per-digit slot
+        w = (self.s + self.t*2 + self.pad) * self.digits + self.pad
+        h = self.s*2 + self.t*3 + self.pad*2
+        self.config(width=w, height=h)
+        self._create_slots()
+        # redraw the current viewport after recreating geometry so digits persist
+        try:
+            self._render()
+        except Exception:
+            pass
+
+    def _create_slots(self):
+        # existing slots are moved to the new geometry; only a style change starts over
+        kind = (self.render_mode, self.segments)
+        if kind != self._slot_kind:
+            self._slot_kind = kind
+            self.delete('all')
+            self.slots.clear()
+            self._slot_items = []
+            self._image_items = []
+            self._shown = []
+        step = self.s + self.t*2 + self.pad
+        if self.render_mode == 'images':
+            items = self._image_items
+            for item in items[self.digits:]:
+                self.delete(item)
+            del items[self.digits:]
+            for i, item in enumerate(items):
+                self.coords(item, self.pad + i * step, 0)
+            blank = self._glyph_image(0)
+            for i in range(len(items), self.digits):
+                items.append(self.create_image(self.pad + i * step, 0, anchor='nw', image=blank))
+            # glyph images depend on the size, so every slot is redrawn by _render
+            self._shown = [-1] * self.digits
+            return
+        for seg_ids, dp in self.slots[self.digits:]:
+            self.delete(*seg_ids, dp)
+        del self.slots[self.digits:]
+        del self._slot_items[self.digits:]
+        del self._shown[self.digits:]
+        for i, items in enumerate(self._slot_items):
+            polys, dp_box = segment_polygons(self.pad + i * step, self.pad, self.s, self.t, self.segments)
+            for item, pts in zip(items, polys + [dp_box]):
+                self.coords(item, *pts)
+        for i in range(len(self.slots), self.digits):
+            polys, dp_box = segment_polygons(self.pad + i * step, self.pad, self.s, self.t, self.segments)
+            seg_ids = [self.create_polygon(*pts, fill=self.off, outline=self.off, tags='seg_off') for pts in polys]
+            # decimal point
+            dp = self.create_oval(*dp_box, fill=self.off, outline=self.off, tags='seg_off')
+            self.slots.append((seg_ids, dp))
+            self._slot_items.append(seg_ids + [dp])
+            # freshly created items are all drawn in the off color
+            self._shown.append(0)
+
+    def _apply_resize(self) -> bool:
+        # adjust geometry to widget width; True when the slots were laid out again
+        try:
+            w = int(self.winfo_width())
+        except Exception:
+            return False
+        min_total = (self.digits * 10) + (self.pad * (self.digits + 1))
+        if not w or w < min_total:
+            return False
+        total_pad = (self.digits + 1) * self.pad
+        usable = max(20, w - total_pad)
+        per_digit = usable / max(1, self.digits)
+        new_t = max(3, int(per_digit * 0.12))
+        new_s = max(8, int(per_digit - new_t * 2 - 2))
+        if abs(new_s - self.s) < 2 and abs(new_t - self.t) < 1:
+            return False
+        self.s = new_s
+        self.t = new_t
+        self._create_geometry()
+        return True
+
+    def set_digits(self, digits: int) -> None:
+        """Change the number of slots, keeping the ones that already exist."""
+        if digits == self.digits:
+            return
+        self.digits = digits
+        self._scroll = min(self._scroll, max(0, len(self._cells) - digits))
+        # the widget keeps its placed width, so re-fit the segment size to it
+        if not self._apply_resize():
+            self._create_geometry()
+
+    def set_style(self, segments: int | None = None, render: str | None = None) -> None:
+        """Switch between 7/14/16-segment cells or polygon/image rendering."""
+        if segments is not None:
+            self.segments = segments if segments in GLYPHS else 7
+        if render is not None:
+            self.render_mode = 'images' if render == 'images' and ImageTk is not None else 'polygons'
+        if (self.render_mode, self.segments) != self._slot_kind:
+            # glyph bitmasks differ between segment kinds
+            self._cells = encode_text(self._last_text, self.segments)
+            self._create_geometry()
+
+    @timed('display.theme')
+    def apply_theme(self, on: str | None = None, off: str | None = None, dp: str | None = None,
+                    bg: str | None = None) -> None:
+        """Recolor the display in place: one tag update per color, or one image per slot."""
+        self.on = on or self.on
+        self.off = off or self.off
+        self.dp_color = dp or self.dp_color
+        if bg:
+            self.configure(bg=bg)
+        if self.render_mode == 'images':
+            for idx, item in enumerate(self._image_items):
+                if self._shown[idx] >= 0:  # -1: not drawn yet, _render will do it
+                    self.itemconfig(item, image=self._glyph_image(self._shown[idx]))
+            return
+        self.itemconfig('seg_on', fill=self.on, outline=self.on)
+        self.itemconfig('seg_off', fill=self.off, outline=self.off)
+        self.itemconfig('seg_dp', fill=self.dp_color, outline=self.dp_color)
+
+    @timed('display.set_text')
+    def set_text(self, text: str, fit: bool = False) -> None:
+        """Show `text`, keeping all of it; `fit` allows number reformatting.
+
+        When `fit` is true and the display's overflow mode is 'fit', numbers
+        longer than the display are rounded or shown in scientific (or
+        engineering, see `notation`) notation.
+        Otherwise the viewport is anchored on the right-most (newest) cells
+        and the rest can be reached with `scroll`.
+        """
+        text = str(text)
+        if fit and self.overflow == 'fit':
+            text = fit_number(text, self.digits, self.notation)
+        self._last_text = text
+        self._cells = encode_text(text, self.segments)
+        self._scroll = 0
+        self._render()
+
+    def scroll(self, delta: int) -> None:
+        """Move the viewport `delta` cells to the left (negative: to the right)."""
+        limit = max(0, len(self._cells) - self.digits)
+        pos = max(0, min(limit, self._scroll + delta))
+        if pos != self._scroll:
+            self._scroll = pos
+            self._render()
+
+    def _visible_cells(self) -> tuple[int, ...]:
+        n = len(self._cells)
+        if n <= self.digits:
+            return (0,) * (self.digits - n) + self._cells
+        end = n - self._scroll
+        return self._cells[end - self.digits:end]
+
+    def _glyph_image(self, mask: int):
+        """Return the PhotoImage for `mask` at the current size and colors."""
+        style = (self.s, self.t, self.pad, self.segments, self.on, self.off, self.dp_color)
+        if style != self._glyph_style:
+            # every slot is redrawn after a resize or recolor, so the old glyphs can go
+            if self._glyph_style is None or style[:4] != self._glyph_style[:4]:
+                self._rasterizer = SegmentRasterizer(digits=1, seg_len=self.s, seg_thick=self.t, pad=self.pad, segments=self.segments)
+            self._glyph_style = style
+            self._glyph_images = {}
+        img = self._glyph_images.get(mask)
+        if img is None:
+            tile = self._rasterizer.tile(mask, self.on, self.off, self.dp_color)
+            img = self._glyph_images[mask] = ImageTk.PhotoImage(tile, master=self)
+        return img
+
+    def _render(self) -> None:
+        if self.render_mode == 'images':
+            for idx, mask in enumerate(self._visible_cells()):
+                if self._shown[idx] != mask:
+                    try:
+                        self.itemconfig(self._image_items[idx], image=self._glyph_image(mask))
+                    except Exception:
+                        pass
+                    self._shown[idx] = mask
+            return
+        # only touch the items whose bit differs from what each slot shows now
+        dp_bit = self.segments
+        for idx, mask in enumerate(self._visible_cells()):
+            changed = self._shown[idx] ^ mask
+            if not changed:
+                continue
+            items = self._slot_items[idx]
+            bit = 0
+            while changed:
+                if changed & 1:
+                    # the tag names the color so apply_theme can recolor by tag
+                    if (mask >> bit) & 1:
+                        color, tag = (self.dp_color, 'seg_dp') if bit == dp_bit else (self.on, 'seg_on')
+                    else:
+                        color, tag = self.off, 'seg_off'
+                    try:
+                        self.itemconfig(items[bit], fill=color, outline=color, tags=tag)
+                    except Exception:
+                        pass
+                changed >>= 1
+                bit += 1
+            self._shown[idx] = mask
+
+
+class SegmentRasterizer:
+    """Headless Pillow renderer for display frames using the SevenSegment geometry.
+
+    Frames match what a SevenSegment canvas with the same parameters would show
+    (right-aligned text, same polygons and decimal points). Each glyph is drawn
+    once per color scheme into an RGBA tile; a frame is then just tile pastes.
+    """
+
+    def __init__(self, digits=12, seg_len=24, seg_thick=6, pad=6, on='#6ef06e', off='#022202', dp='#ffcc00', bg='#001100', segments=7):
+        if Image is None or ImageDraw is None:
+            raise RuntimeError('Pillow is required for SegmentRasterizer')
+        self.digits = digits
+        self.s = seg_len
+        self.t = seg_thick
+        self.pad = pad
+        self.on = on
+        self.off = off
+        self.dp_color = dp
+        self.bg = bg
+        self.segments = segments if segments in GLYPHS else 7
+        self.cell_w = self.s + self.t*2 + self.pad
+        self.width = self.cell_w * self.digits + self.pad
+        self.height = self.s*2 + self.t*3 + self.pad*2
+        self._tiles = {}  # (mask, on, off, dp) -> RGBA tile
+        self._blank = {}  # bg -> empty frame to copy from
+
+    def tile(self, mask: int, on: str | None = None, off: str | None = None, dp: str | None = None):
+        """Return the cached RGBA tile for one cell showing `mask`.
+
+        Tiles are wider than a cell because the decimal point overhangs into the
+        gap (and, as on the canvas, under the next cell).
+        """
+        on = on or self.on
+        off = off or self.off
+        dp = dp or self.dp_color
+        key = (mask, on, off, dp)
+        tile = self._tiles.get(key)
+        if tile is None:
+            polys, dp_box = segment_polygons(0, self.pad, self.s, self.t, self.segments)
+            w = int(math.ceil(max(self.cell_w, dp_box[2]))) + 1
+            tile = Image.new('RGBA', (w, self.height), (0, 0, 0, 0))
+            draw = ImageDraw.Draw(tile)
+            for bit, pts in enumerate(polys):
+                color = on if (mask >> bit) & 1 else off
+                draw.polygon(pts, fill=color, outline=color)
+            color = dp if (mask >> self.segments) & 1 else off
+            draw.ellipse(dp_box, fill=color, outline=color)
+            self._tiles[key] = tile
+        return tile
+
+    def render(self, text: str, fit: bool = False, on: str | None = None, off: str | None = None, dp: str | None = None, bg: str | None = None):
+        """Render `text` to an RGB PIL image (right-aligned, like the live display)."""
+        text = str(text)
+        if fit:
+            text = fit_number(text, self.digits)
+        masks = encode_text(text, self.segments)[-self.digits:]
+        masks = (0,) * (self.digits - len(masks)) + masks
+        bg = bg or self.bg
+        blank = self._blank.get(bg)
+        if blank is None:
+            blank = self._blank[bg] = Image.new('RGB', (self.width, self.height), bg)
+        frame = blank.copy()
+        x = self.pad
+        for mask in masks:
+            tile = self.tile(mask, on, off, dp)
+            frame.paste(tile, (x, 0), tile)
+            x += self.cell_w
+        return frame
+
+    def render_png(self, text: str, **kw) -> bytes:
+        """Render `text` and return the frame encoded as PNG bytes."""
+        buf = io.BytesIO()
+        self.render(text, **kw).save(buf, format='PNG')
+        return buf.getvalue()
+
+    def render_array(self, text: str, **kw):
+        """Render `text` and return an (height, width, 3) uint8 NumPy array."""
+        # NumPy is optional and imported here, not at the top: it takes longer to
+        # import than the rest of the module and only this method uses it
+        try:
+            import numpy
+        except ImportError:
+            raise RuntimeError('NumPy is required for render_array') from None
+        return numpy.asarray(self.render(text, **kw))
+
+
+# create three click variants so you can audition them: thock, balanced, snap
+CLICK_VARIANTS = [
+    ('click_thock.wav', dict(impulse_amp=22000.0, noise_amp=9000.0, low_amp=9000.0, low_freq=380.0, impulse_decay=12000.0, noise_decay=400.0, duration=0.055)),
+    ('click_balanced.wav', dict(impulse_amp=18000.0, noise_amp=14000.0, low_amp=3000.0, low_freq=500.0, impulse_decay=8000.0, noise_decay=500.0, duration=0.045)),
+    ('click_snap.wav', dict(impulse_amp=26000.0, noise_amp=18000.0, low_amp=1500.0, low_freq=700.0, impulse_decay=14000.0, noise_decay=300.0, duration=0.035)),
+]
+
+
+def synth_click(params: dict, framerate: int = 44100, rng: random.Random | None = None) -> bytes:
+    """Synthesize a mechanical key click as 16-bit mono PCM frames.
+
+    The click is a short impulse plus decaying noise and a damped low tone;
+    see `CLICK_VARIANTS` for the parameter sets. Pass a seeded `rng` for
+    reproducible noise.
+    """
+    rand = (rng or random).random
+    duration = params.get('duration', 0.045)
+    n_samples = int(framerate * duration)
+    frames = bytearray()
+    imp_amp = params.get('impulse_amp', 18000.0)
+    noise_amp = params.get('noise_amp', 12000.0)
+    low_amp = params.get('low_amp', 3000.0)
+    low_freq = params.get('low_freq', 500.0)
+    imp_decay = params.get('impulse_decay', 8000.0)
+    noise_decay = params.get('noise_decay', 500.0)
+    for i in range(n_samples):
+        t = i / framerate
+        impulse = imp_amp * math.exp(-imp_decay * t) if i < 12 else 0.0
+        noise = noise_amp * math.exp(-noise_decay * t) * (rand() * 2 - 1)
+        low = low_amp * math.exp(-60.0 * t) * math.sin(2.0 * math.pi * low_freq * t)
+        sample = int(max(-32767, min(32767, impulse + noise + low)))
+        frames.extend(struct.pack('<h', sample))
+    return bytes(frames)
+
+
+def write_wav(path: str, frames: bytes, framerate: int = 44100) -> None:
+    """Write 16-bit mono PCM `frames` to a WAV file."""
+    with wave.open(path, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(framerate)
+        wf.writeframes(frames)
+
+
+def read_pcm(source) -> array.array:
+    """Decode a 16-bit mono WAV (a path or the file's bytes) into an array of samples."""
+    with wave.open(source if isinstance(source, str) else io.BytesIO(source), 'rb') as wf:
+        if wf.getsampwidth() != 2 or wf.getnchannels() != 1:
+            raise ValueError('expected 16-bit mono PCM')
+        samples = array.array('h', wf.readframes(wf.getnframes()))
+    if sys.byteorder == 'big':
+        samples.byteswap()
+    return samples
+
+
+class ClickMixer:
+    """Mixes overlapping click voices so fast typing never cuts a click short.
+
+    Voices are decoded once per sound and summed into a ring buffer indexed
+    by absolute sample position on the mixer's clock. Every trigger hands the
+    backend the mix from now until the last ringing voice ends, so a backend
+    that restarts playback on each call (as winsound does) still plays the
+    tails of earlier clicks. Triggers with the same `event` key less than
+    `DEDUPE_S` apart count as one keystroke.
+
+    A backend has `play(frames, at)`, taking 16-bit mono PCM bytes that start
+    at sample position `at` and replace whatever it was playing, and `close()`.
+    """
+
+    RING = 1 << 16  # samples (~1.5 s at 44.1 kHz), far longer than any click
+    DEDUPE_S = 0.015
+
+    def __init__(self, backend, rate: int = 44100, gain: float = 0.8, clock=time.perf_counter) -> None:
+        self.backend = backend
+        self.rate = rate
+        self.gain = gain
+        self._clock = clock
+        self._t0 = clock()
+        self._ring = array.array('i', bytes(4 * self.RING))
+        self._head = 0  # ring slots before this position have been cleared
+        self._end = 0  # one past the last sample any voice wrote
+        self._voices = {}  # name -> gain-scaled samples
+        self._last_event = None
+        self._last_time = -math.inf
+
+    def voice(self, name: str, source=None) -> list[int]:
+        """Return the decoded samples for `name`, reading `source` the first time."""
+        v = self._voices.get(name)
+        if v is None:
+            g = self.gain
+            v = self._voices[name] = [int(s * g) for s in read_pcm(source if source is not None else name)][:self.RING]
+        return v
+
+    def trigger(self, name: str, source=None, event=None) -> bool:
+        """Start voice `name` now; False when deduped as a repeat of `event`."""
+        now = self._clock()
+        if event is not None and event == self._last_event and now - self._last_time < self.DEDUPE_S:
+            return False
+        self._last_event, self._last_time = event, now
+        voice = self.voice(name, source)
+        pos = int((now - self._t0) * self.rate)
+        self._clear_until(pos)
+        ring, mask = self._ring, self.RING - 1
+        for i, s in enumerate(voice, pos):
+            ring[i & mask] += s
+        self._end = max(self._end, pos + len(voice))
+        self.backend.play(self._render(pos, self._end), pos)
+        return True
+
+    def _clear_until(self, pos: int) -> None:
+        # slots past _end are already zero, so only the played part needs clearing
+        stop = min(pos, self._end)
+        if stop - self._head >= self.RING:
+            self._ring = array.array('i', bytes(4 * self.RING))
+        else:
+            ring, mask = self._ring, self.RING - 1
+            for i in range(self._head, stop):
+                ring[i & mask] = 0
+        self._head = max(self._head, pos)
+
+    def _render(self, start: int, stop: int) -> bytes:
+        if stop <= start:
+            return b''
+        mask = self.RING - 1
+        a, b = start & mask, stop & mask
+        mixed = self._ring[a:b] if a < b else self._ring[a:] + self._ring[:b]
+        out = array.array('h', [32767 if v > 32767 else -32768 if v < -32768 else v for v in mixed])
+        if sys.byteorder == 'big':
+            out.byteswap()
+        return out.tobytes()
+
+
+def _wav_bytes(frames: bytes, framerate: int = 44100) -> bytes:
+    buf = io.BytesIO()
+    write_wav(buf, frames, framerate)
+    return buf.getvalue()
+
+
+class WinsoundBackend:
+    """Plays mixes with winsound on a worker thread.
+
+    winsound can't play from memory asynchronously, so the worker plays each
+    mix synchronously and `play` interrupts it; only the newest queued mix
+    is played since it already contains the older tails.
+    """
+
+    def __init__(self, rate: int = 44100) -> None:
+        self.rate = rate
+        self._jobs = queue.SimpleQueue()
+        threading.Thread(target=self._run, name='click-audio', daemon=True).start()
+
+    def play(self, frames: bytes, at: int) -> None:
+        data = _wav_bytes(frames, self.rate)
+        try:
+            # stop the mix the worker is playing before queueing the new one,
+            # so the stop can't cut off the new mix instead
+            winsound.PlaySound(None, 0)
+        except RuntimeError:
+            pass
+        self._jobs.put(data)
+
+    def _run(self) -> None:
+        while True:
+            data = self._jobs.get()
+            # only the newest mix matters; it already contains the older tails
+            while data is not None:
+                try:
+                    data = self._jobs.get_nowait()
+                except queue.Empty:
+                    break
+            if data is None:
+                return
+            try:
+                winsound.PlaySound(data, winsound.SND_MEMORY)
+            except RuntimeError:
+                log.getChild('sound').debug('click playback failed', exc_info=True)
+
+    def close(self) -> None:
+        self._jobs.put(None)
+
+
+class WavFileBackend:
+    """Records what a restart-on-play device would output into a WAV file.
+
+    Each `play` cuts the recording at its start position (padding silence
+    up to it) and appends the new mix; the file is written on `close`.
+    """
+
+    def __init__(self, path: str, rate: int = 44100) -> None:
+        self.path = path
+        self.rate = rate
+        self._origin = None  # sample position of the first play
+        self._pcm = bytearray()
+
+    def play(self, frames: bytes, at: int) -> None:
+        if self._origin is None:
+            self._origin = at
+        offset = (at - self._origin) * 2
+        if offset > len(self._pcm):
+            self._pcm.extend(bytes(offset - len(self._pcm)))
+        del self._pcm[offset:]
+        self._pcm += frames
+
+    def close(self) -> None:
+        write_wav(self.path, bytes(self._pcm), self.rate)
+
+
+def default_click_backend():
+    """The output for click sounds: a capture file when CALC_CLICK_CAPTURE is set,
+    winsound on Windows, otherwise None (silent)."""
+    path = os.environ.get('CALC_CLICK_CAPTURE')
+    if path:
+        return WavFileBackend(path)
+    if winsound is not None:
+        return WinsoundBackend()
+    return None
 
 
-def resource_path(fname: str = '') -> str:
-    """Return an absolute path to a resource, supporting PyInstaller onefile (_MEIPASS).
+def icon_pixels(size: int = 64) -> list[list[str]]:
+    """Return the calculator icon as rows of '#rrggbb' colors.
 
-    If `fname` is empty this returns the resource directory. When running as a
-    PyInstaller onefile bundle the runtime extracts files to `sys._MEIPASS`.
+    Shared by the runtime window icon and the asset pipeline's PNG/ICO output.
     """
-    base = getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__)))
-    if fname:
-        return os.path.join(base, fname)
-    return base
+    # colors
+    bg = '#2b2b2b'
+    body = '#111111'
+    chrome = '#444444'
+    key = '#d9d9d9'
+    sym = '#111111'
+    # fill background (transparent-looking) with bg
+    px = [[bg] * size for _ in range(size)]
 
-# Segment patterns for 7-seg display: a,b,c,d,e,f,g (g is middle), where 1=on
-SEGMENTS = {
-    '0': (1,1,1,1,1,1,0), '1': (0,1,1,0,0,0,0), '2': (1,1,0,1,1,0,1),
-    '3': (1,1,1,1,0,0,1), '4': (0,1,1,0,0,1,1), '5': (1,0,1,1,0,1,1),
-    '6': (1,0,1,1,1,1,1), '7': (1,1,1,0,0,0,0), '8': (1,1,1,1,1,1,1),
-    '9': (1,1,1,1,0,1,1), '-': (0,0,0,0,0,0,1), ' ': (0,0,0,0,0,0,0)
+    def put(color: str, x: int, y: int) -> None:
+        if 0 <= x < size and 0 <= y < size:
+            px[y][x] = color
+
+    # draw rounded rectangle body
+    bx0, by0, bx1, by1 = 8, 8, size-9, size-9
+    for y in range(by0, by1+1):
+        for x in range(bx0, bx1+1):
+            put(body, x, y)
+
+    # top chrome strip
+    for y in range(by0, by0+8):
+        for x in range(bx0+2, bx1-1):
+            put(chrome, x, y)
+
+    # draw four small key squares and simple operator marks
+    keys = [ (bx0+8, by0+18), (bx0+28, by0+18), (bx0+8, by0+34), (bx0+28, by0+34) ]
+    ksize = 10
+    for kx, ky in keys:
+        for y in range(ky, ky+ksize):
+            for x in range(kx, kx+ksize):
+                put(key, x, y)
+
+    # plus sign in top-left key
+    px0, py0 = keys[0]
+    cx = px0 + ksize//2
+    cy = py0 + ksize//2
+    for d in range(-2,3):
+        put(sym, cx + d, cy)
+        put(sym, cx, cy + d)
+
+    # minus sign in top-right key
+    px0, py0 = keys[1]
+    cx = px0 + ksize//2
+    cy = py0 + ksize//2
+    for d in range(-2,3):
+        put(sym, cx + d, cy)
+
+    # multiply (x) in bottom-left
+    px0, py0 = keys[2]
+    for d in range(0, ksize):
+        put(sym, px0 + d, py0 + d)
+        put(sym, px0 + d, py0 + ksize - 1 - d)
+
+    # divide sign in bottom-right: a dot, a line, and a dot
+    px0, py0 = keys[3]
+    cx = px0 + ksize//2
+    cy = py0 + ksize//2
+    put(sym, cx, cy - 3)
+    for d in range(-2,3):
+        put(sym, cx + d, cy)
+    put(sym, cx, cy + 3)
+    return px
+
+
+# labels used on the keypad in the same order as the `buttons` definition
+KEYPAD_LABELS = ['MC','M+','M-','MR','C','+/-','%','←',
+                 '7','8','9','/','4','5','6','*','1','2','3','-','0','.','=','+']
+KEYCAP_SIZE = (88, 64)
+
+# looks for everything around the segments: display background, the angled panel,
+# keypad fills per key state and the keycap palette (RGBA) used by render_keycap.
+# Segment colors stay separate prefs.
+THEMES = {
+    'Graphite': {
+        'display_bg': '#001100', 'panel': '#141414',
+        'fills': {'normal': '#3f3f3f', 'hover': '#515151', 'pressed': '#2b2b2b'},
+        'keycap': {'outer': (20, 20, 20, 255), 'inner': (56, 56, 56, 255),
+                   'accent': (245, 140, 30, 255), 'text': (250, 250, 250, 255)},
+    },
+    'Midnight': {
+        'display_bg': '#000814', 'panel': '#0d1420',
+        'fills': {'normal': '#26324a', 'hover': '#33425f', 'pressed': '#1a2335'},
+        'keycap': {'outer': (10, 14, 26, 255), 'inner': (38, 50, 74, 255),
+                   'accent': (230, 80, 80, 255), 'text': (235, 240, 255, 255)},
+    },
+    'Ivory': {
+        'display_bg': '#001100', 'panel': '#2a2a26',
+        'fills': {'normal': '#d8d2c4', 'hover': '#e6e0d2', 'pressed': '#bdb6a6'},
+        'keycap': {'outer': (150, 144, 130, 255), 'inner': (232, 226, 212, 255),
+                   'accent': (245, 140, 30, 255), 'text': (40, 40, 40, 255)},
+    },
 }
+DEFAULT_THEME = 'Graphite'
 
 
-class SevenSegment(tk.Canvas):
-    """Polygon-based seven-segment display that scales to available width."""
+def keycap_filename(lbl: str) -> str:
+    """Return the PNG filename for a keypad label ('+' -> 'keycap_plus.png')."""
+    # sanitize label for filename (replace or name-map unsafe characters)
+    safe_map = {
+        '+/-': 'plusminus', '/': 'slash', '*': 'star', '\\': 'backslash',
+        '←': 'back', '.': 'dot', '+': 'plus', '-': 'minus', '%': 'percent',
+        '=': 'equals', 'M+': 'mplus', 'M-': 'mminus',
+    }
+    safe_lbl = safe_map.get(lbl, None)
+    if safe_lbl is None:
+        # fallback: keep alphanumerics, replace others with underscore
+        safe_lbl = re.sub(r'[^A-Za-z0-9]+', '_', lbl)
+        if not safe_lbl:
+            safe_lbl = 'key'
+    return f'keycap_{safe_lbl}.png'
 
-    def __init__(self, master, digits=10, seg_len=24, seg_thick=6, pad=6, on='#6ef06e', off='#022202', dp='#ffcc00', **kw):
-        super().__init__(master, highlightthickness=0, bg='#001100', **kw)
-        self.digits = digits
-        self.s = seg_len
-        self.t = seg_thick
-        self.pad = pad
-        self.on = on
-        self.off = off
-        self.dp_color = dp
-        self.slots = []  # list of (segments_ids, dp_id)
-        self._last_text = ''
-        self._create_geometry()
-        self.bind('<Configure>', lambda e: self._apply_resize())
 
-    def _create_geometry(self):
-        # compute canvas size based on per-digit slot
-        w = (self.s + self.t*2 + self.pad) * self.digits + self.pad
-        h = self.s*2 + self.t*3 + self.pad*2
-        self.config(width=w, height=h)
-        self._create_slots()
-        # restore the last text after recreating geometry so digits persist
-        if getattr(self, '_last_text', None):
-            try:
-                self.set_text(self._last_text)
-            except Exception:
-                pass
+# font files tried for keycap labels, in order: Windows first, then common Linux/macOS faces
+KEYCAP_FONT_NAMES = ('seguisb.ttf', 'arial.ttf', 'DejaVuSans-Bold.ttf', 'LiberationSans-Bold.ttf',
+                     'NotoSans-Bold.ttf', 'FreeSansBold.ttf', 'Arial.ttf')
+
+
+def font_dirs() -> list[str]:
+    """Directories searched for font files on this platform."""
+    home = os.path.expanduser('~')
+    if sys.platform.startswith('win'):
+        return [os.path.join(os.environ.get('WINDIR', 'C:\\Windows'), 'Fonts'),
+                os.path.join(os.environ.get('LOCALAPPDATA', home), 'Microsoft', 'Windows', 'Fonts')]
+    if sys.platform == 'darwin':
+        return [os.path.join(home, 'Library', 'Fonts'), '/Library/Fonts', '/System/Library/Fonts']
+    data = os.environ.get('XDG_DATA_HOME') or os.path.join(home, '.local', 'share')
+    return [os.path.join(data, 'fonts'), os.path.join(home, '.fonts'), '/usr/local/share/fonts', '/usr/share/fonts']
+
+
+@functools.lru_cache(maxsize=1)
+def _font_index() -> dict[str, str]:
+    # lowercase file name -> path for every font below the font dirs; walked once
+    index = {}
+    for d in font_dirs():
+        for dirpath, _, files in os.walk(d):
+            for f in files:
+                if f.lower().endswith(('.ttf', '.otf', '.ttc')):
+                    index.setdefault(f.lower(), os.path.join(dirpath, f))
+    return index
 
-    def _create_slots(self):
-        self.delete('all')
-        self.slots.clear()
-        x = self.pad
-        for _ in range(self.digits):
-            seg_ids = []
-            s, t = self.s, self.t
-            # top horizontal (a)
-            a = self.create_polygon(x+t, self.pad, x+t+s, self.pad, x+t+s-t, self.pad+t, x+t+t, self.pad+t, fill=self.off, outline=self.off)
-            # top-right vertical (b)
-            b = self.create_polygon(x+t+s, self.pad, x+t+s+t, self.pad+t, x+t+s+t, self.pad+t+s, x+t+s, self.pad+t+s-t, fill=self.off, outline=self.off)
-            # bottom-right vertical (c)
-            c = self.create_polygon(x+t+s, self.pad+t+s, x+t+s+t, self.pad+t+s+t, x+t+s+t, self.pad+t+s+t+s, x+t+s, self.pad+t+s+t+s-t, fill=self.off, outline=self.off)
-            # bottom horizontal (d)
-            d = self.create_polygon(x+t, self.pad+t+s+t+s, x+t+s, self.pad+t+s+t+s, x+t+s-t, self.pad+t+s+t+s-t, x+t+t, self.pad+t+s+t+s-t, fill=self.off, outline=self.off)
-            # bottom-left vertical (e)
-            e = self.create_polygon(x, self.pad+t+s, x+t, self.pad+t+s+t, x+t, self.pad+t+s+t+s-t, x, self.pad+t+s+t+s-t, fill=self.off, outline=self.off)
-            # top-left vertical (f)
-            f = self.create_polygon(x, self.pad, x+t, self.pad+t, x+t, self.pad+t+s-t, x, self.pad+t+s, fill=self.off, outline=self.off)
-            # middle horizontal (g)
-            g = self.create_polygon(x+t+t, self.pad+t+s, x+t+s-t, self.pad+t+s, x+t+s-t-t, self.pad+t+s+t, x+t+t+t, self.pad+t+s+t, fill=self.off, outline=self.off)
-            # decimal point
-            dp_r = max(2, t//1 + 2)
-            dp_x = x+t+s+t
-            dp_y = self.pad+t+s+t+s - dp_r*2
-            dp = self.create_oval(dp_x, dp_y, dp_x+dp_r*2, dp_y+dp_r*2, fill=self.off, outline=self.off)
-            seg_ids.extend([a,b,c,d,e,f,g])
-            self.slots.append((seg_ids, dp))
-            x += self.s + self.t*2 + self.pad
 
-    def _apply_resize(self):
-        # adjust geometry to widget width
+@functools.lru_cache(maxsize=None)
+def find_font(*names: str) -> str | None:
+    """Return the path of the first font file in `names` that is installed, or None."""
+    for name in names:
+        # cheap direct hits first (flat Windows font dir), then the one-time walk
+        for d in font_dirs():
+            p = os.path.join(d, name)
+            if os.path.isfile(p):
+                return p
+        p = _font_index().get(name.lower())
+        if p:
+            return p
+    return None
+
+
+@functools.lru_cache(maxsize=32)
+def get_font(path: str | None, size: int):
+    """Return a cached Pillow font for `path` at `size`; Pillow's default font when path is None."""
+    if path is not None:
         try:
-            w = int(self.winfo_width())
-        except Exception:
+            return ImageFont.truetype(path, size)
+        except OSError:
+            pass
+    try:
+        return ImageFont.load_default(size)
+    except TypeError:
+        # Pillow < 10.1: fixed-size bitmap default
+        return ImageFont.load_default()
+
+
+@functools.lru_cache(maxsize=1024)
+def text_bbox(font, text: str) -> tuple[int, int, int, int]:
+    """Return the (left, top, right, bottom) box of `text` drawn at the origin with `font`."""
+    try:
+        return tuple(font.getbbox(text))
+    except AttributeError:
+        w, h = font.getsize(text)
+        return (0, 0, w, h)
+
+
+def keycap_font_path() -> str | None:
+    return find_font(*KEYCAP_FONT_NAMES)
+
+
+def load_keycap_font():
+    """Return the base keycap font (Segoe UI Semibold, Arial, a Linux sans, or Pillow's default)."""
+    return get_font(keycap_font_path(), 32)
+
+
+def render_keycap(lbl: str, font=None, palette: dict | None = None):
+    """Draw the keycap for `lbl` as an RGBA PIL image (requires Pillow).
+
+    `palette` is a theme's 'keycap' colors; the default theme's when omitted.
+    """
+    if font is None:
+        font = load_keycap_font()
+    if palette is None:
+        palette = THEMES[DEFAULT_THEME]['keycap']
+    img_w, img_h = KEYCAP_SIZE
+    # create a flat/vector-style keycap (like the provided illustration):
+    # - transparent outer margin
+    # - dark rounded outer cap
+    # - slightly lighter inner panel (the visible top surface)
+    # - bold white label near the top-middle
+    img = Image.new('RGBA', (img_w, img_h), (0,0,0,0))
+    draw = ImageDraw.Draw(img)
+    # palette for vector style
+    outer = palette['outer']       # outer rounded cap (very dark)
+    inner = palette['inner']       # inner top panel (slightly lighter)
+    corner_radius = 12
+    # inset so the outer pixels are transparent (rounded outer margin)
+    inset = 6
+    left = inset
+    top = inset
+    right = img_w - inset
+    bottom = img_h - inset
+    # draw outer rounded cap (rim)
+    draw.rounded_rectangle((left, top, right, bottom), radius=corner_radius, fill=outer)
+    # draw inner panel inset a bit to form the lighter top surface
+    panel_inset = 6
+    pleft = left + panel_inset
+    ptop = top + panel_inset
+    pright = right - panel_inset
+    pbottom = bottom - panel_inset
+    draw.rounded_rectangle((pleft, ptop, pright, pbottom), radius=max(4, corner_radius-4), fill=inner)
+    # optional accent: make 'C' key orange like the sample
+    accent_labels = {'C'}
+    if lbl in accent_labels:
+        draw.rounded_rectangle((pleft, ptop, pright, pbottom), radius=max(4, corner_radius-4), fill=palette['accent'])
+    # label: bold, white, centered horizontally and placed near top of inner panel
+    txt = lbl
+    base_path = getattr(font, 'path', None)
+    if not isinstance(base_path, str):
+        base_path = None  # Pillow's built-in font is loaded from memory
+    # pick size: larger for single-char keys
+    f = get_font(base_path, 34 if len(lbl) == 1 else 20)
+    left, _, right, _ = text_bbox(f, txt)
+    text_x = (img_w - (right - left)) / 2 - left
+    # place label near top of inner panel (top-centered)
+    text_y = ptop + 2
+    draw.text((text_x, text_y), txt, font=f, fill=palette['text'])
+    return img
+
+
+class Keypad(tk.Canvas):
+    """The keypad drawn on a single canvas.
+
+    Each key is a background rectangle plus its keycap image (or a text label
+    when there is no image). Keys are hit-tested arithmetically from the
+    pointer position, and hover/press feedback swaps the rectangle fill and
+    nudges the cap down, so no widget geometry is ever recalculated.
+    `apply_theme` swaps the fills and keycap images of the live keypad.
+
+    Callbacks get the key label: `on_press` when the mouse goes down on a key,
+    `on_release` when it comes up, and `on_invoke` when it comes up over the
+    key it went down on (like a button's command). Without `on_press` or
+    `on_release` the keypad only updates the key's look.
+    """
+
+    FILLS = THEMES[DEFAULT_THEME]['fills']
+    TRAVEL = 2  # pixels the cap moves down while pressed
+
+    def __init__(self, master, labels, images=None, cols=4, key_size=KEYCAP_SIZE, gap=4,
+                 on_press=None, on_release=None, on_invoke=None, **kw):
+        self.fills = dict(self.FILLS)
+        kw.setdefault('bg', self.fills['normal'])
+        rows = -(-len(labels) // cols)
+        super().__init__(master, width=cols * key_size[0], height=rows * (key_size[1] + gap), highlightthickness=0, **kw)
+        self.labels = list(labels)
+        self.keys = {lbl: i for i, lbl in enumerate(self.labels)}
+        self.cols = cols
+        self.rows = rows
+        self.gap = gap
+        self.on_press = on_press
+        self.on_release = on_release
+        self.on_invoke = on_invoke
+        self.hover = None  # label under the pointer
+        self._pressed = None  # label the mouse button went down on
+        self._state = ['normal'] * len(self.labels)
+        self._size = None
+        self._rects = []
+        self._caps = []
+        images = images or {}
+        for lbl in self.labels:
+            self._rects.append(self.create_rectangle(0, 0, 0, 0, fill=self.fills['normal'], width=0))
+            img = images.get(lbl)
+            if img:
+                self._caps.append(self.create_image(0, 0, image=img))
+            else:
+                self._caps.append(self.create_text(0, 0, text=lbl, fill='#ffffff', font=('Segoe UI', 11, 'bold'), tags='label'))
+        self.bind('<Configure>', self._layout)
+        self.bind('<Motion>', self._on_motion)
+        self.bind('<Leave>', self._on_leave)
+        self.bind('<ButtonPress-1>', self._on_mouse_down)
+        self.bind('<ButtonRelease-1>', self._on_mouse_up)
+
+    def key_at(self, x: int, y: int) -> str | None:
+        """Return the label of the key at canvas position (x, y), or None."""
+        w = self.winfo_width()
+        h = self.winfo_height()
+        if w <= 1 or h <= 1 or x < 0 or y < 0:
+            return None
+        c = int(x * self.cols // w)
+        r = int(y * self.rows // h)
+        i = r * self.cols + c
+        if c >= self.cols or r >= self.rows or i >= len(self.labels):
+            return None
+        return self.labels[i]
+
+    def _layout(self, event=None) -> None:
+        size = (self.winfo_width(), self.winfo_height())
+        if size == self._size:
             return
-        min_total = (self.digits * 10) + (self.pad * (self.digits + 1))
-        if not w or w < min_total:
+        self._size = size
+        cw = size[0] / self.cols
+        ch = size[1] / self.rows
+        half = self.gap / 2
+        for i in range(len(self.labels)):
+            r, c = divmod(i, self.cols)
+            x0, y0 = c * cw, r * ch
+            self.coords(self._rects[i], x0, y0 + half, x0 + cw, y0 + ch - half)
+            dy = self.TRAVEL if self._state[i] == 'pressed' else 0
+            self.coords(self._caps[i], x0 + cw / 2, y0 + ch / 2 + dy)
+
+    @timed('keypad.theme')
+    def apply_theme(self, fills: dict, images=None, text: str | None = None) -> None:
+        """Recolor every key for its current state and swap in `images` (label -> image)."""
+        self.fills = dict(fills)
+        self.configure(bg=self.fills['normal'])
+        for rect, state in zip(self._rects, self._state):
+            self.itemconfigure(rect, fill=self.fills[state])
+        if images:
+            for lbl, cap in zip(self.labels, self._caps):
+                img = images.get(lbl)
+                if img and self.type(cap) == 'image':
+                    self.itemconfigure(cap, image=img)
+        if text:
+            self.itemconfigure('label', fill=text)
+
+    def set_state(self, label: str, state: str) -> None:
+        """Show key `label` as 'normal', 'hover' or 'pressed'."""
+        i = self.keys.get(label)
+        if i is None:
             return
-        total_pad = (self.digits + 1) * self.pad
-        usable = max(20, w - total_pad)
-        per_digit = usable / max(1, self.digits)
-        new_t = max(3, int(per_digit * 0.12))
-        new_s = max(8, int(per_digit - new_t * 2 - 2))
-        if abs(new_s - self.s) < 2 and abs(new_t - self.t) < 1:
+        old = self._state[i]
+        if old == state:
             return
-        self.s = new_s
-        self.t = new_t
-        self._create_geometry()
-        # ensure displayed text is reapplied after resize
+        self._state[i] = state
+        self.itemconfigure(self._rects[i], fill=self.fills[state])
+        if (old == 'pressed') != (state == 'pressed'):
+            self.move(self._caps[i], 0, self.TRAVEL if state == 'pressed' else -self.TRAVEL)
+
+    def _on_motion(self, event) -> None:
+        lbl = self.key_at(event.x, event.y)
+        if lbl == self.hover:
+            return
+        prev, self.hover = self.hover, lbl
+        if prev is not None and self._state[self.keys[prev]] == 'hover':
+            self.set_state(prev, 'normal')
+        if lbl is not None and self._state[self.keys[lbl]] == 'normal':
+            self.set_state(lbl, 'hover')
+
+    def _on_leave(self, event) -> None:
+        if self.hover is not None and self._state[self.keys[self.hover]] == 'hover':
+            self.set_state(self.hover, 'normal')
+        self.hover = None
+
+    def _on_mouse_down(self, event) -> None:
+        lbl = self.key_at(event.x, event.y)
+        self._pressed = lbl
+        if lbl is None:
+            return
+        if self.on_press is not None:
+            self.on_press(lbl)
+        else:
+            self.set_state(lbl, 'pressed')
+
+    def _on_mouse_up(self, event) -> None:
+        lbl, self._pressed = self._pressed, None
+        if lbl is None:
+            return
+        self.hover = self.key_at(event.x, event.y)
+        if self.on_release is not None:
+            self.on_release(lbl)
+        else:
+            self.set_state(lbl, 'hover' if self.hover == lbl else 'normal')
+        if self.hover == lbl and self.on_invoke is not None:
+            self.on_invoke(lbl)
+
+
+def load_keycap_images(master) -> dict:
+    """Load or generate PNG keycap images for all keypad labels as PhotoImages.
+
+    Keycaps come from the asset bundle when it has them; generating them requires
+    Pillow. Without either this returns an empty dict.
+    """
+    bundle = asset_bundle()
+    if bundle is not None:
+        loaded = {}
+        for lbl in KEYPAD_LABELS:
+            data = bundle.get('keycaps/' + keycap_filename(lbl))
+            if data is None:
+                break
+            try:
+                loaded[lbl] = tk.PhotoImage(master=master, data=base64.b64encode(data), format='png')
+            except tk.TclError:
+                break
+        else:
+            return loaded
+    images = {}
+    if Image is None or ImageDraw is None or ImageTk is None:
+        return images
+    labels = KEYPAD_LABELS
+    # write keycaps to a user-accessible folder (under the home directory)
+    base = os.path.join(os.path.expanduser('~'), 'keycaps')
+    os.makedirs(base, exist_ok=True)
+    klog = log.getChild('keycaps')
+    klog.info('generating keycaps in %s', base)
+    font = load_keycap_font()
+
+    for lbl in labels:
+        # Always (re)create and overwrite the keycap PNG so deleted files are regenerated.
+        fn = os.path.join(base, keycap_filename(lbl))
+        img = render_keycap(lbl, font)
+        try:
+            img.save(fn)
+            klog.debug('saved %s', fn)
+        except Exception:
+            klog.warning('failed to save %s, retrying', fn, exc_info=True)
+            try:
+                img.save(fn)
+                klog.debug('saved %s', fn)
+            except Exception:
+                klog.error('failed to save %s', fn, exc_info=True)
+        # load into PhotoImage
         try:
-            if getattr(self, '_last_text', None) is not None:
-                self.set_text(self._last_text)
+            pil = Image.open(fn)
+            images[lbl] = ImageTk.PhotoImage(pil, master=master)
         except Exception:
+            # skip loading if something failed
+            klog.error('failed to load %s', fn, exc_info=True)
+    klog.info('generated %d keycaps', len(images))
+    return images
+
+
+def make_window_icon(master) -> tk.PhotoImage:
+    """Create a small runtime PhotoImage representing a calculator icon.
+
+    The icon is drawn from `icon_pixels` so no external asset is required;
+    a pre-rendered copy in the asset bundle is used when available.
+    """
+    bundle = asset_bundle()
+    data = bundle.get('icons/window_64.png') if bundle is not None else None
+    if data is not None:
+        try:
+            return tk.PhotoImage(master=master, data=base64.b64encode(data), format='png')
+        except tk.TclError:
             pass
+    size = 64
+    img = tk.PhotoImage(master=master, width=size, height=size)
+    # one put() call with every row instead of a Tk round-trip per pixel
+    img.put(' '.join('{' + ' '.join(row) + '}' for row in icon_pixels(size)))
+    return img
 
-    def set_text(self, text: str) -> None:
-        text = str(text)
-        self._last_text = text
-        # split into characters respecting decimal points
-        chars = []
-        i = 0
-        while i < len(text):
-            ch = text[i]
-            if ch == '.':
-                if chars:
-                    chars[-1] += '.'
-                else:
-                    chars.append('.')
-                i += 1
-                continue
-            chars.append(ch)
-            i += 1
-        if len(chars) > self.digits:
-            # keep the most-significant characters (left side) instead of the tail
-            chars = chars[:self.digits]
-        else:
-            chars = [' ']*(self.digits-len(chars)) + chars
-        for idx, ch in enumerate(chars):
-            segs, dp = self.slots[idx]
-            has_dp = ch.endswith('.')
-            base = ch[0] if ch else ' '
-            pattern = SEGMENTS.get(base, SEGMENTS[' '])
-            for seg_id, on in zip(segs, pattern):
-                color = self.on if on else self.off
+
+def prepare_click_sounds() -> dict[str, tuple[str, memoryview | None]]:
+    """Return filename -> (path, bundle data) for every click variant that can be played.
+
+    Variants missing from both the asset bundle and the resource directory are
+    synthesized to a WAV file next to the script first.
+    """
+    # use resource_path so PyInstaller onefile bundles locate assets correctly
+    try:
+        base = resource_path('')
+    except Exception:
+        base = os.getcwd()
+    bundle = asset_bundle()
+    sounds = {}
+    for name, params in CLICK_VARIANTS:
+        path = os.path.join(base, name)
+        data = bundle.get(name) if bundle is not None else None
+        # sounds packed in the asset bundle don't need a file on disk
+        if data is None and not os.path.exists(path):
+            try:
+                write_wav(path, synth_click(params))
+            except Exception:
+                log.getChild('sound').warning('could not write %s', path, exc_info=True)
                 try:
-                    self.itemconfig(seg_id, fill=color, outline=color)
+                    if os.path.exists(path):
+                        os.remove(path)
                 except Exception:
                     pass
-            dp_color = self.dp_color if has_dp else self.off
+                continue
+        sounds[name] = (path, data)
+    return sounds
+
+
+class AssetRegistry:
+    """Keycap images, window icon and click sounds shared by all calculator windows.
+
+    One registry is built per Tk root (PhotoImages belong to its interpreter)
+    the first time a window asks for it; later windows reuse it, so opening
+    one costs no image decoding, rendering or file I/O. Fonts are shared
+    through the module-level font caches. Treat the contents as read-only.
+    Keycaps for other themes are rendered on first use and cached here too.
+    """
+
+    def __init__(self, root: tk.Tk) -> None:
+        try:
+            self.keycaps = types.MappingProxyType(load_keycap_images(root))
+        except Exception:
+            log.getChild('assets').error('keycaps unavailable', exc_info=True)
+            self.keycaps = types.MappingProxyType({})
+        try:
+            self.icon = make_window_icon(root)
+        except Exception:
+            self.icon = None
+        self.clicks = types.MappingProxyType(prepare_click_sounds())
+        self._root = root
+        self._themed_keycaps = {DEFAULT_THEME: self.keycaps}
+
+    def keycaps_for(self, theme: str):
+        """Return the keycap images for `theme`; the default ones when it can't be drawn."""
+        caps = self._themed_keycaps.get(theme)
+        if caps is not None:
+            return caps
+        caps = self.keycaps
+        if theme in THEMES and Image is not None and ImageTk is not None:
             try:
-                self.itemconfig(dp, fill=dp_color, outline=dp_color)
+                font = load_keycap_font()
+                palette = THEMES[theme]['keycap']
+                caps = types.MappingProxyType({
+                    lbl: ImageTk.PhotoImage(render_keycap(lbl, font, palette), master=self._root)
+                    for lbl in KEYPAD_LABELS
+                })
             except Exception:
-                pass
+                log.getChild('assets').error('keycaps for theme %s unavailable', theme, exc_info=True)
+                caps = self.keycaps
+        self._themed_keycaps[theme] = caps
+        return caps
 
+    @classmethod
+    def for_widget(cls, widget: tk.Misc) -> 'AssetRegistry':
+        root = widget._root()
+        reg = getattr(root, '_asset_registry', None)
+        if reg is None:
+            reg = root._asset_registry = cls(root)
+        return reg
 
-class Calculator(tk.Tk):
-    def __init__(self) -> None:
-        super().__init__()
+
+def _recv_line(conn: socket.socket, limit: int) -> bytes:
+    buf = bytearray()
+    while not buf.endswith(b'\n'):
+        chunk = conn.recv(65536)
+        if not chunk:
+            break
+        buf += chunk
+        if len(buf) > limit:
+            raise ValueError('message too long')
+    return bytes(buf)
+
+
+class InstanceServer:
+    """Accepts requests from later launches so they reuse this process.
+
+    Listens on a localhost port published with a random token in
+    INSTANCE_PATH. A request is one JSON line, ``{"token": ..., "expr": ...,
+    "new_window": ...}``, answered with ``ok``. The listener thread only
+    queues requests; the root window polls `requests` with `after`.
+    """
+
+    POLL_MS = 100
+    MAX_REQUEST = 1 << 24
+
+    def __init__(self, path: str = INSTANCE_PATH) -> None:
+        self.path = path
+        self.token = secrets.token_hex(16)
+        self.requests = queue.SimpleQueue()
+        self._sock = socket.create_server(('127.0.0.1', 0))
+        self.port = self._sock.getsockname()[1]
+        self._thread = threading.Thread(target=self._serve, name='instance-server', daemon=True)
+
+    def start(self) -> None:
+        # created private (0600 on POSIX) so other local users can't read the token
+        tmp = self.path + '.tmp'
+        try:
+            os.remove(tmp)
+        except FileNotFoundError:
+            pass
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as fh:
+            json.dump({'port': self.port, 'token': self.token, 'pid': os.getpid()}, fh)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, self.path)
+        self._thread.start()
+
+    def _serve(self) -> None:
+        while True:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return  # closed
+            with conn:
+                try:
+                    conn.settimeout(2.0)
+                    req = json.loads(_recv_line(conn, self.MAX_REQUEST))
+                    if not hmac.compare_digest(str(req.get('token', '')), self.token):
+                        continue
+                    self.requests.put(req)
+                    conn.sendall(b'ok\n')
+                except Exception:
+                    log.getChild('instance').debug('dropped request', exc_info=True)
+
+    def close(self) -> None:
+        try:
+            self._sock.close()
+        except OSError:
+            pass
+        # a newer instance may have published itself since
+        try:
+            with open(self.path, encoding='utf-8') as fh:
+                mine = json.load(fh).get('token') == self.token
+            if mine:
+                os.remove(self.path)
+        except Exception:
+            pass
+
+
+def send_to_instance(request: dict, path: str = INSTANCE_PATH, timeout: float = 1.0) -> bool:
+    """Hand `request` to a running calculator; False when none answers."""
+    try:
+        with open(path, encoding='utf-8') as fh:
+            info = json.load(fh)
+        with socket.create_connection(('127.0.0.1', int(info['port'])), timeout=timeout) as conn:
+            conn.sendall(json.dumps(dict(request, token=info['token'])).encode('utf-8') + b'\n')
+            return _recv_line(conn, 16) == b'ok\n'
+    except Exception:
+        # no instance file, or it is stale (refused, or some other program on the port)
+        return False
+
+
+class CalculatorMixin:
+    """The calculator UI and engine; mixed into a Tk root or a Toplevel.
+
+    Every window has its own expression, memory, history and display; assets
+    come from the shared `AssetRegistry`.
+    """
+
+    def _build_ui(self) -> None:
         self.title('Calculator')
         # reasonable min height so display and buttons don't overlap; adjust slightly
         # set to 560 as requested
@@ -192,23 +2695,40 @@ class Calculator(tk.Tk):
             style.theme_use('clam')
         except Exception:
             pass
-        style.configure('Calc.TButton', font=('Segoe UI', 11, 'bold'), padding=(6,4), background='#2b2b2b', foreground='#fff')
-        style.configure('CalcPressed.TButton', font=('Segoe UI', 11, 'bold'), padding=(4,2), background='#444', foreground='#fff')
-        # keycap color palette for mechanical look
-        KEYCAP_TOP = '#3f3f3f'
-        KEYCAP_INNER = '#2f2f2f'
-        KEYCAP_SHADOW = '#070707'
-        KEYCAP_HOVER = '#515151'
         style.configure('Header.TLabel', font=('Segoe UI', 10, 'bold'))
         # state
         self.current = ''
         self.last_eval = False
-        self.memory = 0.0
+        self.memory_bank = self._shared_memory_bank()
+        self._memory_stats = None
+        if self.memory_bank.active != MemoryBank.DEFAULT:
+            self.title(f'Calculator [{self.memory_bank.active}]')
+        # optional input recorder (see replay.py); gets record(kind, *payload) calls
+        self._recorder = None
         # prefs
         self.pref_on = '#6ef06e'
         self.pref_off = '#022202'
         self.pref_dp = '#ffcc00'
+        self.pref_overflow = 'fit'
+        self.pref_notation = 'sci'
+        self.pref_segments = 7
+        self.pref_render = 'polygons'
+        self.pref_preview = False
+        self.pref_theme = DEFAULT_THEME
+        # programmer mode: integer input/output in `pref_base`, wrapped to `pref_word` bits
+        self.pref_programmer = False
+        self.pref_base = 10
+        self.pref_word = 64
+        self._prog_last = None  # ProgrammerValue of the last result
+        self._prog_entries = {}  # history row text -> (expr, input base, ProgrammerValue)
         self._prefs_path = PREFS_PATH
+        self._journaled = None  # (current, last_eval) last written to the session journal
+        self._paste_job = None
+        # running value of the expression, shown under the display when enabled
+        self._preview = PrefixEvaluator()
+        # prefixes MemoryProfile phases of windows opened after the root
+        self._memory_phase = '' if isinstance(self, tk.Tk) else 'window.'
+        MEMPROFILE.mark(self._memory_phase + 'state')
 
         # main layout: display top, grid left, history right
         main = ttk.Frame(self)
@@ -227,23 +2747,16 @@ class Calculator(tk.Tk):
         disp_bg = tk.Canvas(display_holder, height=disp_h, bg=display_holder['bg'], highlightthickness=0)
         disp_bg.pack(fill='x', expand=True)
 
-        def _draw_display_bg(event=None):
-            w = disp_bg.winfo_width() or 420
-            h = disp_h
-            disp_bg.delete('all')
-            skew = max(6, int(w * 0.02))
-            # trapezoid points (slightly narrower at the top to imply perspective)
-            pts = (skew, 8, w - skew, 8, w - 8, h - 12, 8, h - 12)
-            disp_bg.create_polygon(pts, fill='#141414', outline='#000000')
-            # subtle top highlight
-            disp_bg.create_line(skew + 8, 10, w - skew - 8, 10, fill='#2a2a2a', width=2)
-
-        disp_bg.bind('<Configure>', _draw_display_bg)
+        # live preview text sits in a strip below the panel that is only shown when enabled
+        self._disp_bg = disp_bg
+        self._disp_h = disp_h
+        self._disp_bg_size = None  # size the panel was last drawn at
+        self._preview_item = disp_bg.create_text(406, disp_h + 6, anchor='e', text='', fill='#3f9f3f', font=('Consolas', 10))
 
         # create the seven-segment display so `self.display` always exists
         try:
-            # default to 12 digits; prefs will recreate this later if necessary
-            self.display = SevenSegment(display_holder, digits=12, on=self.pref_on, off=self.pref_off, dp=self.pref_dp)
+            # default to 12 digits; prefs adjust it in place later
+            self.display = SevenSegment(display_holder, digits=12, on=self.pref_on, off=self.pref_off, dp=self.pref_dp, overflow=self.pref_overflow, segments=self.pref_segments, render=self.pref_render, notation=self.pref_notation)
             try:
                 self.display.place(relx=0.5, y=10, anchor='n', relwidth=0.98)
             except Exception:
@@ -252,16 +2765,16 @@ class Calculator(tk.Tk):
             # if creation fails, leave callers to handle absence
             pass
 
-        # try to create and set a small calculator-style window icon
-        try:
-            icon = self._make_window_icon()
+        MEMPROFILE.mark(self._memory_phase + 'display')
+        # shared keycaps, icon and sounds (built by the first window of this root)
+        self.assets = AssetRegistry.for_widget(self)
+        # set the small calculator-style window icon
+        self._icon_image = self.assets.icon
+        if self._icon_image is not None:
             try:
-                self.iconphoto(False, icon)
-                self._icon_image = icon  # keep reference
+                self.iconphoto(False, self._icon_image)
             except Exception:
                 pass
-        except Exception:
-            pass
 
         # ensure the display sits visually above the angled panel
         try:
@@ -272,30 +2785,17 @@ class Calculator(tk.Tk):
         content = ttk.Frame(main)
         content.pack(fill='both', expand=True)
 
-        # Ensure the seven-seg display stays above other widgets when window resizes
-        try:
-            def _on_configure(event=None):
-                disp = getattr(self, 'display', None)
-                if not disp:
-                    return
-                try:
-                    disp.lift()
-                except Exception:
-                    # swallow intermittent errors during startup/resizing
-                    return
-
-            self.bind('<Configure>', _on_configure)
-        except Exception:
-            pass
+        # <Configure> on the toplevel fires for every child widget too; collapse each burst
+        # into one idle-time layout pass (panel redraw + keeping the display on top)
+        self._layout_job = None
+        self.bind('<Configure>', self._schedule_layout)
 
         grid_frame = ttk.Frame(content)
         grid_frame.pack(side='left', fill='both', expand=True)
 
-        # prepare keycap images early so buttons can use them when created
-        try:
-            self._prepare_keycap_images()
-        except Exception:
-            pass
+        MEMPROFILE.mark(self._memory_phase + 'assets')
+        # keycap images so buttons can use them when created
+        self.keycap_images = self.assets.keycaps
 
         # history storage (UI removed for now) -- keep a listbox object in memory so history functions work
         self.hist_visible = False
@@ -311,6 +2811,7 @@ class Calculator(tk.Tk):
         except Exception:
             pass
 
+        MEMPROFILE.mark(self._memory_phase + 'history')
         # buttons (larger)
         buttons = [
             ('MC', self._mem_clear), ('M+', self._mem_add), ('M-', self._mem_sub), ('MR', self._mem_recall),
@@ -321,103 +2822,105 @@ class Calculator(tk.Tk):
             ('0', lambda: self._append('0')), ('.', lambda: self._append('.')), ('=', self._evaluate), ('+', lambda: self._append('+')),
         ]
 
-        r = 0
-        c = 0
-        for label, cmd in buttons:
-            # nested frames to produce a raised 3D effect: outer (shadow) + inner (highlight)
-            # flat key style: collapse outer shadow into same top color to remove grey edge
-            outer_bg = KEYCAP_TOP
-            inner_bg = KEYCAP_TOP
-            bf_outer = tk.Frame(grid_frame, bg=outer_bg, highlightthickness=0)
-            bf_outer.grid(row=r, column=c, padx=0, pady=0, sticky='nsew')
-            # inner frame provides a subtle inset; keep padding minimal for a flat look
-            bf_inner = tk.Frame(bf_outer, bg=inner_bg, highlightthickness=0)
-            bf_inner.pack(fill='both', expand=True, padx=0, pady=0)
-            # the ttk.Button is the keycap top; if keycap image exists use it
-            img = None
-            try:
-                img = getattr(self, 'keycap_images', {}).get(label)
-            except Exception:
-                img = None
-            # Use a flat, borderless tk.Button so there's no white border from the native ttk
-            btn_font = ('Segoe UI', 11, 'bold')
-            if img:
-                b = tk.Button(
-                    bf_inner, image=img, command=cmd,
-                    bd=0, highlightthickness=0, relief='flat',
-                    bg=inner_bg, activebackground=KEYCAP_HOVER,
-                    fg='#ffffff', activeforeground='#ffffff',
-                    font=btn_font, takefocus=False, compound='center'
-                )
-            else:
-                b = tk.Button(
-                    bf_inner, text=label, command=cmd,
-                    bd=0, highlightthickness=0, relief='flat',
-                    bg=inner_bg, activebackground=KEYCAP_HOVER,
-                    fg='#ffffff', activeforeground='#ffffff',
-                    font=btn_font, takefocus=False
-                )
-            # replace raw command with a debounced safe invoker to prevent double-activation
-            try:
-                # store last click timestamps dict on self
-                if not hasattr(self, '_last_click_times'):
-                    self._last_click_times = {}
-                # wrap the original command so rapid repeated clicks are ignored
-                def _make_cmd(fn, lbl, widget):
-                    return lambda f=fn, L=lbl, w=widget: self._safe_invoke(f, L, w)
-                b.config(command=_make_cmd(cmd, label, b))
-            except Exception:
-                # if wrapping fails, leave the original command
-                pass
-            # reduce extra padding so label/image sits centered in the lighter rectangle
-            b.pack(fill='both', expand=True, padx=0, pady=2)
-            # store reference for keyboard-triggered flashes and animations
-            if not hasattr(self, 'buttons'):
-                self.buttons = {}
-            self.buttons[label] = b
-            # press/release handlers (swap style and change frame bg for 3D sink)
-            b.bind('<ButtonPress-1>', lambda e, btn=b: self._on_button_press(btn))
-            b.bind('<ButtonRelease-1>', lambda e, btn=b: self._on_button_release(btn))
-            # hover to slightly brighten the keycap top
-            b.bind('<Enter>', lambda e, btn=b: self._on_button_hover(btn, True))
-            b.bind('<Leave>', lambda e, btn=b: self._on_button_hover(btn, False))
-            c += 1
-            if c > 3:
-                c = 0
-                r += 1
-
-        for i in range(4):
-            grid_frame.columnconfigure(i, weight=1)
+        # one canvas draws every key; press/hover feedback swaps fills without any relayout
+        self._button_commands = dict(buttons)  # unwrapped commands, also used to re-issue replayed clicks
+        self._last_click_times = {}
+        self.keypad = Keypad(
+            grid_frame, [lbl for lbl, _ in buttons], images=self.keycap_images,
+            on_press=self._on_button_press, on_release=self._on_button_release,
+            on_invoke=lambda lbl: self._safe_invoke(self._button_commands[lbl], lbl),
+        )
+        self.keypad.pack(fill='both', expand=True)
+        # label -> key index, for keyboard-triggered flashes and replay
+        self.buttons = self.keypad.keys
+        MEMPROFILE.mark(self._memory_phase + 'keypad')
 
         # menu
         menubar = tk.Menu(self)
+        filemenu = tk.Menu(menubar, tearoff=0)
+        filemenu.add_command(label='New Window', accelerator='Ctrl+N', command=self.new_window)
+        filemenu.add_command(label='Close Window', accelerator='Ctrl+W', command=self._close_window)
+        menubar.add_cascade(label='File', menu=filemenu)
+        memmenu = tk.Menu(menubar, tearoff=0)
+        self._register_var = tk.StringVar(value=self.memory_bank.active)
+        self._register_menu = tk.Menu(memmenu, tearoff=0, postcommand=self._build_register_menu)
+        memmenu.add_cascade(label='Register', menu=self._register_menu)
+        memmenu.add_command(label='New Register...', command=self._new_register)
+        memmenu.add_command(label='Remove Register', command=self._remove_register)
+        memmenu.add_separator()
+        memmenu.add_command(label='Statistics...', command=self._show_memory_stats)
+        menubar.add_cascade(label='Memory', menu=memmenu)
         settings = tk.Menu(menubar, tearoff=0)
         settings.add_command(label='Preferences...', command=self.open_prefs)
         menubar.add_cascade(label='Settings', menu=settings)
         # view menu: history toggle
         view = tk.Menu(menubar, tearoff=0)
         view.add_command(label='Toggle History', accelerator='Ctrl+H', command=self._toggle_history)
+        self._preview_var = tk.BooleanVar(value=False)
+        view.add_checkbutton(label='Live Preview', variable=self._preview_var, command=self._toggle_preview)
+        view.add_separator()
+        self._overlay_var = tk.BooleanVar(value=False)
+        view.add_checkbutton(label='Performance Overlay', accelerator='Ctrl+Shift+P', variable=self._overlay_var, command=self._toggle_perf_overlay)
+        view.add_command(label='Export Metrics...', command=self._export_metrics)
+        view.add_command(label='Memory Report...', command=self._export_memory_report)
         menubar.add_cascade(label='View', menu=view)
+        mode = tk.Menu(menubar, tearoff=0)
+        self._programmer_var = tk.BooleanVar(value=False)
+        mode.add_checkbutton(label='Programmer', variable=self._programmer_var, command=self._toggle_programmer)
+        mode.add_separator()
+        self._base_var = tk.IntVar(value=10)
+        for name, base in PROGRAMMER_BASES.items():
+            mode.add_radiobutton(label=name, variable=self._base_var, value=base, command=lambda: self._set_base(self._base_var.get()))
+        mode.add_separator()
+        self._word_var = tk.IntVar(value=64)
+        for bits in WORD_SIZES:
+            mode.add_radiobutton(label=f'{bits}-bit' if bits else 'Unbounded', variable=self._word_var, value=bits, command=lambda: self._set_word(self._word_var.get()))
+        menubar.add_cascade(label='Mode', menu=mode)
         # put History as the right-most top-level command by adding it last
         menubar.add_command(label='History', command=self._toggle_history)
         self.config(menu=menubar)
 
-        # bindings
-        self.bind_all('<Key>', self._on_key)
+        # bindings on this toplevel (not bind_all) so keys only reach the focused window
+        self.bind('<Key>', self._on_key)
         # keyboard shortcuts
-        self.bind_all('<Control-m>', lambda e: (self._flash_button_for_label('MR'), self._mem_recall()))
-        self.bind_all('<Control-h>', lambda e: self._toggle_history())
+        self.bind('<Control-m>', lambda e: (self._flash_button_for_label('MR'), self._mem_recall()))
+        self.bind('<Control-h>', lambda e: self._toggle_history())
+        self.bind('<Control-P>', lambda e: (self._overlay_var.set(not self._overlay_var.get()), self._toggle_perf_overlay()))
+        self.bind('<Control-n>', lambda e: self.new_window())
+        self.bind('<Control-v>', self._paste)
+        self.bind('<Control-w>', lambda e: self._close_window())
+        self.protocol('WM_DELETE_WINDOW', self._close_window)
+        MEMPROFILE.mark(self._memory_phase + 'menus')
         self._load_prefs()
-        # prepare click sound (written next to this script)
+        self._preview_var.set(self.pref_preview)
+        self._programmer_var.set(self.pref_programmer)
+        self._base_var.set(self.pref_base)
+        self._word_var.set(self.pref_word)
+        self._apply_preview_layout()
+        # pick the click sound from the shared assets
         try:
             self._ensure_click_sound()
         except Exception:
             pass
         self._update_display('0')
+        self._restore_session()
+        MEMPROFILE.mark(self._memory_phase + 'prefs')
 
-    def _update_display(self, text: str) -> None:
+    def _update_display(self, text: str, fit: bool = False) -> None:
         # Show only the current numeric token (the part after the last binary operator).
         # Preserve a leading unary minus (e.g. '-5') and ignore exponent signs (e.g. '1e-3').
+        # `fit` lets the display reformat long results (rounding / scientific notation);
+        # tokens being typed are never reformatted and scroll instead.
+        self._journal_state()
+        if self.pref_programmer:
+            token = split_programmer_token(text or '')[1]
+            try:
+                # only decimal numbers can be rounded; other bases scroll
+                self.display.set_text(token.upper() or '0', fit=fit and self.pref_base == 10)
+            except Exception:
+                pass
+            self._refresh_preview()
+            return
         try:
             expr = text or ''
             # find the last binary operator position (not a leading unary sign or exponent sign)
@@ -439,14 +2942,94 @@ class Calculator(tk.Tk):
                 i -= 1
             token = expr[last_op+1:] if last_op != -1 else expr
             # if token is empty, show 0; otherwise preserve token (including leading '-')
-            self.display.set_text(token or '0')
+            self.display.set_text(token or '0', fit=fit)
         except Exception:
             try:
-                self.display.set_text(text)
+                self.display.set_text(text, fit=fit)
             except Exception:
                 pass
+        self._refresh_preview()
+
+    # --- Layout ---
+    def _schedule_layout(self, event=None) -> None:
+        if self._layout_job is None:
+            self._layout_job = self.after_idle(self._layout_pass)
+
+    @timed('layout.pass')
+    def _layout_pass(self) -> None:
+        """Redraw the display panel if its size changed and keep the display above it."""
+        self._layout_job = None
+        disp_bg = self._disp_bg
+        try:
+            size = (disp_bg.winfo_width(), disp_bg.winfo_height())
+        except tk.TclError:
+            return
+        if size != self._disp_bg_size:
+            self._disp_bg_size = size
+            self._draw_display_bg(size[0] if size[0] > 1 else 420)
+        disp = getattr(self, 'display', None)
+        if not disp:
+            return
+        try:
+            # `winfo children` lists siblings in stacking order, lowest first
+            siblings = self.tk.splitlist(self.tk.call('winfo', 'children', disp.winfo_parent()))
+            if siblings and siblings[-1] != str(disp):
+                disp.lift()
+        except tk.TclError:
+            # swallow intermittent errors during startup/resizing
+            pass
+
+    def _draw_display_bg(self, w: int) -> None:
+        # skewed/trapezoid panel to simulate an angled, raised display
+        disp_bg = self._disp_bg
+        h = self._disp_h
+        disp_bg.delete('panel')
+        skew = max(6, int(w * 0.02))
+        # trapezoid points (slightly narrower at the top to imply perspective)
+        pts = (skew, 8, w - skew, 8, w - 8, h - 12, 8, h - 12)
+        panel = THEMES.get(self.pref_theme, THEMES[DEFAULT_THEME])['panel']
+        disp_bg.create_polygon(pts, fill=panel, outline='#000000', tags=('panel', 'panel_face'))
+        # subtle top highlight
+        disp_bg.create_line(skew + 8, 10, w - skew - 8, 10, fill='#2a2a2a', width=2, tags='panel')
+        disp_bg.tag_lower('panel')
+        disp_bg.coords(self._preview_item, w - 14, h + 6)
+
+    # --- Live preview ---
+    def _toggle_preview(self) -> None:
+        self.pref_preview = bool(self._preview_var.get())
+        self._save_prefs({'preview': self.pref_preview})
+        self._apply_preview_layout()
+        self._refresh_preview()
+
+    def _apply_preview_layout(self) -> None:
+        # grow the display background by a text line while the preview is on
+        try:
+            self._disp_bg.config(height=self._disp_h + (16 if self.pref_preview else 0))
+        except Exception:
+            pass
+
+    @timed('calc.preview')
+    def _refresh_preview(self) -> None:
+        """Show the running value of the expression being typed (nothing right after '=')."""
+        if not self.pref_preview:
+            return
+        text = ''
+        expr = self.current or ''
+        # the running value is decimal arithmetic; programmer mode has none
+        if expr and not self.last_eval and not self.pref_programmer:
+            value = self._preview.update(expr)
+            # a lone number is already on the display
+            if value is not None and not _NUMBER_RE.fullmatch(expr.lstrip('-')):
+                text = '= ' + format_result(value)
+        try:
+            self._disp_bg.itemconfigure(self._preview_item, text=text)
+        except Exception:
+            pass
 
     def _append(self, ch: str) -> None:
+        if self.pref_programmer:
+            self._append_programmer(ch)
+            return
         # Operator handling: when an operator is pressed, append or replace
         if ch in '+-*/':
             if not self.current:
@@ -500,17 +3083,64 @@ class Calculator(tk.Tk):
         self.last_eval = False
         self._update_display(self.current or '0')
 
+    _PROG_BINOPS = ('<<', '>>', '+', '-', '*', '/', '%', '&', '|', '^')
+
+    def _append_programmer(self, ch: str) -> None:
+        # '<' and '>' type the whole shift operator
+        tok = {'<': '<<', '>': '>>'}.get(ch, ch.upper())
+        if tok in self._PROG_BINOPS:
+            if not self.current:
+                if tok == '-':
+                    self.current = '-'
+                    self._update_display(self.current)
+                return
+            # replace trailing operator if present
+            for op in self._PROG_BINOPS:
+                if self.current.endswith(op):
+                    self.current = self.current[:-len(op)]
+                    break
+            self.current += tok
+            self.last_eval = False
+            self._update_display('')
+            return
+        if tok in '~()':
+            if self.last_eval and tok != ')':
+                self.current = ''
+            self.current += tok
+            self.last_eval = False
+            self._update_display(self.current)
+            return
+        if tok not in BASE_DIGITS[self.pref_base]:
+            # '.' and digits that don't exist in this base
+            return
+        if self.last_eval:
+            self.current = ''
+        self.current += tok
+        self.last_eval = False
+        self._update_display(self.current)
+
     def _clear(self) -> None:
         self.current = ''
         self._update_display('0')
 
     def _backspace(self) -> None:
+        if self.pref_programmer and self.current.endswith(('<<', '>>')):
+            self.current = self.current[:-2]
+            self._update_display(self.current or '0')
+            return
         self.current = self.current[:-1]
         self._update_display(self.current or '0')
 
     def _negate(self) -> None:
         # Toggle the sign of the current numeric token (the substring after the last operator).
         s = self.current or ''
+        if self.pref_programmer:
+            prefix, token = split_programmer_token(s)
+            token = token[1:] if token.startswith('-') else '-' + token
+            self.current = prefix + token
+            self.last_eval = False
+            self._update_display(self.current)
+            return
         # find split point: last operator that is not part of an exponent sign
         def _split_prefix_token(expr: str) -> tuple[str, str]:
             if not expr:
@@ -541,70 +3171,344 @@ class Calculator(tk.Tk):
         self._update_display(token or '0')
 
     def _percent(self) -> None:
+        if self.pref_programmer:
+            # integers have no percent; the key is the remainder operator
+            self._append('%')
+            return
         try:
             v = float(self.current or '0') / 100.0
             self.current = str(v)
-            self._update_display(self.current)
+            self._update_display(self.current, fit=True)
+        except Exception:
+            self._show_error()
+
+    def _show_error(self, text: str = 'Error') -> None:
+        """Show an error state ('Error' or '-OF-' for overflow) on the display itself.
+
+        The entry is reset so the next key starts a fresh number, as on a hardware calculator.
+        """
+        self.current = ''
+        self.last_eval = True
+        self._journal_state()
+        try:
+            self.display.set_text(text)
         except Exception:
-            messagebox.showerror('Error', 'Invalid percent')
+            pass
+        self._refresh_preview()
 
+    @timed('calc.evaluate')
     def _evaluate(self) -> None:
         expr = (self.current or '').strip()
         if not expr:
             return
+        if self.pref_programmer:
+            self._evaluate_programmer(expr)
+            return
         allowed = set('0123456789.+-*/() %eE')
-        if any(ch not in allowed for ch in expr):
-            messagebox.showerror('Error', 'Invalid characters in expression')
+        # Python's ** and // aren't calculator operators
+        if any(ch not in allowed for ch in expr) or '**' in expr or '//' in expr:
+            self._show_error()
             return
         try:
-            result = eval(expr, {'__builtins__': {}}, {})
-            if isinstance(result, float) and (math.isinf(result) or math.isnan(result)):
+            try:
+                result = eval(expr, {'__builtins__': {}}, {})
+            except (SyntaxError, RecursionError, MemoryError):
+                # too long or deeply nested for Python's compiler: the preview's parser
+                # isn't recursive, so '=' gives the value the preview shows
+                result = self._preview.update(expr)
+                if result is None or not self._preview.complete:
+                    raise ValueError('invalid expression') from None
+            if isinstance(result, float) and math.isinf(result):
+                raise OverflowError('Result out of range')
+            if isinstance(result, float) and math.isnan(result):
                 raise ValueError('Invalid numeric result')
-            # Format the result for display/history:
-            # - If a float is mathematically integral, show as an integer (no trailing .0)
-            # - Otherwise show a compact representation to avoid long floating-point artifacts
-            if isinstance(result, float):
-                if float(result).is_integer():
-                    result_str = str(int(result))
-                else:
-                    # limit to 12 significant digits to avoid long tails
-                    result_str = f"{result:.12g}"
+            result_str = format_result(result)
+            entry = f"{expr} = {result_str}"
+            self.hist_list.insert(0, entry)
+            self._journal('h', entry)
+            self.current = result_str
+            self.last_eval = True
+            self._update_display(self.current, fit=True)
+        except OverflowError:
+            self._show_error('-OF-')
+        except Exception:
+            self._show_error()
+
+    def _evaluate_programmer(self, expr: str) -> None:
+        base = self.pref_base
+        try:
+            value = eval_programmer(expr, base, self.pref_word)
+        except (ValueError, SyntaxError, ZeroDivisionError, TypeError):
+            self._show_error()
+            return
+        except (OverflowError, MemoryError):
+            # e.g. a shift by a huge count
+            self._show_error('-OF-')
+            return
+        entry = (expr, base, value)
+        label = self._programmer_label(entry, base)
+        self._prog_entries[label] = entry
+        self.hist_list.insert(0, label)
+        # programmer rows are journaled as data so they can be relabeled after a restore
+        self._journal('h', [expr, base, format(value.value, 'x'), value.word])
+        self._prog_last = value
+        self.current = value.text(base)
+        self.last_eval = True
+        self._update_display(self.current, fit=True)
+
+    @staticmethod
+    def _programmer_label(entry: tuple, base: int) -> str:
+        expr, in_base, value = entry
+        return f'{expr}{BASE_SUFFIX[in_base]} = {value.text(base)}{BASE_SUFFIX[base]}'
+
+    def _relabel_history(self) -> None:
+        """Show programmer results in history in the current base (texts are cached per entry)."""
+        entries = {}
+        for i, text in enumerate(self.hist_list.get(0, 'end')):
+            entry = self._prog_entries.get(text)
+            if entry is None:
+                continue
+            label = self._programmer_label(entry, self.pref_base)
+            if label != text:
+                self.hist_list.delete(i)
+                self.hist_list.insert(i, label)
+            entries[label] = entry
+        self._prog_entries = entries
+
+    def _toggle_programmer(self) -> None:
+        self.pref_programmer = bool(self._programmer_var.get())
+        # decimal and programmer expressions don't mix
+        self._prog_last = None
+        self.current = ''
+        self.last_eval = False
+        self._update_display('0')
+        self._save_prefs({'programmer': self.pref_programmer})
+
+    def _set_base(self, base: int) -> None:
+        old, self.pref_base = self.pref_base, base
+        if self.pref_programmer and old != base:
+            if self.last_eval and self._prog_last is not None:
+                self.current = self._prog_last.text(base)
             else:
-                result_str = str(result)
-            entry = f"{expr} = {result_str}"
-            self.hist_list.insert(0, entry)
-            self.current = result_str
-            self.last_eval = True
-            self._update_display(self.current)
-        except Exception:
-            messagebox.showerror('Error', 'Failed to evaluate expression')
+                self.current = convert_programmer_expr(self.current, old, base)
+            self._relabel_history()
+            self._update_display(self.current or '0', fit=self.last_eval)
+        self._save_prefs({'base': base})
+
+    def _set_word(self, word: int) -> None:
+        self.pref_word = word
+        if self.pref_programmer and self.last_eval and self._prog_last is not None:
+            # wrap the shown result to the new width
+            self._prog_last = ProgrammerValue(self._prog_last.signed(), word)
+            self.current = self._prog_last.text(self.pref_base)
+            self._update_display(self.current, fit=True)
+        self._save_prefs({'word': word})
 
     # memory
+    def _shared_memory_bank(self) -> MemoryBank:
+        """The process's memory bank, loaded by the first window.
+
+        Registers are deliberately shared by every window: they persist in one
+        file, and M+ in any window adds to the same running tally.
+        """
+        root = self._root()
+        if getattr(root, '_memory_bank', None) is None:
+            root._memory_bank = MemoryBank.load()
+        return root._memory_bank
+
+    @property
+    def memory(self) -> float:
+        """Total of the active memory register."""
+        return self.memory_bank.register().total
+
+    @memory.setter
+    def memory(self, value: float) -> None:
+        reg = self.memory_bank.register()
+        reg.clear()
+        if value:
+            reg.add(value)
+        self._memory_changed()
+
     def _mem_clear(self) -> None:
-        self.memory = 0.0
+        self.memory_bank.register().clear()
+        self._memory_changed()
 
     def _mem_add(self) -> None:
         try:
-            self.memory += float(self.current or '0')
+            self.memory_bank.register().add(float(self.current or '0'))
         except Exception:
-            pass
+            return
+        self._memory_changed()
 
     def _mem_sub(self) -> None:
         try:
-            self.memory -= float(self.current or '0')
+            self.memory_bank.register().add(-float(self.current or '0'))
         except Exception:
-            pass
+            return
+        self._memory_changed()
 
     def _mem_recall(self) -> None:
-        self.current = str(self.memory)
-        self._update_display(self.current)
+        self.current = format_result(self.memory)
+        self._update_display(self.current, fit=True)
+
+    def _select_register(self, name: str) -> None:
+        self.memory_bank.select(name)
+        self._memory_changed()
+
+    def _new_register(self) -> None:
+        name = simpledialog.askstring('New Register', 'Register name:', parent=self)
+        name = (name or '').strip()
+        if name:
+            self._select_register(name[:16])
+
+    def _remove_register(self) -> None:
+        self.memory_bank.remove(self.memory_bank.active)
+        self._memory_changed()
+
+    def _memory_changed(self) -> None:
+        """Update the title and stats view, and schedule a save of the memory bank."""
+        active = self.memory_bank.active
+        self.title('Calculator' if active == MemoryBank.DEFAULT else f'Calculator [{active}]')
+        self._refresh_memory_stats()
+        root = self._root()
+        # coalesce bursts of M+ into one write
+        if getattr(root, '_memory_save_job', None) is None:
+            root._memory_save_job = root.after(1000, self._save_memory)
+
+    def _save_memory(self) -> None:
+        root = self._root()
+        job = getattr(root, '_memory_save_job', None)
+        if job is not None:
+            try:
+                root.after_cancel(job)
+            except Exception:
+                pass
+            root._memory_save_job = None
+        try:
+            self.memory_bank.save()
+        except Exception:
+            log.getChild('memory').warning('could not save %s', MEMORY_PATH, exc_info=True)
+
+    # --- Session journal ---
+    def _journal(self, *record) -> None:
+        """Append `record` to the session journal and schedule a batched fsync."""
+        root = self._root()
+        journal = getattr(root, '_session', None)
+        # the expression and history restored are the main window's
+        if journal is None or self is not root:
+            return
+        journal.append(*record)
+        if getattr(root, '_session_sync_job', None) is None:
+            root._session_sync_job = root.after(SessionJournal.SYNC_MS, root._sync_session)
+
+    def _journal_state(self) -> None:
+        state = (self.current, self.last_eval)
+        if state != self._journaled:
+            self._journaled = state
+            self._journal('c', *state)
+
+    def _sync_session(self) -> None:
+        self._session_sync_job = None
+        self._session.sync()
+        if self._session.records >= SessionJournal.COMPACT_EVERY:
+            self._session.compact()
+
+    @timed('session.restore')
+    def _restore_session(self) -> None:
+        """Bring back the last session's expression and history (main window only)."""
+        journal = getattr(self, '_session', None)
+        if journal is None:
+            return
+        state = journal.load()
+        rows = []
+        for item in state['history']:
+            if isinstance(item, list):
+                # programmer row: [expr, input base, value bits in hex, word size]
+                try:
+                    expr, base, bits, word = item
+                    entry = (expr, base, ProgrammerValue(int(bits, 16), word))
+                    item = self._programmer_label(entry, self.pref_base)
+                except Exception:
+                    continue
+                self._prog_entries[item] = entry
+            rows.append(str(item))
+        if rows:
+            self.hist_list.insert('end', *rows)
+        self.current, self.last_eval = state['current'], state['last_eval']
+        if self.pref_programmer and self.last_eval and rows:
+            entry = self._prog_entries.get(rows[0])
+            if entry is not None and entry[2].text(self.pref_base) == self.current:
+                self._prog_last = entry[2]
+        self._update_display(self.current or '0', fit=self.last_eval)
+        journal.open()
+
+    def _build_register_menu(self) -> None:
+        # rebuilt each time the menu opens so registers created in other windows show up
+        menu = self._register_menu
+        menu.delete(0, 'end')
+        bank = self.memory_bank
+        names = [MemoryBank.DEFAULT] + [f'M{i}' for i in range(1, 10)]
+        names += sorted(n for n in bank.registers if n not in names)
+        self._register_var.set(bank.active)
+        for name in names:
+            reg = bank.registers.get(name)
+            label = name if reg is None or not reg.count else f'{name}  ({format_result(reg.total)})'
+            menu.add_radiobutton(label=label, value=name, variable=self._register_var,
+                                 command=lambda n=name: self._select_register(n))
+
+    def _show_memory_stats(self) -> None:
+        """Open (or raise) a window listing every register's statistics."""
+        win = self._memory_stats
+        if win is not None and win.winfo_exists():
+            win.lift()
+            return
+        win = self._memory_stats = tk.Toplevel(self)
+        win.title('Memory Registers')
+        if getattr(self, '_icon_image', None) is not None:
+            try:
+                win.iconphoto(False, self._icon_image)
+            except Exception:
+                pass
+        cols = ('count', 'total', 'mean', 'stdev', 'min', 'max')
+        tree = ttk.Treeview(win, columns=cols, height=10)
+        tree.heading('#0', text='Register')
+        tree.column('#0', width=90)
+        for c in cols:
+            tree.heading(c, text=c.capitalize())
+            tree.column(c, width=90, anchor='e')
+        tree.pack(fill='both', expand=True, padx=6, pady=6)
+        win._tree = tree
+        self._refresh_memory_stats()
+
+    def _refresh_memory_stats(self) -> None:
+        win = self._memory_stats
+        if win is None or not win.winfo_exists():
+            return
+        tree = win._tree
+        tree.delete(*tree.get_children())
+        bank = self.memory_bank
+        for name in sorted(bank.registers):
+            reg = bank.registers[name]
+            values = [reg.count, format_result(reg.total)]
+            if reg.count:
+                values += [format_result(reg.mean), format_result(reg.stdev), format_result(reg.min), format_result(reg.max)]
+            text = name + (' *' if name == bank.active else '')
+            tree.insert('', 'end', text=text, values=values)
 
     def _on_history_double(self, event=None) -> None:
         sel = self.hist_list.curselection()
         if not sel:
             return
         text = self.hist_list.get(sel[0])
-        if ' = ' in text:
+        entry = self._prog_entries.get(text)
+        if entry is not None:
+            # programmer entries come back as typed, in the current base
+            if not self.pref_programmer:
+                return
+            self.current = convert_programmer_expr(entry[0], entry[1], self.pref_base)
+            self.last_eval = False
+            self._update_display(self.current)
+        elif ' = ' in text:
             expr, _ = text.split(' = ', 1)
             self.current = expr
             self._update_display(self.current)
@@ -630,159 +3534,12 @@ class Calculator(tk.Tk):
             with open(self._prefs_path, 'w', encoding='utf-8') as fh:
                 json.dump(prefs, fh)
         except Exception:
-            pass
-
-    def _prepare_keycap_images(self) -> None:
-        """Generate or load PNG keycap images for all keypad labels and store PhotoImage objects.
-        Requires Pillow. If Pillow isn't available this is a no-op.
-        """
-        if Image is None or ImageDraw is None or ImageTk is None:
-            return
-        # labels used on the keypad in the same order as `buttons` definition
-        labels = ['MC','M+','M-','MR','C','+/-','%','←',
-                  '7','8','9','/','4','5','6','*','1','2','3','-','0','.','=','+']
-        # write keycaps and log to a user-accessible folder (under the home directory)
-        base = os.path.join(os.path.expanduser('~'), 'keycaps')
-        os.makedirs(base, exist_ok=True)
-        log_path = os.path.join(base, 'generator.log')
-        # also write a copy into the workspace for the assistant to read
-        workspace_log = os.path.join('C:\\workspace', 'keycaps_generator.log')
-        def log(msg: str) -> None:
-            try:
-                with open(log_path, 'a', encoding='utf-8') as lf:
-                    lf.write(msg + '\n')
-            except Exception:
-                pass
-            try:
-                with open(workspace_log, 'a', encoding='utf-8') as wf:
-                    wf.write(msg + '\n')
-            except Exception:
-                pass
-        log(f'[keycap] base dir: {base}')
-        self.keycap_images = {}
-        # choose sizes
-        img_w = 88
-        img_h = 64
-        try:
-            # try to get a TTF font; fallback to default if not found
-            font = ImageFont.truetype('seguisb.ttf', 32)
-        except Exception:
-            try:
-                font = ImageFont.truetype('arial.ttf', 32)
-            except Exception:
-                font = ImageFont.load_default()
-
-        for lbl in labels:
-            # create an image for this label
-            # sanitize label for filename (replace or name-map unsafe characters)
-            safe_map = {
-                '+/-': 'plusminus', '/': 'slash', '*': 'star', '\\': 'backslash',
-                '←': 'back', '.': 'dot', '+': 'plus', '-': 'minus', '%': 'percent',
-                '=': 'equals'
-            }
-            safe_lbl = safe_map.get(lbl, None)
-            if safe_lbl is None:
-                # fallback: keep alphanumerics, replace others with underscore
-                import re
-                safe_lbl = re.sub(r'[^A-Za-z0-9]+', '_', lbl)
-                if not safe_lbl:
-                    safe_lbl = 'key'
-            fn = os.path.join(base, f'keycap_{safe_lbl}.png')
-            # Always (re)create and overwrite the keycap PNG so deleted files are regenerated.
-            # create a flat/vector-style keycap (like the provided illustration):
-            # - transparent outer margin
-            # - dark rounded outer cap
-            # - slightly lighter inner panel (the visible top surface)
-            # - bold white label near the top-middle
-            img = Image.new('RGBA', (img_w, img_h), (0,0,0,0))
-            draw = ImageDraw.Draw(img)
-            # palette for vector style
-            outer = (20, 20, 20, 255)      # outer rounded cap (very dark)
-            inner = (56, 56, 56, 255)      # inner top panel (slightly lighter)
-            corner_radius = 12
-            # inset so the outer pixels are transparent (rounded outer margin)
-            inset = 6
-            left = inset
-            top = inset
-            right = img_w - inset
-            bottom = img_h - inset
-            # draw outer rounded cap (rim)
-            draw.rounded_rectangle((left, top, right, bottom), radius=corner_radius, fill=outer)
-            # draw inner panel inset a bit to form the lighter top surface
-            panel_inset = 6
-            pleft = left + panel_inset
-            ptop = top + panel_inset
-            pright = right - panel_inset
-            pbottom = bottom - panel_inset
-            draw.rounded_rectangle((pleft, ptop, pright, pbottom), radius=max(4, corner_radius-4), fill=inner)
-            # optional accent: make 'C' key orange like the sample
-            accent_orange = (245, 140, 30, 255)
-            accent_labels = {'C'}
-            if lbl in accent_labels:
-                draw.rounded_rectangle((pleft, ptop, pright, pbottom), radius=max(4, corner_radius-4), fill=accent_orange)
-            # label: bold, white, centered horizontally and placed near top of inner panel
-            txt = lbl
-            try:
-                base_path = getattr(font, 'path', None)
-            except Exception:
-                base_path = None
-            # pick size: larger for single-char keys
-            if len(lbl) == 1:
-                try:
-                    if base_path:
-                        f = ImageFont.truetype(base_path, 34)
-                    else:
-                        f = ImageFont.truetype('arial.ttf', 34)
-                except Exception:
-                    f = font
-            else:
-                try:
-                    if base_path:
-                        f = ImageFont.truetype(base_path, 20)
-                    else:
-                        f = ImageFont.truetype('arial.ttf', 20)
-                except Exception:
-                    f = font
-            try:
-                w, h = f.getsize(txt)
-            except Exception:
-                try:
-                    w, h = draw.textsize(txt, font=f)
-                except Exception:
-                    w, h = (28, 18)
-            text_x = (img_w - w) / 2
-            # place label near top of inner panel (top-centered)
-            text_y = ptop + 2
-            draw.text((text_x, text_y), txt, font=f, fill=(250,250,250,255))
-            try:
-                img.save(fn)
-                log(f'[keycap] saved: {fn}')
-            except Exception as e:
-                import traceback
-                log(f'[keycap] failed save: {fn} -> {e}')
-                log(traceback.format_exc())
-                try:
-                    img.save(fn)
-                    log(f'[keycap] saved: {fn}')
-                except Exception as e:
-                    import traceback
-                    log(f'[keycap] failed save: {fn} -> {e}')
-                    log(traceback.format_exc())
-            # load into PhotoImage
-            try:
-                pil = Image.open(fn)
-                tkimg = ImageTk.PhotoImage(pil)
-                self.keycap_images[lbl] = tkimg
-            except Exception as e:
-                import traceback
-                log(f'[keycap] failed load: {fn} -> {e}')
-                log(traceback.format_exc())
-                # skip loading if something failed
-                pass
-        log('[keycap] generation complete')
-
+            log.getChild('prefs').warning('could not save %s', self._prefs_path, exc_info=True)
 
+    @timed('input.key')
     def _on_key(self, event) -> None:
+        if self._recorder is not None:
+            self._recorder.record('k', event.keysym, event.char)
         if event.keysym in ('Return', 'KP_Enter'):
             # animate '=' button then evaluate
             self._flash_button_for_label('=')
@@ -793,12 +3550,68 @@ class Calculator(tk.Tk):
         if event.keysym == 'Escape':
             self._flash_button_for_label('C')
             self._clear(); return
+        # arrow keys move the display viewport over text longer than the display
+        if event.keysym in ('Left', 'Right'):
+            try:
+                self.display.scroll(1 if event.keysym == 'Left' else -1)
+            except Exception:
+                pass
+            return
         ch = event.char
+        if ch and self.pref_programmer and ch in 'abcdefABCDEF&|^~<>%':
+            self._append(ch)
+            return
         if ch and ch in '0123456789.+-*/()':
             # trigger visual flash for the corresponding button
             self._flash_button_for_label(ch)
             self._append(ch)
 
+    # --- Paste ---
+    PASTE_CHUNK = 1 << 14  # characters handled per event-loop turn
+
+    def _paste(self, event=None) -> str:
+        """Append the clipboard to the expression without blocking the window.
+
+        The text is validated in chunks scheduled with `after`; the display is
+        updated once at the end, without key flashes or clicks. Text the keys
+        can't enter is rejected with the bell, leaving the expression as it was.
+        """
+        try:
+            text = self.clipboard_get()
+        except tk.TclError:
+            return 'break'
+        if self._paste_job is not None:
+            self.after_cancel(self._paste_job)
+            self._paste_job = None
+        # after '=' a number starts a new expression and an operator continues the result
+        binops = self._PROG_BINOPS if self.pref_programmer else tuple('+-*/')
+        fresh = self.last_eval and not text.lstrip().startswith(binops)
+        buf = PasteBuffer('' if fresh else self.current, self.pref_base if self.pref_programmer else None)
+        self._paste_step(buf, text, 0, (self.current, self.last_eval))
+        return 'break'
+
+    def _paste_step(self, buf: PasteBuffer, text: str, pos: int, start: tuple) -> None:
+        self._paste_job = None
+        if (self.current, self.last_eval) != start:
+            # keys pressed meanwhile win over the rest of the paste
+            return
+        end = pos + self.PASTE_CHUNK
+        try:
+            buf.feed(text[pos:end])
+            if end < len(text):
+                if self.pref_preview and not self.pref_programmer:
+                    # spread the running value's parse over the chunks as well
+                    self._preview.update(buf.text())
+                self._paste_job = self.after(1, self._paste_step, buf, text, end, start)
+                return
+            self.current = buf.finish()
+        except ValueError:
+            # nothing was changed yet, so the expression being typed is kept
+            self.bell()
+            return
+        self.last_eval = False
+        self._update_display(self.current or '0')
+
     def open_prefs(self) -> None:
         dlg = tk.Toplevel(self)
         dlg.title('Preferences')
@@ -813,7 +3626,7 @@ class Calculator(tk.Tk):
 
         ttk.Label(dlg, text='Digits:').grid(row=0, column=0, sticky='e', padx=6, pady=6)
         digits_var = tk.IntVar(value=self.display.digits)
-        # limit allowed digits to 12 for the seven-segment display
+        # limit the slot count to 12; text longer than the display is fitted or scrolled
         tk.Spinbox(dlg, from_=4, to=12, textvariable=digits_var, width=6).grid(row=0, column=1, sticky='w')
 
         ttk.Label(dlg, text='Segment On Color:').grid(row=1, column=0, sticky='e', padx=6, pady=6)
@@ -884,47 +3697,58 @@ class Calculator(tk.Tk):
         click_combo = ttk.Combobox(dlg, textvariable=click_var, values=['Thock', 'Balanced', 'Snap'], state='readonly', width=10)
         click_combo.grid(row=4, column=1, sticky='w')
 
+        # how results longer than the display are shown
+        ttk.Label(dlg, text='Long Numbers:').grid(row=5, column=0, sticky='e', padx=6, pady=6)
+        if self.pref_overflow == 'scroll':
+            cur_overflow = 'Scroll'
+        else:
+            cur_overflow = 'Engineering' if self.pref_notation == 'eng' else 'Fit'
+        overflow_var = tk.StringVar(value=cur_overflow)
+        ttk.Combobox(dlg, textvariable=overflow_var, values=['Fit', 'Engineering', 'Scroll'], state='readonly', width=11).grid(row=5, column=1, sticky='w')
+
+        # segment style: 7 for classic digits, 14/16 for alphanumeric displays
+        ttk.Label(dlg, text='Display Style:').grid(row=6, column=0, sticky='e', padx=6, pady=6)
+        seg_var = tk.StringVar(value=f'{self.pref_segments}-segment')
+        ttk.Combobox(dlg, textvariable=seg_var, values=[f'{k}-segment' for k in sorted(GLYPHS)], state='readonly', width=10).grid(row=6, column=1, sticky='w')
+
+        # polygons: one canvas item per segment; images: one pre-rendered glyph item per digit
+        ttk.Label(dlg, text='Rendering:').grid(row=7, column=0, sticky='e', padx=6, pady=6)
+        render_var = tk.StringVar(value='Images' if self.pref_render == 'images' else 'Polygons')
+        ttk.Combobox(dlg, textvariable=render_var, values=['Polygons', 'Images'], state='readonly', width=10).grid(row=7, column=1, sticky='w')
+
+        # keypad, keycap and display panel look
+        ttk.Label(dlg, text='Theme:').grid(row=8, column=0, sticky='e', padx=6, pady=6)
+        theme_var = tk.StringVar(value=self.pref_theme)
+        ttk.Combobox(dlg, textvariable=theme_var, values=list(THEMES), state='readonly', width=10).grid(row=8, column=1, sticky='w')
+
         def apply_prefs() -> None:
             self.pref_on = on_ent.get() or self.pref_on
             self.pref_off = off_ent.get() or self.pref_off
             self.pref_dp = dp_ent.get() or self.pref_dp
             sel_variant = click_var.get() or 'Thock'
-            d = min(12, max(4, int(digits_var.get())))
-            try:
-                self.display.destroy()
-            except Exception:
-                pass
-            # recreate display inside the original display parent so it remains at the top
-            parent = getattr(self, '_display_parent', self)
-            self.display = SevenSegment(parent, digits=d, on=self.pref_on, off=self.pref_off, dp=self.pref_dp)
+            self.pref_overflow = 'scroll' if overflow_var.get() == 'Scroll' else 'fit'
+            self.pref_notation = 'eng' if overflow_var.get() == 'Engineering' else 'sci'
             try:
-                # place the display to overlay the angled panel
-                self.display.place(relx=0.5, y=10, anchor='n', relwidth=0.98)
-                try:
-                    self.display.lift()
-                except Exception:
-                    pass
+                self.pref_segments = int(seg_var.get().split('-')[0])
             except Exception:
-                # fallback to pack if place fails
-                self.display.pack(fill='x', pady=(4,8))
-            self._update_display(self.current or '0')
+                self.pref_segments = 7
+            self.pref_render = 'images' if render_var.get() == 'Images' else 'polygons'
+            if theme_var.get() in THEMES:
+                self.pref_theme = theme_var.get()
+            d = min(12, max(4, int(digits_var.get())))
+            # the display and keypad are updated in place, never rebuilt
+            self._apply_theme(digits=d)
+            self._update_display(self.current or '0', fit=self.last_eval)
             try:
-                prefs = {'digits': d, 'on': self.pref_on, 'off': self.pref_off, 'dp': self.pref_dp, 'click_variant': sel_variant}
-                with open(self._prefs_path, 'w', encoding='utf-8') as fh:
-                    json.dump(prefs, fh)
-                # update click path immediately (use resource_path so bundled exe finds files)
-                try:
-                    base = resource_path('')
-                except Exception:
-                    base = os.getcwd()
+                # merge so prefs set elsewhere (history, live preview) are kept
+                self._save_prefs({'digits': d, 'on': self.pref_on, 'off': self.pref_off, 'dp': self.pref_dp, 'click_variant': sel_variant, 'overflow': self.pref_overflow, 'notation': self.pref_notation, 'segments': self.pref_segments, 'render': self.pref_render, 'theme': self.pref_theme})
+                # switch the click sound immediately
                 filename = 'click_thock.wav'
                 if sel_variant == 'Balanced':
                     filename = 'click_balanced.wav'
                 elif sel_variant == 'Snap':
                     filename = 'click_snap.wav'
-                pth = os.path.join(base, filename)
-                if os.path.exists(pth):
-                    self._click_path = pth
+                self._select_click(filename)
             except Exception:
                 pass
             dlg.destroy()
@@ -943,116 +3767,58 @@ class Calculator(tk.Tk):
                     on_combo.set(DEFAULT_ON)
                     off_combo.set(DEFAULT_OFF)
                     dp_combo.set(DEFAULT_DP)
+                    theme_var.set(DEFAULT_THEME)
                 except Exception:
                     pass
             except Exception:
                 pass
 
-        ttk.Button(dlg, text='Restore Defaults', command=_restore_defaults).grid(row=5, column=0, sticky='e', padx=6, pady=6)
-        ttk.Button(dlg, text='Apply', command=apply_prefs).grid(row=5, column=1, sticky='w', padx=6, pady=6)
-
-    # --- Button animation helpers ---
-    def _hex_to_rgb(self, hx: str) -> tuple[int,int,int]:
-        hx = hx.lstrip('#')
-        return tuple(int(hx[i:i+2], 16) for i in (0, 2, 4))
-
-    def _rgb_to_hex(self, rgb: tuple[int,int,int]) -> str:
-        return '#%02x%02x%02x' % rgb
-
-    def _animate_button_color(self, btn: tk.Button, start: str, end: str, duration: float = 0.12) -> None:
-        try:
-            start_rgb = self._hex_to_rgb(start)
-            end_rgb = self._hex_to_rgb(end)
-        except Exception:
-            return
-        start_t = time.time()
-
-        def step():
-            now = time.time()
-            t = (now - start_t) / duration
-            if t >= 1.0:
-                try:
-                    btn.config(bg=end)
-                except Exception:
-                    pass
-                return
-            # ease out cubic
-            eased = 1 - (1 - t) ** 3
-            cur = tuple(int(round(start_rgb[i] + (end_rgb[i] - start_rgb[i]) * eased)) for i in range(3))
-            try:
-                btn.config(bg=self._rgb_to_hex(cur))
-            except Exception:
-                pass
-            self.after(16, step)
-
-        step()
+        ttk.Button(dlg, text='Restore Defaults', command=_restore_defaults).grid(row=9, column=0, sticky='e', padx=6, pady=6)
+        ttk.Button(dlg, text='Apply', command=apply_prefs).grid(row=9, column=1, sticky='w', padx=6, pady=6)
 
-    def _on_button_press(self, btn: tk.Button) -> None:
-        # swap to pressed ttk style and produce key travel by shifting cap down
-        try:
-            inner = btn.master  # the inner keycap frame
-            outer = getattr(inner, 'master', None)
-            # darken both inner and outer frames to simulate sink
-            if isinstance(inner, tk.Frame):
-                inner.config(bg='#2b2b2b')
-                # move cap down by increasing top pady
-                try:
-                    inner.pack_configure(pady=(4,1))
-                except Exception:
-                    pass
-            if isinstance(outer, tk.Frame):
-                outer.config(bg='#000')
-            btn.config(style='CalcPressed.TButton')
+    @timed('theme.apply')
+    def _apply_theme(self, digits: int | None = None) -> None:
+        """Push the display/theme prefs into the live display, panel and keypad."""
+        theme = THEMES.get(self.pref_theme, THEMES[DEFAULT_THEME])
+        disp = getattr(self, 'display', None)
+        if disp is not None:
             try:
-                btn.pack_configure(pady=1)
+                disp.overflow = self.pref_overflow
+                disp.notation = self.pref_notation
+                disp.set_style(self.pref_segments, self.pref_render)
+                if digits is not None:
+                    disp.set_digits(digits)
+                disp.apply_theme(self.pref_on, self.pref_off, self.pref_dp, bg=theme['display_bg'])
             except Exception:
-                pass
-        except Exception:
-            pass
-        # play click sound if available
+                log.getChild('prefs').warning('could not apply display prefs', exc_info=True)
         try:
-            self._play_click()
+            self._disp_bg.itemconfigure('panel_face', fill=theme['panel'])
         except Exception:
             pass
+        keypad = getattr(self, 'keypad', None)
+        if keypad is not None:
+            text = '#%02x%02x%02x' % theme['keycap']['text'][:3]
+            keypad.apply_theme(theme['fills'], self.assets.keycaps_for(self.pref_theme), text=text)
 
-    def _on_button_release(self, btn: tk.Button) -> None:
-        # restore normal ttk style, reset cap position
+    def _on_button_press(self, key: str) -> None:
+        # sink the keycap: darker fill and the cap shifted down, no widget geometry involved
+        self.keypad.set_state(key, 'pressed')
+        # play click sound if available
         try:
-            inner = btn.master
-            outer = getattr(inner, 'master', None)
-            if isinstance(inner, tk.Frame):
-                inner.config(bg='#3f3f3f')
-                try:
-                    inner.pack_configure(pady=1)
-                except Exception:
-                    pass
-            if isinstance(outer, tk.Frame):
-                outer.config(bg='#1a1a1a')
-            btn.config(style='Calc.TButton')
-            try:
-                btn.pack_configure(pady=3)
-            except Exception:
-                pass
+            self._play_click(key)
         except Exception:
             pass
 
-    def _on_button_hover(self, btn: tk.Button, entering: bool) -> None:
-        try:
-            inner = btn.master
-            if not isinstance(inner, tk.Frame):
-                return
-            if entering:
-                inner.config(bg='#515151')
-            else:
-                inner.config(bg='#3f3f3f')
-        except Exception:
-            pass
+    def _on_button_release(self, key: str) -> None:
+        # back to the hover look if the pointer is still over the key
+        self.keypad.set_state(key, 'hover' if self.keypad.hover == key else 'normal')
 
-    def _safe_invoke(self, func, label: str, btn: tk.Button) -> None:
+    @timed('input.button')
+    def _safe_invoke(self, func, label: str) -> None:
         """Invoke a button command with a short debounce to avoid double activations.
 
-        Ignores invocations that happen within 250ms of the previous click for the same label.
-        Disables the button briefly (120ms) while handling to reduce duplicate events.
+        Ignores invocations that happen within 500ms of the previous click for the same label,
+        and any input while the 300ms global input lock from the previous command is held.
         """
         try:
             # global input lock: if locked, ignore further invocations
@@ -1064,23 +3830,18 @@ class Calculator(tk.Tk):
             if now - last < 0.50:
                 return
             self._last_click_times[label] = now
-            # set a short global input lock so keyboard shortcuts and other buttons
-            # won't cause duplicate activations while this command is processed
-            self._input_locked = True
         except Exception:
             pass
+        # recorded once past the debounce, so a replay can run the command directly
+        if self._recorder is not None:
+            self._recorder.record('b', label)
+        # set a short global input lock so keyboard shortcuts and other buttons
+        # won't cause duplicate activations while this command is processed
+        self._input_locked = True
         try:
-            try:
-                btn.config(state='disabled')
-            except Exception:
-                pass
             func()
         finally:
             def _reenable():
-                try:
-                    btn.config(state='normal')
-                except Exception:
-                    pass
                 try:
                     self._input_locked = False
                 except Exception:
@@ -1103,19 +3864,12 @@ class Calculator(tk.Tk):
         # normalize some keys
         if label == '\r':
             lbl = '='
-        btn = self.buttons.get(lbl)
-        if not btn:
-            # maybe the operator is different (e.g., '*' etc.)
-            btn = self.buttons.get(str(label))
-        if not btn:
+        if lbl not in self.buttons:
             return
         # perform press then release after short delay
-        self._on_button_press(btn)
-        self.after(120, lambda: self._on_button_release(btn))
-        try:
-            self._play_click()
-        except Exception:
-            pass
+        # the press plays the click
+        self._on_button_press(lbl)
+        self.after(120, lambda: self._on_button_release(lbl))
 
     def _load_prefs(self) -> None:
         try:
@@ -1126,188 +3880,195 @@ class Calculator(tk.Tk):
                 self.pref_on = prefs.get('on', self.pref_on)
                 self.pref_off = prefs.get('off', self.pref_off)
                 self.pref_dp = prefs.get('dp', self.pref_dp)
-                try:
-                    self.display.destroy()
-                except Exception:
-                    pass
-                parent = getattr(self, '_display_parent', self)
-                # cap digits to 12 to match display limits
-                self.display = SevenSegment(parent, digits=max(4, min(12, d)), on=self.pref_on, off=self.pref_off, dp=self.pref_dp)
-                try:
-                    self.display.place(relx=0.5, y=10, anchor='n', relwidth=0.98)
-                    try:
-                        self.display.lift()
-                    except Exception:
-                        pass
-                except Exception:
-                    self.display.pack(fill='x', pady=(4,8))
+                if prefs.get('overflow') in ('fit', 'scroll'):
+                    self.pref_overflow = prefs['overflow']
+                if prefs.get('notation') in ('sci', 'eng'):
+                    self.pref_notation = prefs['notation']
+                self.pref_programmer = bool(prefs.get('programmer', self.pref_programmer))
+                if prefs.get('base') in BASE_DIGITS:
+                    self.pref_base = prefs['base']
+                if prefs.get('word') in WORD_SIZES:
+                    self.pref_word = prefs['word']
+                if prefs.get('segments') in GLYPHS:
+                    self.pref_segments = prefs['segments']
+                if prefs.get('render') in ('polygons', 'images'):
+                    self.pref_render = prefs['render']
+                self.pref_preview = bool(prefs.get('preview', self.pref_preview))
+                if prefs.get('theme') in THEMES:
+                    self.pref_theme = prefs['theme']
+                # cap digits to 12 slots; longer text is fitted or scrolled, never cut
+                self._apply_theme(digits=max(4, min(12, d)))
         except Exception:
-            pass
+            log.getChild('prefs').warning('could not load %s', self._prefs_path, exc_info=True)
 
     def _ensure_click_sound(self) -> None:
-        """Create a short click WAV file next to the script (overwrites only if missing)."""
-        # use resource_path so PyInstaller onefile bundles locate assets correctly
+        """Pick the click sound saved in prefs (Snap by default) from the shared assets."""
+        # choose default based on saved prefs (if present), else snap
+        click_variant = None
         try:
-            base = resource_path('')
+            if os.path.exists(self._prefs_path):
+                with open(self._prefs_path, 'r', encoding='utf-8') as fh:
+                    p = json.load(fh)
+                    click_variant = p.get('click_variant')
         except Exception:
-            base = os.getcwd()
-        # create three click variants so you can audition them: thock, balanced, snap
-        variants = [
-            ('click_thock.wav', dict(impulse_amp=22000.0, noise_amp=9000.0, low_amp=9000.0, low_freq=380.0, impulse_decay=12000.0, noise_decay=400.0, duration=0.055)),
-            ('click_balanced.wav', dict(impulse_amp=18000.0, noise_amp=14000.0, low_amp=3000.0, low_freq=500.0, impulse_decay=8000.0, noise_decay=500.0, duration=0.045)),
-            ('click_snap.wav', dict(impulse_amp=26000.0, noise_amp=18000.0, low_amp=1500.0, low_freq=700.0, impulse_decay=14000.0, noise_decay=300.0, duration=0.035)),
-        ]
-
-        def _write_variant(filename: str, params: dict) -> None:
-            p = os.path.join(base, filename)
-            framerate = 44100
-            duration = params.get('duration', 0.045)
-            n_samples = int(framerate * duration)
-            frames = bytearray()
-            imp_amp = params.get('impulse_amp', 18000.0)
-            noise_amp = params.get('noise_amp', 12000.0)
-            low_amp = params.get('low_amp', 3000.0)
-            low_freq = params.get('low_freq', 500.0)
-            imp_decay = params.get('impulse_decay', 8000.0)
-            noise_decay = params.get('noise_decay', 500.0)
-            for i in range(n_samples):
-                t = i / framerate
-                impulse = imp_amp * math.exp(-imp_decay * t) if i < 12 else 0.0
-                noise = noise_amp * math.exp(-noise_decay * t) * (random.random() * 2 - 1)
-                low = low_amp * math.exp(-60.0 * t) * math.sin(2.0 * math.pi * low_freq * t)
-                sample = int(max(-32767, min(32767, impulse + noise + low)))
-                frames.extend(struct.pack('<h', sample))
-            try:
-                with wave.open(p, 'wb') as wf:
-                    wf.setnchannels(1)
-                    wf.setsampwidth(2)
-                    wf.setframerate(framerate)
-                    wf.writeframes(bytes(frames))
-            except Exception:
-                try:
-                    if os.path.exists(p):
-                        os.remove(p)
-                except Exception:
-                    pass
-
-        try:
-            for name, params in variants:
-                pth = os.path.join(base, name)
-                if not os.path.exists(pth):
-                    _write_variant(name, params)
-            # choose default based on saved prefs (if present), else thock
             click_variant = None
-            try:
-                if os.path.exists(self._prefs_path):
-                    with open(self._prefs_path, 'r', encoding='utf-8') as fh:
-                        p = json.load(fh)
-                        click_variant = p.get('click_variant')
-            except Exception:
-                click_variant = None
-            mapping = {'Thock': 'click_thock.wav', 'Balanced': 'click_balanced.wav', 'Snap': 'click_snap.wav'}
-            # default to Snap when no preference exists
-            filename = mapping.get(click_variant, 'click_snap.wav')
-            default = os.path.join(base, filename)
-            if os.path.exists(default):
-                self._click_path = default
+        mapping = {'Thock': 'click_thock.wav', 'Balanced': 'click_balanced.wav', 'Snap': 'click_snap.wav'}
+        # default to Snap when no preference exists
+        if not self._select_click(mapping.get(click_variant, 'click_snap.wav')):
+            # fallback to any existing variant
+            for name in self.assets.clicks:
+                if self._select_click(name):
+                    break
             else:
-                # fallback to any existing variant
-                for name, _ in variants:
-                    pth = os.path.join(base, name)
-                    if os.path.exists(pth):
-                        self._click_path = pth
-                        break
-        except Exception:
-            self._click_path = None
+                self._click_path = None
 
-    def _make_window_icon(self) -> tk.PhotoImage:
-        """Create a small runtime PhotoImage representing a calculator icon.
+    def _select_click(self, path: str) -> bool:
+        """Use the click sound named by `path` from the shared assets.
 
-        The icon is constructed pixel-by-pixel so no external asset is required.
+        Returns False (leaving the current sound alone) if it isn't available.
         """
-        size = 64
-        img = tk.PhotoImage(width=size, height=size)
-        # colors
-        bg = '#2b2b2b'
-        body = '#111111'
-        chrome = '#444444'
-        key = '#d9d9d9'
-        sym = '#111111'
-
-        # fill background (transparent-looking) with bg
-        for y in range(size):
-            # build a row string to put for performance
-            row = ' '.join([bg]*size)
-            try:
-                img.put('{' + row + '}', to=(0, y))
-            except Exception:
-                # fallback pixel-by-pixel
-                for x in range(size):
-                    img.put(bg, (x, y))
-
-        # draw rounded rectangle body
-        bx0, by0, bx1, by1 = 8, 8, size-9, size-9
-        for y in range(by0, by1+1):
-            for x in range(bx0, bx1+1):
-                img.put(body, (x, y))
-
-        # top chrome strip
-        for y in range(by0, by0+8):
-            for x in range(bx0+2, bx1-1):
-                img.put(chrome, (x, y))
-
-        # draw four small key squares and simple operator marks
-        keys = [ (bx0+8, by0+18), (bx0+28, by0+18), (bx0+8, by0+34), (bx0+28, by0+34) ]
-        ksize = 10
-        for kx, ky in keys:
-            for y in range(ky, ky+ksize):
-                for x in range(kx, kx+ksize):
-                    img.put(key, (x, y))
-
-        # plus sign in top-left key
-        px, py = keys[0]
-        cx = px + ksize//2
-        cy = py + ksize//2
-        for d in range(-2,3):
-            img.put(sym, (cx + d, cy))
-            img.put(sym, (cx, cy + d))
-
-        # minus sign in top-right key
-        px, py = keys[1]
-        cx = px + ksize//2
-        cy = py + ksize//2
-        for d in range(-2,3):
-            img.put(sym, (cx + d, cy))
-
-        # multiply (x) in bottom-left
-        px, py = keys[2]
-        for d in range(0, ksize):
-            img.put(sym, (px + d, py + d))
-            img.put(sym, (px + d, py + ksize - 1 - d))
-
-        # divide sign in bottom-right: a dot, a line, and a dot
-        px, py = keys[3]
-        cx = px + ksize//2
-        cy = py + ksize//2
-        img.put(sym, (cx, cy - 3))
-        for d in range(-2,3):
-            img.put(sym, (cx + d, cy))
-        img.put(sym, (cx, cy + 3))
+        entry = self.assets.clicks.get(os.path.basename(path))
+        if entry is None:
+            return False
+        self._click_path, self._click_data = entry
+        return True
 
-        return img
+    def _click_mixer(self) -> ClickMixer | None:
+        """The process-wide click mixer (kept on the root), or None without an audio backend."""
+        root = self._root()
+        mixer = getattr(root, '_click_mixer', None)
+        if mixer is None:
+            backend = default_click_backend()
+            mixer = root._click_mixer = ClickMixer(backend) if backend is not None else False
+            if backend is not None:
+                atexit.register(backend.close)
+        return mixer or None
 
-    def _play_click(self) -> None:
-        """Play the generated click sound asynchronously on Windows; noop otherwise."""
+    @timed('sound.play')
+    def _play_click(self, event=None) -> None:
+        """Mix the selected click into what is already sounding; `event` dedupes repeats."""
         try:
-            if winsound is None:
-                return
             path = getattr(self, '_click_path', None)
-            if not path or not os.path.exists(path):
+            mixer = self._click_mixer()
+            if not path or mixer is None:
                 return
-            # Play asynchronously so GUI doesn't block
-            winsound.PlaySound(path, winsound.SND_FILENAME | winsound.SND_ASYNC)
+            data = getattr(self, '_click_data', None)
+            # decoded once per variant; bundle data avoids touching the file at all
+            mixer.trigger(os.path.basename(path), data if data is not None else path, event)
         except Exception:
-            pass
+            log.getChild('sound').debug('click playback failed', exc_info=True)
+
+    # --- Performance overlay ---
+    def _canvas_item_count(self) -> int:
+        """Total items on every canvas in this window."""
+        total = 0
+        stack = [self]
+        while stack:
+            w = stack.pop()
+            if isinstance(w, tk.Canvas):
+                total += len(w.find_all())
+            stack.extend(w.winfo_children())
+        return total
+
+    def _toggle_perf_overlay(self) -> None:
+        show = bool(self._overlay_var.get())
+        lbl = getattr(self, '_overlay_label', None)
+        if not show:
+            if lbl is not None:
+                lbl.destroy()
+                self._overlay_label = None
+                METRICS.overlay_closed()
+            return
+        if lbl is not None:
+            return
+        METRICS.overlay_opened()
+        self._overlay_label = tk.Label(self, bg='#000000', fg='#6ef06e', font=('Consolas', 8), justify='left', anchor='nw')
+        self._overlay_label.place(relx=1.0, rely=1.0, anchor='se')
+        self._overlay_prev = (time.perf_counter(), METRICS.count('anim.step'))
+        self._refresh_perf_overlay()
+
+    def _refresh_perf_overlay(self) -> None:
+        lbl = getattr(self, '_overlay_label', None)
+        if lbl is None:
+            return
+        now = time.perf_counter()
+        frames = METRICS.count('anim.step')
+        prev_t, prev_frames = self._overlay_prev
+        fps = (frames - prev_frames) / max(1e-6, now - prev_t)
+        self._overlay_prev = (now, frames)
+        lines = [f'{"":<18}{"n":>6}{"p50":>8}{"p95":>8}{"p99":>8} us']
+        for name in sorted(METRICS.histograms):
+            lines.append(
+                f'{name:<18}{METRICS.count(name):>6}'
+                f'{METRICS.percentile(name, 50) / 1000:>8.0f}{METRICS.percentile(name, 95) / 1000:>8.0f}'
+                f'{METRICS.percentile(name, 99) / 1000:>8.0f}'
+            )
+        lines.append(f'anim fps {fps:5.1f}  canvas items {self._canvas_item_count()}  images {len(self.image_names())}')
+        try:
+            lbl.config(text='\n'.join(lines))
+            lbl.lift()
+        except Exception:
+            return
+        self.after(500, self._refresh_perf_overlay)
+
+    def _export_metrics(self) -> None:
+        path = filedialog.asksaveasfilename(parent=self, title='Export Metrics', defaultextension='.json', filetypes=[('JSON', '*.json')])
+        if not path:
+            return
+        try:
+            METRICS.export_json(path, {'canvas_items': self._canvas_item_count(), 'tk_images': len(self.image_names())})
+        except Exception:
+            log.getChild('metrics').error('could not export metrics to %s', path, exc_info=True)
+
+    def _tk_footprint(self) -> dict:
+        """Counts of the Tk-side objects tracemalloc can't see."""
+        image_bytes = 0
+        names = self.image_names()
+        for name in names:
+            try:
+                # PhotoImages keep 32-bit pixels in the interpreter
+                image_bytes += int(self.tk.call('image', 'width', name)) * int(self.tk.call('image', 'height', name)) * 4
+            except tk.TclError:
+                pass
+        entries = self.hist_list.get(0, 'end')
+        return {
+            'canvas_items': {
+                'display': len(self.display.find_all()),
+                'panel': len(self._disp_bg.find_all()),
+                'keypad': len(self.keypad.find_all()),
+                'total': self._canvas_item_count(),
+            },
+            'tk_images': len(names),
+            'tk_image_bytes': image_bytes,
+            'history_entries': len(entries),
+            'history_chars': sum(len(e) for e in entries),
+        }
+
+    def _memory_sample(self) -> None:
+        if not MEMPROFILE.active:
+            return
+        try:
+            MEMPROFILE.sample({'tk': self._tk_footprint()})
+        except Exception:
+            log.getChild('memory').warning('memory sample failed', exc_info=True)
+        self.after(MEMPROFILE.INTERVAL_MS, self._memory_sample)
+
+    def _write_memory_report(self, path: str) -> None:
+        try:
+            MEMPROFILE.export_json(path, {'tk': self._tk_footprint()})
+        except Exception:
+            log.getChild('memory').error('could not write memory report to %s', path, exc_info=True)
+
+    def _export_memory_report(self) -> None:
+        path = filedialog.asksaveasfilename(parent=self, title='Memory Report', defaultextension='.json', filetypes=[('JSON', '*.json')])
+        if not path:
+            return
+        self._write_memory_report(path)
+        if not MEMPROFILE.active:
+            # started late: later reports cover steady-state use from here on
+            MEMPROFILE.start()
+            root = self._root()
+            root.after(MEMPROFILE.INTERVAL_MS, root._memory_sample)
 
     # History toggle + animation
     def _toggle_history(self) -> None:
@@ -1354,6 +4115,7 @@ class Calculator(tk.Tk):
         start_t = time.time()
         self.hist_animating = True
 
+        @timed('anim.step')
         def step():
             now = time.time()
             t = (now - start_t) / duration
@@ -1409,8 +4171,159 @@ class Calculator(tk.Tk):
         step()
 
 
-def main() -> None:
+    # --- Windows ---
+    def new_window(self) -> 'CalculatorWindow':
+        """Open another independent calculator in this process."""
+        return CalculatorWindow(self._root())
+
+    def run_expression(self, expr: str) -> None:
+        """Evaluate `expr` as if it had been typed followed by '='."""
+        self.current = expr.strip()
+        self.last_eval = False
+        self._evaluate()
+
+    def _open_windows(self) -> list:
+        root = self._root()
+        wins = [root] + [w for w in root.winfo_children() if isinstance(w, CalculatorWindow)]
+        return [w for w in wins if w.winfo_exists() and w.state() != 'withdrawn']
+
+    def _close_window(self) -> None:
+        """Close this calculator; the process ends with the last open one."""
+        others = [w for w in self._open_windows() if w is not self]
+        root = self._root()
+        if getattr(self, '_overlay_label', None) is not None:
+            self._overlay_label = None
+            METRICS.overlay_closed()
+        if not others:
+            self._save_memory()
+            if getattr(root, '_instance', None) is not None:
+                root._instance.close()
+                root._instance = None
+            if getattr(root, '_session', None) is not None:
+                if root._session_sync_job is not None:
+                    root.after_cancel(root._session_sync_job)
+                    root._session_sync_job = None
+                root._session.close()
+            if MEMPROFILE.report_path:
+                self._write_memory_report(MEMPROFILE.report_path)
+        if self is root and others:
+            # the root owns the Tk interpreter, so hide it while other windows are open
+            root.withdraw()
+            return
+        self.destroy()
+        if not others:
+            try:
+                root.destroy()
+            except tk.TclError:
+                pass
+
+
+# code whose allocations MemoryProfile attributes to each subsystem
+# (history includes _evaluate, which adds the entries)
+MEMORY_SUBSYSTEMS = {
+    'display': (SevenSegment, SegmentRasterizer, segment_polygons, encode_text, split_cells, fit_number,
+                CalculatorMixin._update_display, CalculatorMixin._draw_display_bg, CalculatorMixin._layout_pass),
+    'keycaps': (load_keycap_images, render_keycap, load_keycap_font, get_font, text_bbox, find_font,
+                _font_index, AssetRegistry.keycaps_for),
+    'keypad': (Keypad,),
+    'icon': (make_window_icon, icon_pixels),
+    'sound': (prepare_click_sounds, synth_click, write_wav, read_pcm, ClickMixer, CalculatorMixin._ensure_click_sound,
+              CalculatorMixin._select_click, CalculatorMixin._play_click),
+    'history': (CalculatorMixin._evaluate, CalculatorMixin._on_history_double, CalculatorMixin._on_hist_motion,
+                CalculatorMixin._toggle_history, CalculatorMixin._animate_history),
+    'prefs': (CalculatorMixin._load_prefs, CalculatorMixin._save_prefs, CalculatorMixin.open_prefs,
+              CalculatorMixin._apply_theme),
+    'memory': (MemoryRegister, MemoryBank),
+    'preview': (PrefixEvaluator, CalculatorMixin._refresh_preview),
+    'session': (SessionJournal, _write_durable, CalculatorMixin._restore_session, CalculatorMixin._journal),
+    'programmer': (to_base, ProgrammerValue, _WordInt, eval_programmer, _decimal_pow2, CalculatorMixin._evaluate_programmer,
+                   CalculatorMixin._relabel_history),
+    'paste': (PasteBuffer, CalculatorMixin._paste, CalculatorMixin._paste_step),
+    'instance': (InstanceServer, send_to_instance, _recv_line),
+    'logging': (start_logging, _DeferredQueueHandler),
+}
+
+
+class Calculator(CalculatorMixin, tk.Tk):
+    """The main calculator window (the Tk root)."""
+
+    def __init__(self, session: str | None = SESSION_PATH) -> None:
+        super().__init__()
+        MEMPROFILE.mark('tk')
+        start_logging()
+        # journal of this window's state, restored here and on the next launch; None disables it
+        self._session = SessionJournal(session) if session else None
+        self._session_sync_job = None
+        self._instance = None
+        self._build_ui()
+        if MEMPROFILE.active:
+            self.after(MEMPROFILE.INTERVAL_MS, self._memory_sample)
+
+    def serve_instances(self, path: str = INSTANCE_PATH) -> None:
+        """Let later launches hand their request to this process instead of starting their own."""
+        try:
+            self._instance = InstanceServer(path)
+            self._instance.start()
+        except Exception:
+            log.getChild('instance').warning('single-instance mode unavailable', exc_info=True)
+            self._instance = None
+            return
+        self.after(InstanceServer.POLL_MS, self._poll_instances)
+
+    def _poll_instances(self) -> None:
+        if self._instance is None:
+            return
+        while True:
+            try:
+                req = self._instance.requests.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                self._handle_instance_request(req)
+            except Exception:
+                log.getChild('instance').warning('could not handle %r', req, exc_info=True)
+        self.after(InstanceServer.POLL_MS, self._poll_instances)
+
+    def _handle_instance_request(self, req: dict) -> None:
+        # a new window when asked for, otherwise the most recently opened one
+        win = self.new_window() if req.get('new_window') else self._open_windows()[-1]
+        win.deiconify()
+        win.lift()
+        win.focus_force()
+        if req.get('expr'):
+            win.run_expression(str(req['expr']))
+
+
+class CalculatorWindow(CalculatorMixin, tk.Toplevel):
+    """An additional calculator window sharing the root's assets."""
+
+    def __init__(self, master: tk.Misc) -> None:
+        super().__init__(master)
+        self._build_ui()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description='Seven-segment calculator.')
+    parser.add_argument('expression', nargs='?', help='evaluate this expression and show the result')
+    parser.add_argument('--single-instance', action='store_true',
+                        help='hand this launch to a running calculator, or serve later --single-instance launches')
+    parser.add_argument('--new-window', action='store_true',
+                        help='with --single-instance: open a new window instead of focusing one')
+    parser.add_argument('--memory-report', metavar='JSON',
+                        help='trace memory per subsystem and write a report here on exit (starts its own process)')
+    args = parser.parse_args(argv)
+    single = args.single_instance and not args.memory_report
+    # a running calculator opens the window in a few milliseconds; only start up when there is none
+    if single and send_to_instance({'expr': args.expression, 'new_window': args.new_window}):
+        return
+    if args.memory_report:
+        MEMPROFILE.report_path = args.memory_report
+        MEMPROFILE.start()
     app = Calculator()
+    if single:
+        app.serve_instances()
+    if args.expression:
+        app.run_expression(args.expression)
     app.mainloop()
 
 
@@ -1,13 +1,7 @@
-from PIL import Image
+"""Build generated_icon.png through the asset pipeline. Kept for old workflows; see build_assets.py."""
 import sys
 
-ico_path = 'calculator.ico'
-out_path = 'generated_icon.png'
-try:
-    img = Image.open(ico_path)
-    print('FORMAT', img.format, 'SIZE', img.size)
-    img.save(out_path)
-    print('WROTE', out_path)
-except Exception as e:
-    print('ERROR', e)
-    sys.exit(1)
+import build_assets
+
+if __name__ == '__main__':
+    sys.exit(build_assets.main(['icon:png'] + sys.argv[1:]))
@@ -0,0 +1,235 @@
+"""Keystroke record/replay harness for latency testing the calculator GUI.
+
+Record a session (keys through `_on_key`, clicks through `_safe_invoke`):
+
+    python replay.py record session.trace
+
+Replay it into a fresh calculator at original speed, 4x faster, or as fast as
+possible (speed 0) and print a latency histogram:
+
+    python replay.py play session.trace --speed 4
+
+Latency is measured from handing the event to the calculator until its handler
+has returned and pending redraws have been flushed (`update_idletasks`), i.e.
+key to display update.
+
+Trace format: a `#calc-trace 1` header, then one tab-separated line per event:
+microseconds since the previous event, the kind (`k` key, `b` button) and its
+payload. Key characters are stored as hex code points so control characters
+and tabs survive.
+
+Both commands run with the home directory pointed at a scratch folder, so a
+recording starts from default prefs and empty memory registers (the same
+state a replay starts from) and neither touches the user's files.
+"""
+from __future__ import annotations
+
+import argparse
+import atexit
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+# calculator.py resolves its ~ paths (prefs, memory, session, keycaps, log) at
+# import time, so the scratch home must be in place before the import
+# (X11 still needs the real cookie file, which is found through $HOME by default)
+if sys.platform.startswith('linux'):
+    os.environ.setdefault('XAUTHORITY', os.path.join(os.path.expanduser('~'), '.Xauthority'))
+_HOME = tempfile.mkdtemp(prefix='calc-replay-')
+os.environ['HOME'] = os.environ['USERPROFILE'] = _HOME
+atexit.register(shutil.rmtree, _HOME, ignore_errors=True)
+
+import calculator  # noqa: E402
+
+TRACE_HEADER = '#calc-trace 1'
+
+
+class TraceRecorder:
+    """Collects input events with timestamps; attach as `Calculator._recorder`."""
+
+    def __init__(self) -> None:
+        self.events = []  # (delta_us, kind, payload)
+        self._last = None
+
+    def record(self, kind: str, *payload: str) -> None:
+        now = time.perf_counter_ns()
+        delta = 0 if self._last is None else (now - self._last) // 1000
+        self._last = now
+        self.events.append((delta, kind, payload))
+
+    def save(self, path: str) -> None:
+        with open(path, 'w', encoding='utf-8', newline='\n') as fh:
+            fh.write(TRACE_HEADER + '\n')
+            for delta, kind, payload in self.events:
+                if kind == 'k':
+                    keysym, char = payload
+                    fields = [keysym, '.'.join(f'{ord(c):x}' for c in char) or '-']
+                else:
+                    fields = list(payload)
+                fh.write('\t'.join([str(delta), kind] + fields) + '\n')
+
+
+def load_trace(path: str) -> list[tuple[int, str, tuple]]:
+    """Read a trace file into (delta_us, kind, payload) tuples."""
+    events = []
+    with open(path, encoding='utf-8') as fh:
+        header = fh.readline().rstrip('\n')
+        if header != TRACE_HEADER:
+            raise ValueError(f'{path}: not a calculator trace')
+        for line in fh:
+            parts = line.rstrip('\n').split('\t')
+            if len(parts) < 3:
+                continue
+            delta, kind = int(parts[0]), parts[1]
+            if kind == 'k':
+                char = '' if parts[3] == '-' else ''.join(chr(int(c, 16)) for c in parts[3].split('.'))
+                events.append((delta, kind, (parts[2], char)))
+            else:
+                events.append((delta, kind, tuple(parts[2:])))
+    return events
+
+
+def percentile(sorted_samples: list[int], pct: float) -> int:
+    if not sorted_samples:
+        return 0
+    idx = min(len(sorted_samples) - 1, max(0, math.ceil(pct / 100.0 * len(sorted_samples)) - 1))
+    return sorted_samples[idx]
+
+
+def latency_histogram(samples_ns: list[int], width: int = 40) -> str:
+    """Format latencies as a power-of-two microsecond histogram with percentiles."""
+    if not samples_ns:
+        return 'no samples'
+    buckets = {}
+    for ns in samples_ns:
+        us = max(1, ns // 1000)
+        b = 1 << (us.bit_length() - 1)
+        buckets[b] = buckets.get(b, 0) + 1
+    peak = max(buckets.values())
+    lines = []
+    for b in sorted(buckets):
+        n = buckets[b]
+        bar = '#' * max(1, round(n / peak * width))
+        lines.append(f'{b:>8} - {b * 2 - 1:<8} us {n:>7}  {bar}')
+    s = sorted(samples_ns)
+    lines.append(
+        f'n={len(s)} p50={percentile(s, 50) / 1000:.1f}us p90={percentile(s, 90) / 1000:.1f}us '
+        f'p99={percentile(s, 99) / 1000:.1f}us max={s[-1] / 1000:.1f}us'
+    )
+    return '\n'.join(lines)
+
+
+class Replayer:
+    """Feeds recorded events into a running Calculator via the Tk event loop.
+
+    `speed` scales the recorded gaps (2.0 = twice as fast); 0 replays back to
+    back. Events are scheduled against the replay start time so timer jitter
+    doesn't accumulate; `lag_ns` records how late each event was dispatched.
+    """
+
+    def __init__(self, calc: calculator.Calculator, events: list, speed: float = 1.0) -> None:
+        self.calc = calc
+        self.events = events
+        self.speed = speed
+        self.latency_ns = []
+        self.lag_ns = []
+        self.skipped = 0  # events that could not be dispatched
+        self._due = []
+        t = 0
+        for delta, _, _ in events:
+            t += delta * 1000
+            self._due.append(int(t / speed) if speed > 0 else 0)
+
+    def start(self, on_done=None) -> None:
+        self._on_done = on_done
+        self._start = time.perf_counter_ns()
+        self._index = 0
+        self.calc.after(0, self._step)
+
+    def _step(self) -> None:
+        if self._index >= len(self.events):
+            if self._on_done is not None:
+                self._on_done(self)
+            return
+        i = self._index
+        self._index += 1
+        due = self._start + self._due[i]
+        t0 = time.perf_counter_ns()
+        self.lag_ns.append(max(0, t0 - due))
+        self._dispatch(*self.events[i][1:])
+        self.calc.update_idletasks()
+        self.latency_ns.append(time.perf_counter_ns() - t0)
+        if self._index < len(self.events):
+            wait_ms = (self._start + self._due[self._index] - time.perf_counter_ns()) // 1_000_000
+            self.calc.after(max(0, int(wait_ms)), self._step)
+        else:
+            self.calc.after(0, self._step)
+
+    def _dispatch(self, kind: str, payload: tuple) -> None:
+        calc = self.calc
+        if kind == 'k':
+            keysym, char = payload
+            calc._on_key(SimpleNamespace(keysym=keysym, char=char, widget=calc, state=0))
+        elif kind == 'b':
+            # the unwrapped command: _safe_invoke's debounce and input lock would drop
+            # clicks of a sped-up replay; the trace only holds clicks that got through them
+            cmd = getattr(calc, '_button_commands', {}).get(payload[0])
+            if cmd is None:
+                self.skipped += 1
+            else:
+                cmd()
+        else:
+            self.skipped += 1
+
+    def report(self) -> str:
+        lag = sorted(self.lag_ns)
+        return (
+            'handling latency (event -> display updated):\n'
+            + latency_histogram(self.latency_ns)
+            + f'\nscheduling lag p50={percentile(lag, 50) / 1000:.1f}us p99={percentile(lag, 99) / 1000:.1f}us'
+            + f'\nskipped events: {self.skipped}'
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Record or replay calculator input traces.')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    rec = sub.add_parser('record', help='run the calculator and record input to a trace file')
+    rec.add_argument('trace')
+    play = sub.add_parser('play', help='replay a trace into a new calculator and report latency')
+    play.add_argument('trace')
+    play.add_argument('--speed', type=float, default=1.0, help='time scale (2 = twice as fast, 0 = no gaps)')
+    play.add_argument('--keep-open', action='store_true', help='leave the window open after replaying')
+    play.add_argument('--metrics', metavar='JSON', help='enable the metrics registry and export it here afterwards')
+    args = parser.parse_args()
+
+    app = calculator.Calculator(session=None)
+    if args.cmd == 'record':
+        recorder = TraceRecorder()
+        app._recorder = recorder
+        app.mainloop()
+        recorder.save(args.trace)
+        print(f'recorded {len(recorder.events)} events to {args.trace}')
+        return
+
+    events = load_trace(args.trace)
+    if args.metrics:
+        calculator.METRICS.enable()
+
+    def done(replayer: Replayer) -> None:
+        print(replayer.report())
+        if args.metrics:
+            calculator.METRICS.export_json(args.metrics)
+        if not args.keep_open:
+            app.destroy()
+
+    Replayer(app, events, args.speed).start(done)
+    app.mainloop()
+
+
+if __name__ == '__main__':
+    main()
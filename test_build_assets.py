@@ -0,0 +1,20 @@
+"""Tests for the asset build graph.
+
+    python -m pytest -q
+"""
+import pytest
+
+import build_assets
+
+
+def test_graph_outputs_are_unique(tmp_path):
+    steps = build_assets.build_graph(str(tmp_path))
+    outputs = [p for s in steps.values() for p in s.outputs]
+    assert len(set(outputs)) == len(outputs)
+
+
+def test_graph_refuses_shared_outputs(tmp_path):
+    out = str(tmp_path / 'a.png')
+    steps = [build_assets.Step('one', None, [out]), build_assets.Step('two', None, [out])]
+    with pytest.raises(ValueError, match='both write'):
+        build_assets.check_graph(steps)
@@ -0,0 +1,434 @@
+"""Tests for the headless parts of calculator.py (no Tk display needed).
+
+    python -m pytest -q
+"""
+import decimal
+import math
+import random
+import shutil
+import statistics
+
+import pytest
+
+import calculator
+
+
+def test_keycap_filenames_are_unique():
+    names = [calculator.keycap_filename(lbl) for lbl in calculator.KEYPAD_LABELS]
+    assert len(set(names)) == len(names)
+    assert calculator.keycap_filename('M+') != calculator.keycap_filename('M-')
+
+
+class _Root:
+    pass
+
+
+class _Window(calculator.CalculatorMixin):
+    # just enough of a window for the memory keys, without Tk
+    def __init__(self, root):
+        self.root = root
+        self.current = ''
+        self.memory_bank = self._shared_memory_bank()
+
+    def _root(self):
+        return self.root
+
+    def _memory_changed(self):
+        pass
+
+
+def test_memory_bank_is_shared_between_windows(monkeypatch):
+    monkeypatch.setattr(calculator.MemoryBank, 'load', classmethod(lambda cls, path=None: cls()))
+    root = _Root()
+    first, second = _Window(root), _Window(root)
+    assert first.memory_bank is second.memory_bank
+    first.current = '5'
+    first._mem_add()
+    assert second.memory == 5.0
+    second.memory_bank.select('M1')
+    assert first.memory_bank.active == 'M1'
+    assert first.memory == 0.0
+
+
+def test_memory_register_statistics():
+    rng = random.Random(40)
+    xs = [rng.uniform(-1e3, 1e3) for _ in range(500)]
+    reg = calculator.MemoryRegister()
+    for x in xs:
+        reg.add(x)
+    assert reg.count == len(xs)
+    assert reg.total == math.fsum(xs)
+    assert reg.mean == pytest.approx(statistics.fmean(xs), rel=1e-15)
+    assert reg.stdev == pytest.approx(statistics.stdev(xs), rel=1e-12)
+    assert (reg.min, reg.max) == (min(xs), max(xs))
+    reg.clear()
+    assert (reg.count, reg.total, reg.mean, reg.variance, reg.min) == (0, 0.0, 0.0, 0.0, None)
+
+
+def test_memory_register_mean_is_compensated():
+    xs = [1e16, 1.0, -1e16, 3.3]
+    reg = calculator.MemoryRegister()
+    for x in xs:
+        reg.add(x)
+    assert reg.total == math.fsum(xs)
+    assert reg.mean == math.fsum(xs) / len(xs)
+
+
+def test_memory_bank_round_trips_through_its_file(tmp_path):
+    path = str(tmp_path / 'memory.json')
+    bank = calculator.MemoryBank()
+    for x in (0.1, 0.2, 0.3):
+        bank.register().add(x)
+    bank.select('tax')
+    bank.register().add(-7)
+    bank.save(path)
+    loaded = calculator.MemoryBank.load(path)
+    assert loaded.active == 'tax'
+    assert loaded.to_dict() == bank.to_dict()
+    loaded.register('M').add(0.4)  # keeps accumulating where it left off
+    assert loaded.register('M').total == math.fsum([0.1, 0.2, 0.3, 0.4])
+    assert calculator.MemoryBank.load(str(tmp_path / 'missing.json')).to_dict() == calculator.MemoryBank().to_dict()
+    (tmp_path / 'memory.json').write_text('{not json', encoding='utf-8')
+    assert calculator.MemoryBank.load(path).to_dict() == calculator.MemoryBank().to_dict()
+
+
+@pytest.mark.parametrize('text, digits, notation, expected', [
+    ('12345678', 8, 'sci', '12345678'),  # fits: unchanged
+    ('123456.789', 8, 'sci', '123456.79'),
+    ('99999999.96', 8, 'sci', '1E8'),  # rounding carries into a new digit
+    ('9.99999999999e+20', 8, 'sci', '1E21'),
+    ('-123456789012', 8, 'sci', '-1.235E11'),
+    ('0.000012345678', 8, 'sci', '1.2346E-5'),
+    ('1e+300', 8, 'sci', '1E300'),
+    ('2e+400000', 8, 'sci', '2E400000'),
+    ('123456789', 8, 'eng', '123.457E6'),
+    ('9.9999999e5', 6, 'eng', '1E6'),
+    ('Error', 3, 'sci', 'Error'),
+])
+def test_fit_number(text, digits, notation, expected):
+    assert calculator.fit_number(text, digits, notation) == expected
+
+
+def test_fit_number_rounds_to_the_last_digit_shown():
+    rng = random.Random(46)
+    for _ in range(1000):
+        text = repr(rng.uniform(-10, 10) * 10.0 ** rng.randint(-320, 307))
+        for digits in (8, 12, 16):
+            for notation in ('sci', 'eng'):
+                s = calculator.fit_number(text, digits, notation)
+                assert len(calculator.split_cells(s)) <= digits, (text, s)
+                d = decimal.Decimal(s)
+                half_ulp = decimal.Decimal((0, (5,), d.as_tuple().exponent - 1))
+                assert abs(d - decimal.Decimal(text)) <= half_ulp, (text, s)
+
+
+def test_int_scientific_matches_exact_conversion():
+    rng = random.Random(46)
+    for _ in range(300):
+        n = rng.getrandbits(rng.randint(1, 12000)) * rng.choice((1, -1))
+        sig = rng.randint(1, 17)
+        mant, exp = f"{decimal.Decimal(abs(n)):.{sig - 1}e}".split('e')
+        expected = f"{'-' if n < 0 else ''}{calculator._strip_mantissa(mant)}e{exp}"
+        assert calculator.int_scientific(n, sig) == expected
+    assert calculator.int_scientific(10**5000) == '1e+5000'
+    assert calculator.int_scientific(-(10**5000 - 1)) == '-1e+5000'
+
+
+def test_format_result():
+    assert calculator.format_result(3.0) == '3'
+    assert calculator.format_result(0.1 + 0.2) == '0.3'
+    assert calculator.format_result(-2.5e-300) == '-2.5e-300'
+    assert calculator.format_result(1e300) == str(int(1e300))
+    exact = -(2**calculator.EXACT_INT_BITS - 1)
+    assert int(calculator.format_result(exact)) == exact
+    assert calculator.format_result(2**calculator.EXACT_INT_BITS) == '2.6277594369122085e+999'
+
+
+def test_to_base_matches_python_formatting():
+    rng = random.Random(47)
+    for _ in range(200):
+        n = rng.getrandbits(rng.randint(1, 12000)) * rng.choice((1, -1))
+        assert calculator.to_base(n, 10) == str(n)
+        assert calculator.to_base(n, 16) == format(n, 'X')
+        assert calculator.to_base(n, 8) == format(n, 'o')
+        assert calculator.to_base(n, 2) == format(n, 'b')
+    assert calculator.to_base(0, 10) == '0'
+
+
+@pytest.mark.parametrize('expr, base, word, bits, signed', [
+    ('7F+1', 16, 8, 0x80, -128),  # wraps
+    ('(FFFFFFFFFFFFFFFF+1)>>1', 16, 64, 0, 0),  # wraps before the shift
+    ('FF*FF>>4', 16, 8, 0, 0),
+    ('FF', 16, 8, 0xFF, -1),  # operands are signed
+    ('FF/2', 16, 8, 0xFF, -1),
+    ('80>>7', 16, 8, 0xFF, -1),  # arithmetic shift
+    ('1<<7', 10, 8, 0x80, -128),
+    ('1<<FFFFFFFF', 16, 64, 0, 0),  # shifted right out of the word
+    ('7F>>40', 16, 8, 0, 0),
+    ('-80', 16, 8, 0x80, -128),
+    ('~0', 2, 16, 0xFFFF, -1),
+    ('10-20', 10, 32, 0xFFFFFFF6, -10),
+    ('377&17|100', 8, 0, 0o117, 0o117),
+    ('FFFFFFFF+1', 16, 0, 1 << 32, 1 << 32),  # unbounded: no wrap
+    ('~0', 16, 0, -1, -1),
+])
+def test_eval_programmer(expr, base, word, bits, signed):
+    value = calculator.eval_programmer(expr, base, word)
+    assert (value.value, value.signed()) == (bits, signed)
+
+
+@pytest.mark.parametrize('expr, base, word, error', [
+    ('1G', 16, 8, ValueError),
+    ('2', 2, 8, ValueError),
+    ('1>>FF', 16, 8, ValueError),  # FF is -1: a negative count
+    ('1<<FFFFFFFF', 16, 0, OverflowError),
+    ('1/0', 10, 8, ZeroDivisionError),
+    ('1+', 10, 8, SyntaxError),
+])
+def test_eval_programmer_rejects(expr, base, word, error):
+    with pytest.raises(error):
+        calculator.eval_programmer(expr, base, word)
+
+
+def test_programmer_value_texts():
+    value = calculator.ProgrammerValue(-2, 16)
+    assert value.value == 0xFFFE
+    assert [value.text(b) for b in (16, 10, 8, 2)] == ['FFFE', '-2', '177776', '1' * 15 + '0']
+
+
+def test_click_mixer_keeps_tails_of_overlapping_clicks(tmp_path):
+    now = [0.0]
+    out = str(tmp_path / 'mix.wav')
+    mixer = calculator.ClickMixer(calculator.WavFileBackend(out), gain=0.5, clock=lambda: now[0])
+    name, params = calculator.CLICK_VARIANTS[0]
+    wav = calculator._wav_bytes(calculator.synth_click(params, rng=random.Random(1)))
+    voice = [int(s * 0.5) for s in calculator.read_pcm(wav)]
+    gap = 441  # the second click starts 10 ms into the first
+    assert mixer.trigger(name, wav, event='7')
+    assert not mixer.trigger(name, wav, event='7')  # same keystroke within DEDUPE_S
+    now[0] = gap / 44100
+    assert mixer.trigger(name, wav, event='8')
+    mixer.backend.close()
+    expected = voice[:gap] + [a + b for a, b in zip(voice[gap:], voice)] + voice[len(voice) - gap:]
+    assert list(calculator.read_pcm(out)) == expected
+
+
+def _random_expr(rng, depth=0):
+    terms = []
+    for _ in range(rng.randint(1, 4)):
+        term = rng.choice(['', '', '-', '+', '--'])
+        if depth < 3 and rng.random() < 0.2:
+            term += '(' + _random_expr(rng, depth + 1) + ')'
+        elif rng.random() < 0.3:
+            term += '%d.%d' % (rng.randint(0, 99), rng.randint(0, 99))
+        else:
+            term += str(rng.randint(0, 999))
+        terms.append(term)
+    expr = terms[0]
+    for term in terms[1:]:
+        expr += rng.choice('+-*/%') + term
+    return expr
+
+
+def _eval_or_none(text):
+    try:
+        v = eval(text, {'__builtins__': {}}, {})
+    except (ZeroDivisionError, OverflowError):
+        return None
+    if isinstance(v, float) and v - v != 0:  # inf / nan
+        return None
+    return v
+
+
+def test_prefix_evaluator_matches_eval_through_random_edits():
+    rng = random.Random(39)
+    ev = calculator.PrefixEvaluator()
+    for _ in range(2000):
+        expr = _random_expr(rng)
+        assert ev.update(expr) == _eval_or_none(expr), expr
+        # backspace back past a checkpoint, or edit in the middle, then retype
+        cut = rng.randint(0, len(expr))
+        if rng.random() < 0.5:
+            edited = expr[:cut]
+        else:
+            edited = expr[:cut] + rng.choice('+-*/%') + _random_expr(rng) + rng.choice('+-*/%') + expr[cut:]
+        value = ev.update(edited)
+        assert value == calculator.PrefixEvaluator().update(edited), (expr, edited)
+        if '**' in edited or '//' in edited:
+            continue  # Python operators the calculator doesn't have
+        try:
+            compile(edited, '<expr>', 'eval')
+        except SyntaxError:
+            continue
+        assert value == _eval_or_none(edited), edited
+        assert ev.update(expr) == _eval_or_none(expr), expr
+
+
+def _session_state(path):
+    journal = calculator.SessionJournal(str(path))
+    state = journal.load()
+    journal.close()
+    return state['current'], state['last_eval'], list(state['history'])
+
+
+def _copy_session(src_dir, dst_dir):
+    # what a crash leaves behind: the snapshot and the journal as they are on disk
+    dst_dir.mkdir()
+    for name in ('session.json', 'session.journal'):
+        shutil.copy(src_dir / name, dst_dir / name)
+    return dst_dir / 'session.json'
+
+
+def test_session_journal_round_trip(tmp_path):
+    path = tmp_path / 'session.json'
+    journal = calculator.SessionJournal(str(path))
+    journal.load()
+    journal.open()
+    journal.append('c', '12+3', False)
+    journal.append('h', '1+1 = 2')
+    journal.append('c', '12+34', False)
+    journal.append('h', ['FF', 16, 'ff', 8])
+    journal.append('c', '46', True)
+    journal.sync(wait=True)
+    expected = ('46', True, [['FF', 16, 'ff', 8], '1+1 = 2'])
+    # replayed from the journal after a crash, and from the snapshot after a clean close
+    assert _session_state(_copy_session(tmp_path, tmp_path / 'crash')) == expected
+    journal.close()
+    assert _session_state(path) == expected
+    assert (tmp_path / 'session.journal').read_text(encoding='utf-8').count('\n') == 1
+
+
+def test_session_journal_ignores_a_torn_last_line(tmp_path):
+    journal = calculator.SessionJournal(str(tmp_path / 'session.json'))
+    journal.load()
+    journal.open()
+    journal.append('c', '12', False)
+    journal.append('h', '1+1 = 2')
+    journal.sync(wait=True)
+    copy = _copy_session(tmp_path, tmp_path / 'crash')
+    journal.close()
+    with open(tmp_path / 'crash' / 'session.journal', 'a', encoding='utf-8') as fh:
+        fh.write('["c",2,"+')
+    assert _session_state(copy) == ('12', False, ['1+1 = 2'])
+
+
+def test_session_journal_skips_a_journal_from_another_generation(tmp_path):
+    journal = calculator.SessionJournal(str(tmp_path / 'session.json'))
+    journal.load()
+    journal.open()
+    journal.append('c', '7', False)
+    journal.close()
+    journal = calculator.SessionJournal(str(tmp_path / 'session.json'))
+    journal.load()
+    journal.open()
+    journal.append('c', '789', False)
+    journal.sync(wait=True)
+    copy = _copy_session(tmp_path, tmp_path / 'crash')
+    journal.close()
+    # a crash after the snapshot was replaced but before the journal was restarted
+    lines = (copy.parent / 'session.journal').read_text(encoding='utf-8').splitlines()
+    lines[0] = '["gen",1]'
+    (copy.parent / 'session.journal').write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    assert _session_state(copy) == ('7', False, [])
+
+
+def test_session_journal_has_one_writer(tmp_path):
+    path = str(tmp_path / 'session.json')
+    first = calculator.SessionJournal(path)
+    first.load()
+    first.open()
+    first.append('c', '1', False)
+    second = calculator.SessionJournal(path)
+    assert second.load()['current'] == ''
+    second.open()
+    second.append('c', '2', False)
+    second.close()
+    first.append('c', '12', False)
+    first.close()
+    assert _session_state(path) == ('12', False, [])
+
+
+def _paste(prefix, chunks, base=None):
+    buf = calculator.PasteBuffer(prefix, base)
+    for chunk in chunks:
+        buf.feed(chunk)
+    return buf.finish()
+
+
+def test_paste_buffer_joins_numbers_and_shifts_across_chunks():
+    assert _paste('12', ['.5+', '.2', '5 * (3', ')']) == '12.5+0.25*(3)'
+    assert _paste('FF+', ['a <', '< 2'], 16) == 'FF+A<<2'
+    assert _paste('5', ['*', '-3'], None) == '5*-3'  # a sign, as the +/- key types it
+    assert _paste('1<<', ['-1'], 16) == '1<<-1'
+
+
+@pytest.mark.parametrize('prefix, chunks, base', [
+    ('1.2', ['.5'], None),
+    ('1', ['2x'], None),
+    ('FF', ['<2'], 16),
+    ('F', ['+1<'], 16),
+    ('1', ['2'], 2),
+    ('2', ['**3'], None),
+    ('6/', ['/2'], None),
+    ('5', ['*', '--3'], None),
+    ('1', ['&|2'], 16),
+])
+def test_paste_buffer_rejects_what_the_keys_cannot_type(prefix, chunks, base):
+    with pytest.raises(ValueError):
+        _paste(prefix, chunks, base)
+
+
+class _Keys(calculator.CalculatorMixin):
+    # the expression, display and history of a decimal-mode window, without Tk
+    pref_programmer = False
+
+    def __init__(self, current):
+        self.current = current
+        self.last_eval = False
+        self.shown = None
+        self.history = []
+        self.hist_list = self
+        self._preview = calculator.PrefixEvaluator()
+
+    def insert(self, index, *rows):
+        self.history[index:index] = rows
+
+    def _journal(self, *record):
+        pass
+
+    def _update_display(self, text, fit=False):
+        self.shown = text
+
+    def _show_error(self, text='Error'):
+        self.shown = text
+
+
+@pytest.mark.parametrize('expr, shown', [('2*3', '6'), ('2**3', 'Error'), ('7//2', 'Error')])
+def test_evaluate_has_only_calculator_operators(expr, shown):
+    keys = _Keys(expr)
+    keys._evaluate()
+    assert keys.shown == shown
+
+
+def test_evaluate_pastes_of_100k_terms():
+    rng = random.Random(50)
+    terms = [rng.randint(1, 99) for _ in range(100_001)]
+    ops = [rng.choice('+-*') for _ in range(100_000)]
+    text = str(terms[0]) + ''.join(op + str(t) for op, t in zip(ops, terms[1:]))
+    expected, product = 0, terms[0]
+    sign = 1
+    for op, t in zip(ops, terms[1:]):
+        if op == '*':
+            product *= t
+        else:
+            expected += sign * product
+            sign, product = (1 if op == '+' else -1), t
+    expected += sign * product
+    step = calculator.CalculatorMixin.PASTE_CHUNK
+    keys = _Keys(_paste('', [text[i:i + step] for i in range(0, len(text), step)]))
+    keys._evaluate()
+    assert keys.shown == calculator.format_result(expected)
+    for expr, shown in [('(' * 5000 + '7' + ')' * 5000, '7'), (text + '+', 'Error'), ('(' + text, 'Error')]:
+        keys = _Keys(expr)
+        keys._evaluate()
+        assert keys.shown == shown
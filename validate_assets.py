@@ -0,0 +1,247 @@
+"""Validate the generated assets: keycaps, icons and click sounds.
+
+    python validate_assets.py                  # the loose files build_assets.py writes
+    python validate_assets.py --bundle assets.pak
+    python validate_assets.py -o report.json
+
+Every asset is checked in parallel; the report is JSON on stdout (or in -o)
+and the exit status is 1 when any asset is missing or anomalous:
+
+- keycaps: size, RGBA mode, alpha coverage, transparent corners, and that the
+  label is drawn and not clipped by the edge of the key's top panel
+- icons: .ico frame sizes and the 64px window icon PNG
+- WAVs: mono 16-bit at the expected rate, peak level (not silent, not
+  clipped) and duration
+
+Two assets with the same bundle name are reported as an error rather than
+one of them being checked.
+"""
+from __future__ import annotations
+
+import argparse
+import array
+import concurrent.futures
+import io
+import json
+import os
+import sys
+import time
+import wave
+
+import build_assets
+import calculator
+
+KEYCAP_PANEL = (12, 12, 76, 52)  # top panel drawn by render_keycap (inset 6 + panel inset 6)
+KEYCAP_ALPHA_COVERAGE = (0.5, 0.9)  # opaque share of the image; the rest is the rounded margin
+LABEL_LEVEL = 200  # luminance of label pixels; both panel colors are darker
+WAV_RATE = 44100
+WAV_MIN_PEAK = 3000  # below this the click is near silent
+WAV_DURATION_MS = (10, 200)
+ICO_SIZES = {
+    'calculator.ico': build_assets.ICO_SIZES,
+    'calculator_multi.ico': build_assets.MULTI_ICO_SIZES,
+}
+
+
+def check_keycap(data: bytes) -> tuple[list[str], dict]:
+    problems = []
+    with calculator.Image.open(io.BytesIO(data)) as im:
+        im.load()
+        metrics = {'size': list(im.size), 'mode': im.mode}
+        if im.size != calculator.KEYCAP_SIZE:
+            problems.append(f'size {im.size[0]}x{im.size[1]}, expected {calculator.KEYCAP_SIZE[0]}x{calculator.KEYCAP_SIZE[1]}')
+        if im.mode != 'RGBA':
+            problems.append(f'mode {im.mode}, expected RGBA')
+            return problems, metrics
+        w, h = im.size
+        alpha = im.getchannel('A')
+        hist = alpha.histogram()
+        coverage = sum(hist[128:]) / (w * h)
+        metrics['alpha_coverage'] = round(coverage, 4)
+        lo, hi = KEYCAP_ALPHA_COVERAGE
+        if not lo <= coverage <= hi:
+            problems.append(f'alpha coverage {coverage:.2f} outside {lo}-{hi}')
+        corners = [alpha.getpixel(p) for p in ((0, 0), (w - 1, 0), (0, h - 1), (w - 1, h - 1))]
+        if any(corners):
+            problems.append('corners are not transparent')
+        label = im.convert('L').point(lambda v: 255 if v >= LABEL_LEVEL else 0).getbbox()
+        metrics['label_bbox'] = list(label) if label else None
+        if label is None:
+            problems.append('label not drawn')
+        else:
+            pl, pt, pr, pb = KEYCAP_PANEL
+            # getbbox is exclusive on the right/bottom edge
+            if label[0] <= pl or label[1] <= pt or label[2] >= pr or label[3] >= pb:
+                problems.append(f'label {tuple(label)} clipped by panel {KEYCAP_PANEL}')
+    return problems, metrics
+
+
+def check_ico(data: bytes, expected) -> tuple[list[str], dict]:
+    problems = []
+    with calculator.Image.open(io.BytesIO(data)) as im:
+        sizes = sorted(im.info.get('sizes', {im.size}))
+        metrics = {'sizes': [list(s) for s in sizes]}
+        missing = sorted(set(map(tuple, expected)) - set(sizes))
+        if missing:
+            problems.append('missing frames ' + ', '.join(f'{w}x{h}' for w, h in missing))
+        for s in sizes:
+            im.size = s
+            frame = im.copy()  # decodes the frame
+            if frame.size != s:
+                problems.append(f'frame {s[0]}x{s[1]} decodes as {frame.size[0]}x{frame.size[1]}')
+    return problems, metrics
+
+
+def check_png_icon(data: bytes) -> tuple[list[str], dict]:
+    problems = []
+    with calculator.Image.open(io.BytesIO(data)) as im:
+        im.load()
+        metrics = {'size': list(im.size), 'mode': im.mode}
+        if im.size != (64, 64):
+            problems.append(f'size {im.size[0]}x{im.size[1]}, expected 64x64')
+    return problems, metrics
+
+
+def check_wav(data: bytes) -> tuple[list[str], dict]:
+    problems = []
+    with wave.open(io.BytesIO(data), 'rb') as wf:
+        rate, width, channels, n = wf.getframerate(), wf.getsampwidth(), wf.getnchannels(), wf.getnframes()
+        frames = wf.readframes(n)
+    duration_ms = n / rate * 1000 if rate else 0.0
+    metrics = {'rate': rate, 'sample_width': width, 'channels': channels, 'duration_ms': round(duration_ms, 2)}
+    if rate != WAV_RATE:
+        problems.append(f'sample rate {rate}, expected {WAV_RATE}')
+    if width != 2 or channels != 1:
+        problems.append(f'{channels} channel(s) of {width * 8}-bit samples, expected 16-bit mono')
+        return problems, metrics
+    samples = array.array('h', frames)
+    if sys.byteorder == 'big':
+        samples.byteswap()
+    lo, hi = min(samples, default=0), max(samples, default=0)
+    peak = max(hi, -lo)
+    # synth_click clamps to +-32767, which is a legitimate peak; only -32768 lies beyond
+    # the clamp. Full-scale samples are reported for information.
+    clipped = samples.count(-32768)
+    full_scale = samples.count(32767) + samples.count(-32767)
+    metrics.update(peak=peak, clipped_samples=clipped, full_scale_samples=full_scale)
+    if peak < WAV_MIN_PEAK:
+        problems.append(f'peak {peak} below {WAV_MIN_PEAK} (near silent)')
+    if clipped:
+        problems.append(f'{clipped} clipped sample(s)')
+    lo, hi = WAV_DURATION_MS
+    if not lo <= duration_ms <= hi:
+        problems.append(f'duration {duration_ms:.1f}ms outside {lo}-{hi}ms')
+    return problems, metrics
+
+
+def _checker(name: str):
+    """Return (kind, check function) for a bundle entry name."""
+    if name.startswith('keycaps/'):
+        return 'keycap', check_keycap
+    base = name.rsplit('/', 1)[-1]
+    if base in ICO_SIZES:
+        return 'icon', lambda data: check_ico(data, ICO_SIZES[base])
+    if name.endswith('.png'):
+        return 'icon', check_png_icon
+    if name.endswith('.wav'):
+        return 'sound', check_wav
+    return 'other', lambda data: ([], {})
+
+
+def expected_assets(root: str) -> dict[str, str]:
+    """Return bundle name -> file path for every asset the pipeline produces under `root`.
+
+    Raises ValueError (from `build_assets.check_graph`) when a bundle name is
+    used for more than one file, instead of keeping only one of them.
+    """
+    bundle = build_assets.build_graph(root)['bundle']
+    return dict(zip(bundle.params['names'], bundle.inputs))
+
+
+def validate_one(name: str, load) -> dict:
+    kind, check = _checker(name)
+    result = {'name': name, 'kind': kind, 'ok': False, 'problems': [], 'metrics': {}}
+    try:
+        data = load()
+    except OSError as e:
+        result['problems'].append(f'missing ({e.strerror or e})')
+        return result
+    if data is None:
+        result['problems'].append('missing from bundle')
+        return result
+    try:
+        problems, metrics = check(data)
+    except Exception as e:
+        problems, metrics = [f'unreadable: {e}'], {}
+    result.update(ok=not problems, problems=problems, metrics=metrics)
+    return result
+
+
+def validate(root: str, bundle_path: str | None = None, jobs: int | None = None,
+             names: dict[str, str] | None = None) -> dict:
+    """Check every expected asset (`names`, default: `expected_assets(root)`) in parallel."""
+    start = time.perf_counter()
+    names = expected_assets(root) if names is None else names
+    bundle = calculator.AssetBundle(bundle_path) if bundle_path else None
+    if calculator.Image is None:
+        # image checks need Pillow; sounds can still be validated
+        names = {n: p for n, p in names.items() if n.endswith('.wav')}
+
+    def loader(name: str, path: str):
+        if bundle is not None:
+            return lambda: None if bundle.get(name) is None else bytes(bundle.get(name))
+        def read():
+            with open(path, 'rb') as fh:
+                return fh.read()
+        return read
+
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(lambda item: validate_one(item[0], loader(*item)), names.items()))
+    finally:
+        if bundle is not None:
+            bundle.close()
+    anomalies = sum(1 for r in results if not r['ok'])
+    return {
+        'ok': anomalies == 0,
+        'source': os.path.abspath(bundle_path) if bundle_path else os.path.abspath(root),
+        'checked': len(results),
+        'anomalies': anomalies,
+        'elapsed_ms': round((time.perf_counter() - start) * 1000, 1),
+        'results': results,
+    }
+
+
+def main(argv=None) -> int:
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description='Validate the calculator assets.')
+    parser.add_argument('--root', default=here, help='directory build_assets.py wrote the assets to')
+    parser.add_argument('--bundle', metavar='PAK', help='validate the entries of this asset bundle instead')
+    parser.add_argument('-o', '--output', metavar='JSON', help='write the report here instead of stdout')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='parallel workers')
+    args = parser.parse_args(argv)
+
+    try:
+        names = expected_assets(args.root)
+    except ValueError as e:
+        print(f'invalid asset list: {e}', file=sys.stderr)
+        return 2
+    try:
+        report = validate(args.root, args.bundle, args.jobs, names)
+    except (OSError, ValueError) as e:
+        print(f'cannot open assets: {e}', file=sys.stderr)
+        return 2
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fh:
+            fh.write(text + '\n')
+    else:
+        print(text)
+    for r in report['results']:
+        if not r['ok']:
+            print(f"{r['name']}: {'; '.join(r['problems'])}", file=sys.stderr)
+    return 0 if report['ok'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())